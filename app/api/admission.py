@@ -0,0 +1,274 @@
+"""Cost-aware admission control for the heavy analytics endpoints."""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, Hashable, List, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.transaction import Transaction
+from app.utils.cache import TTLCache
+from app.utils.metrics import LATENCY_BUCKETS, REGISTRY
+
+settings = get_settings()
+WAIT_SECONDS = REGISTRY.histogram(
+    "risk_engine_admission_wait_seconds", "Time requests spent queued for admission.", ["endpoint"], LATENCY_BUCKETS
+)
+
+# Cost units per 1,000 transaction rows; loading and cleaning the frame costs 1 unit for every endpoint.
+# Rough relative timings from ``python -m benchmarks run``.
+ROW_COST: Dict[str, float] = {"risk": 1.0, "forecast": 0.5, "simulate": 0.0, "anomalies": 4.0}
+SIMULATION_COST_PER_1K_ITERATIONS = 2.0
+FORECAST_COST_PER_STEP = 0.5
+
+
+def estimate_cost(endpoint: str, rows: int, iterations: int = 0, horizons: Sequence[int] = ()) -> float:
+    """Estimated work for one company's request in cost units (about 1,000 rows cleaned)."""
+
+    cost = rows / 1000 * (1.0 + ROW_COST[endpoint])
+    if endpoint == "simulate":
+        cost += iterations / 1000 * SIMULATION_COST_PER_1K_ITERATIONS
+    if endpoint == "forecast" and horizons:
+        cost += max(horizons) // 30 * FORECAST_COST_PER_STEP
+    return max(cost, 1.0)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Usage:
+    requests: int = 0
+    cost: float = 0.0
+
+
+@dataclass
+class _Waiter:
+    tenant: Hashable
+    cost: float
+    admitted: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    blocked: bool = False  # waiting on the global budget, so newcomers queue behind it
+
+
+class AdmissionController:
+    """Global and per-tenant concurrency and cost budgets with a bounded wait queue.
+
+    Waiters are admitted in arrival order. A waiter held back only by its own tenant's budget
+    does not block other tenants behind it, and one tenant can hold at most ``tenant_queue_size``
+    queue slots. A request costing more than a budget is charged at that budget, so it still
+    runs when it would be alone. Budgets apply per process.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_cost: float,
+        tenant_max_concurrency: int,
+        tenant_max_cost: float,
+        queue_size: int,
+        tenant_queue_size: int,
+        max_wait: float,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_cost = max_cost
+        self.tenant_max_concurrency = tenant_max_concurrency
+        self.tenant_max_cost = tenant_max_cost
+        self.queue_size = queue_size
+        self.tenant_queue_size = tenant_queue_size
+        self.max_wait = max_wait
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+        self._usage = _Usage()
+        self._tenants: Dict[Hashable, _Usage] = {}
+        self._waiters: Deque[_Waiter] = deque()
+        self._queued: Counter = Counter()
+        self._blocked = 0
+        self._service_seconds = 1.0
+
+    def _fits(self, tenant: Hashable, cost: float) -> Tuple[bool, bool]:
+        """Whether ``cost`` fits the global budget and the tenant's budget."""
+
+        usage = self._tenants.get(tenant, _Usage())
+        fits_global = self._usage.requests < self.max_concurrency and self._usage.cost + cost <= self.max_cost
+        fits_tenant = usage.requests < self.tenant_max_concurrency and usage.cost + cost <= self.tenant_max_cost
+        return fits_global, fits_tenant
+
+    def _take(self, tenant: Hashable, cost: float) -> None:
+        usage = self._tenants.setdefault(tenant, _Usage())
+        for budget in (self._usage, usage):
+            budget.requests += 1
+            budget.cost += cost
+        self.admitted += 1
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is likely drained, from the average request duration."""
+
+        backlog = (len(self._waiters) + 1) / max(self.max_concurrency, 1)
+        return min(60, max(1, math.ceil(self._service_seconds * backlog)))
+
+    def charge(self, cost: float) -> float:
+        return min(cost, self.max_cost, self.tenant_max_cost)
+
+    async def acquire(self, tenant: Hashable, cost: float) -> float:
+        """Wait for capacity and reserve ``cost``; returns the charged cost for :meth:`release`."""
+
+        cost = self.charge(cost)
+        fits_global, fits_tenant = self._fits(tenant, cost)
+        if fits_global and fits_tenant and not self._blocked:
+            self._take(tenant, cost)
+            return cost
+        if len(self._waiters) >= self.queue_size or self._queued[tenant] >= self.tenant_queue_size:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("Server is at capacity", self.retry_after())
+        waiter = _Waiter(tenant, cost)
+        self._waiters.append(waiter)
+        self._queued[tenant] += 1
+        self._mark(waiter, not fits_global)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.admitted), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.admitted.done():
+                return cost
+            self._remove(waiter)
+            self.rejected["timeout"] += 1
+            self._wake()
+            raise AdmissionRejected("Timed out waiting for capacity", self.retry_after()) from None
+        except asyncio.CancelledError:
+            if waiter.admitted.done():
+                self.release(tenant, cost, 0.0)
+            else:
+                self._remove(waiter)
+                self._wake()
+            raise
+        return cost
+
+    def _mark(self, waiter: _Waiter, blocked: bool) -> None:
+        # Keeps a count of globally blocked waiters so admitting a newcomer needs no queue scan.
+        if waiter.blocked != blocked:
+            waiter.blocked = blocked
+            self._blocked += 1 if blocked else -1
+
+    def _remove(self, waiter: _Waiter) -> None:
+        self._waiters.remove(waiter)
+        self._queued[waiter.tenant] -= 1
+        if not self._queued[waiter.tenant]:
+            del self._queued[waiter.tenant]
+        self._mark(waiter, False)
+
+    def release(self, tenant: Hashable, cost: float, elapsed: float) -> None:
+        usage = self._tenants[tenant]
+        for budget in (self._usage, usage):
+            budget.requests -= 1
+            budget.cost -= cost
+        if usage.requests == 0:
+            del self._tenants[tenant]
+        if elapsed:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * elapsed
+        self._wake()
+
+    def _wake(self) -> None:
+        for waiter in list(self._waiters):
+            fits_global, fits_tenant = self._fits(waiter.tenant, waiter.cost)
+            if not fits_global:
+                self._mark(waiter, True)
+                break
+            self._mark(waiter, False)
+            if fits_tenant:
+                self._remove(waiter)
+                self._take(waiter.tenant, waiter.cost)
+                waiter.admitted.set_result(None)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        return {
+            ("in_flight",): float(self._usage.requests),
+            ("in_flight_cost",): self._usage.cost,
+            ("queued",): float(len(self._waiters)),
+        }
+
+    def outcomes(self) -> Dict[Tuple[str, ...], float]:
+        return {("admitted",): float(self.admitted), **{(reason,): float(count) for reason, count in self.rejected.items()}}
+
+
+admission_controller = AdmissionController(
+    settings.admission_max_concurrency,
+    settings.admission_max_cost,
+    settings.admission_tenant_max_concurrency,
+    settings.admission_tenant_max_cost,
+    settings.admission_queue_size,
+    settings.admission_tenant_queue_size,
+    settings.admission_max_wait_seconds,
+)
+REGISTRY.gauge("risk_engine_admission", "Admission control load and queue depth.", ["stat"], admission_controller.samples)
+REGISTRY.counter(
+    "risk_engine_admission_requests_total", "Requests admitted or rejected (queue_full, timeout).", ["outcome"], admission_controller.outcomes
+)
+_row_counts: TTLCache[int, int] = TTLCache(max_entries=10_000, ttl_seconds=settings.admission_row_count_ttl_seconds)
+
+
+async def transaction_counts(company_ids: Sequence[int]) -> List[int]:
+    """Transaction row counts per company, cached briefly since estimates need not be exact.
+
+    Uses its own short-lived session so the count's connection is back in the pool before
+    the caller queues for admission.
+    """
+
+    counts = {company_id: _row_counts.get(company_id) for company_id in company_ids}
+    missing = [company_id for company_id, count in counts.items() if count is None]
+    if missing:
+        query = select(Transaction.company_id, func.count()).where(Transaction.company_id.in_(missing)).group_by(Transaction.company_id)
+        async with AsyncSessionLocal() as db:
+            found = dict((await db.execute(query)).all())
+        for company_id in missing:
+            counts[company_id] = found.get(company_id, 0)
+            _row_counts.put(company_id, counts[company_id])
+    return [counts[company_id] for company_id in company_ids]
+
+
+@asynccontextmanager
+async def admit(
+    db: AsyncSession,
+    endpoint: str,
+    company_ids: Sequence[int],
+    tenant: Hashable | None = None,
+    **params,
+) -> AsyncIterator[float]:
+    """Hold an admission slot for the block, or raise ``429`` with ``Retry-After`` when over capacity.
+
+    ``tenant`` defaults to the single company; the estimated cost sums over ``company_ids``.
+    ``db`` is the request's session: its transaction is ended before waiting for a slot so a queued
+    request holds no pooled connection. It must have no pending writes; loaded objects stay usable
+    and the next query checks out a connection again.
+    """
+
+    if not settings.admission_enabled:
+        yield 0.0
+        return
+    rows = await transaction_counts(company_ids)
+    await db.commit()
+    cost = sum(estimate_cost(endpoint, count, **params) for count in rows)
+    tenant = company_ids[0] if tenant is None else tenant
+    start = time.perf_counter()
+    try:
+        charged = await admission_controller.acquire(tenant, cost)
+    except AdmissionRejected as exc:
+        raise HTTPException(status_code=429, detail=exc.reason, headers={"Retry-After": str(exc.retry_after)}) from exc
+    finally:
+        WAIT_SECONDS.observe(time.perf_counter() - start, endpoint)
+    admitted_at = time.perf_counter()
+    try:
+        yield cost
+    finally:
+        admission_controller.release(tenant, charged, time.perf_counter() - admitted_at)
@@ -0,0 +1,119 @@
+"""Shared async loaders used by the analytics routers."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Sequence
+
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.admission import admit
+from app.models.company import Company
+from app.models.rule_definition import RuleDefinition
+from app.models.transaction import Transaction
+from app.services.fx_rates import FxRateError, to_reporting_currency
+from app.services.risk_aggregates import RiskAggregates, aggregate_cache, rolling_keys
+from app.services.rule_dsl import RuleCompileError, RulePlan, RuleSpec
+from app.services.rules_engine import build_rule_plan
+from app.utils.concurrency import run_cpu
+from app.utils.metrics import record_rows, stage
+from app.utils.preprocess import to_dataframe, transactions_to_records
+
+logger = logging.getLogger(__name__)
+
+
+async def get_company_or_404(db: AsyncSession, company_id: int) -> Company:
+    """Fetch a company or raise a 404."""
+
+    with stage("db.company"):
+        company = await db.get(Company, company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return company
+
+
+def build_transaction_frame(records: List[dict]) -> pd.DataFrame:
+    """Clean transaction records and convert amounts into the reporting currency."""
+
+    with stage("to_dataframe"):
+        frame = to_dataframe(records)
+    return to_reporting_currency(frame)
+
+
+async def load_transaction_frame(db: AsyncSession, company_id: int) -> pd.DataFrame:
+    """Load a company's transactions and build the cleaned, currency-normalized frame on the CPU executor."""
+
+    with stage("db.transactions"):
+        transactions = (await db.scalars(select(Transaction).where(Transaction.company_id == company_id))).all()
+    record_rows("db.transactions", len(transactions))
+    try:
+        return await run_cpu(build_transaction_frame, transactions_to_records(transactions))
+    except FxRateError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+async def load_rule_plan(db: AsyncSession, company_ids: Iterable[int]) -> RulePlan:
+    """Compile the configured rules plus enabled stored rules, global or for ``company_ids``.
+
+    A stored rule that no longer compiles (e.g. after the rules file dropped a metric it used) is
+    logged and skipped so the remaining rules still run.
+    """
+
+    company_ids = list(company_ids)
+    with stage("db.rules"):
+        definitions = (
+            await db.scalars(
+                select(RuleDefinition).where(
+                    RuleDefinition.enabled.is_(True),
+                    or_(RuleDefinition.company_id.is_(None), RuleDefinition.company_id.in_(company_ids)),
+                ).order_by(RuleDefinition.id)
+            )
+        ).all()
+    specs = [RuleSpec(definition.name, definition.expression, definition.description, definition.company_id) for definition in definitions]
+    try:
+        return build_rule_plan(specs)
+    except RuleCompileError:
+        valid = []
+        for definition, spec in zip(definitions, specs):
+            try:
+                build_rule_plan([*valid, spec])
+            except RuleCompileError as exc:
+                logger.warning("Skipping stored rule %s (%r): %s", definition.id, definition.name, exc)
+            else:
+                valid.append(spec)
+        return build_rule_plan(valid)
+
+
+async def load_risk_aggregates(db: AsyncSession, company_id: int, plan: RulePlan) -> RiskAggregates:
+    """Cached additive aggregates for ``company_id``; a miss loads the full history under admission control."""
+
+    aggregates = aggregate_cache.get(company_id)
+    if aggregates is None or not aggregates.covers(plan):
+        async with admit(db, "risk", [company_id]):
+            frame = await load_transaction_frame(db, company_id)
+            with stage("risk.aggregates"):
+                aggregates = await run_cpu(RiskAggregates.from_frame, frame, rolling_keys(plan))
+        aggregate_cache.put(company_id, aggregates)
+    return aggregates
+
+
+async def load_delta_frame(db: AsyncSession, company_id: int, additions: List[Dict[str, Any]], removals: Sequence[str]) -> pd.DataFrame:
+    """Cleaned frame of hypothetical ``additions`` (``sign`` 1) and the stored transactions ``removals`` name (``sign`` -1)."""
+
+    removals = list(dict.fromkeys(removals))
+    records = [{**record, "unique_id": f"whatif-{index}", "sign": 1} for index, record in enumerate(additions)]
+    if removals:
+        with stage("db.transactions"):
+            transactions = (
+                await db.scalars(select(Transaction).where(Transaction.company_id == company_id, Transaction.unique_id.in_(removals)))
+            ).all()
+        missing = set(removals) - {transaction.unique_id for transaction in transactions}
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Unknown transactions for this company: {', '.join(sorted(missing))}")
+        records += [{**record, "sign": -1} for record in transactions_to_records(transactions)]
+    try:
+        return await run_cpu(build_transaction_frame, records)
+    except FxRateError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
@@ -0,0 +1,138 @@
+"""Keyset (cursor) pagination with JSON pages or streamed NDJSON for the read endpoints."""
+from __future__ import annotations
+
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Literal
+
+import orjson
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.utils.metrics import record_rows, stage
+
+settings = get_settings()
+NDJSON = "application/x-ndjson"
+
+
+class PageParams:
+    """``limit``/``cursor``/``format`` query parameters shared by the listing endpoints."""
+
+    def __init__(
+        self,
+        limit: int = Query(default=settings.page_size_default, ge=1, le=settings.stream_max_rows),
+        cursor: str | None = None,
+        format: Literal["json", "ndjson"] = "json",
+    ) -> None:
+        if format == "json" and limit > settings.page_size_max:
+            raise HTTPException(status_code=422, detail=f"limit above {settings.page_size_max} requires format=ndjson")
+        self.limit = limit
+        self.cursor = cursor
+        self.format = format
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default)
+
+
+def encode_cursor(sort_value: date | datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(dumps([sort_value, row_id])).decode("ascii")
+
+
+def decode_cursor(cursor: str, parse: Callable[[str], Any]) -> tuple:
+    try:
+        sort_value, row_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return parse(sort_value), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=422, detail="Invalid cursor") from exc
+
+
+def date_range(statement: Select, column: ColumnElement, start: Any = None, end: Any = None) -> Select:
+    """Restrict ``column`` to ``[start, end]``; either bound may be omitted."""
+
+    if start is not None:
+        statement = statement.where(column >= start)
+    if end is not None:
+        statement = statement.where(column <= end)
+    return statement
+
+
+class Keyset:
+    """Orders a statement by ``(sort_column, id_column)`` and resumes after a cursor.
+
+    The row-value comparison lets the database seek straight into the composite
+    ``(company_id, sort_column, id)`` index instead of counting skipped rows like ``OFFSET``.
+    """
+
+    def __init__(self, sort_column: ColumnElement, id_column: ColumnElement, descending: bool = False) -> None:
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+        self.parse = date.fromisoformat if sort_column.type.python_type is date else datetime.fromisoformat
+
+    def apply(self, statement: Select, cursor: str | None, limit: int) -> Select:
+        key = tuple_(self.sort_column, self.id_column)
+        if cursor:
+            after = tuple_(*decode_cursor(cursor, self.parse))
+            statement = statement.where(key < after if self.descending else key > after)
+        order = (self.sort_column.desc(), self.id_column.desc()) if self.descending else (self.sort_column, self.id_column)
+        return statement.order_by(*order).limit(limit)
+
+    def cursor_for(self, row: Any) -> str:
+        return encode_cursor(row._mapping[self.sort_column.key], row._mapping[self.id_column.key])
+
+
+async def paginate(db: AsyncSession, statement: Select, keyset: Keyset, page: PageParams, stage_name: str) -> Response:
+    """Return one page as ``{"items", "next_cursor"}``, or stream it as NDJSON.
+
+    A streamed page is written in chunks from a server-side cursor. It ends with a
+    ``{"next_cursor": ...}`` line.
+    """
+
+    # Fetch one extra row to know whether there is a next page; the cursor is validated before streaming starts.
+    statement = keyset.apply(statement, page.cursor, page.limit + 1)
+    if page.format == "ndjson":
+        return StreamingResponse(_stream(statement, keyset, page.limit, stage_name), media_type=NDJSON)
+    with stage(stage_name):
+        rows = (await db.execute(statement)).all()
+    record_rows(stage_name, len(rows))
+    more = len(rows) > page.limit
+    rows = rows[: page.limit]
+    body = {"items": [dict(row._mapping) for row in rows], "next_cursor": keyset.cursor_for(rows[-1]) if more else None}
+    return Response(dumps(body), media_type="application/json")
+
+
+def _line(row: Any) -> bytes:
+    return orjson.dumps(dict(row._mapping), default=_default, option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def _stream(statement: Select, keyset: Keyset, limit: int, stage_name: str) -> AsyncIterator[bytes]:
+    # Since FastAPI 0.106, dependency teardown (closing the request's session) runs before a
+    # StreamingResponse body is sent, so the stream holds its own session for as long as it runs.
+    sent, last, more = 0, None, False
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement)
+        async for rows in result.partitions(settings.stream_chunk_rows):
+            chunk = rows[: limit - sent]
+            if chunk:
+                sent += len(chunk)
+                last = chunk[-1]
+                yield b"".join(_line(row) for row in chunk)
+            if len(chunk) < len(rows):
+                more = True
+                break
+        await result.close()
+    record_rows(stage_name, sent)
+    yield orjson.dumps({"next_cursor": keyset.cursor_for(last) if more else None}, option=orjson.OPT_APPEND_NEWLINE)
@@ -1,15 +1,51 @@
 """SQLAlchemy database session and engine configuration."""
-from collections.abc import Generator
+import logging
+from collections.abc import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.schema import CreateColumn
 
 from app.config import get_settings
+from app.utils.metrics import register_pool
 
 settings = get_settings()
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+logger = logging.getLogger(__name__)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "postgresql+psycopg2": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _pool_options(url: str) -> dict:
+    """Pool sizing from settings; SQLite uses single-connection pools that reject these options."""
+
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+def _async_url(url: str) -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)).render_as_string(hide_password=False)
+
+
+engine = create_engine(settings.database_url, pool_pre_ping=True, **_pool_options(settings.database_url))
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+async_engine = create_async_engine(
+    _async_url(settings.database_url), pool_pre_ping=True, **_pool_options(settings.database_url)
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
+register_pool("sync", engine.pool)
+register_pool("async", async_engine.sync_engine.pool)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -20,3 +56,58 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Yield an async database session and ensure closing it after use."""
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def ensure_columns() -> None:
+    """Add model columns missing from existing tables (``create_all`` never alters an existing table).
+
+    A non-null column needs a ``server_default`` so the rows already in the table get a value.
+    """
+
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(f"Cannot add non-null column {table.name}.{column.name} without a server_default")
+                logger.info("Adding column %s.%s", table.name, column.name)
+                connection.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {CreateColumn(column).compile(dialect=engine.dialect)}"))
+
+
+def ensure_indexes() -> None:
+    """Create model indexes missing from existing tables (``create_all`` skips tables that already exist).
+
+    An index over a column the table does not have yet (run :func:`ensure_columns` first), or a unique
+    index the existing rows violate, is skipped with a warning rather than failing startup.
+    """
+
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for index in table.indexes:
+                missing = sorted(column.name for column in index.columns if column.name not in existing)
+                if missing:
+                    logger.warning("Skipping index %s: %s.%s missing", index.name, table.name, ", ".join(missing))
+                    continue
+                try:
+                    with connection.begin_nested():
+                        index.create(connection, checkfirst=True)
+                except IntegrityError:
+                    # A unique index over rows stored before it existed; the rows must be deduplicated first.
+                    logger.warning("Skipping unique index %s: %s already holds duplicate rows", index.name, table.name)
@@ -5,9 +5,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app import database
-from app.models import company, forecast, risk_report, simulation, transaction, user  # noqa: F401
-from app.routers import anomalies, auth, forecast as forecast_router, ingest, risk, simulate
+from app.config import get_settings
+from app.models import analytics_rollup, company, forecast, llm_explanation, revoked_token, risk_report, rule_definition, simulation, transaction, user  # noqa: F401
+from app.routers import admin, anomalies, auth, forecast as forecast_router, ingest, metrics, risk, rules, simulate, transactions
+from app.services.warmup import start_background_warmup, warmup_status
+from app.utils.concurrency import shutdown_cpu_executor
+from app.utils.metrics import MetricsMiddleware
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.write_behind import write_behind
 
+settings = get_settings()
 app = FastAPI(title="AI Financial Risk Engine")
 
 app.add_middleware(
@@ -16,14 +23,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(auth.router)
 app.include_router(ingest.router)
+app.include_router(transactions.router)
 app.include_router(risk.router)
+app.include_router(rules.router)
 app.include_router(forecast_router.router)
 app.include_router(simulate.router)
 app.include_router(anomalies.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -31,6 +45,22 @@ def root() -> dict:
     return {"message": "AI Financial Risk Engine", "docs_url": "/docs"}
 
 
+@app.get("/health")
+def health() -> dict:
+    return {"status": "ok", "warmup": warmup_status()}
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     database.Base.metadata.create_all(bind=database.engine)
+    database.ensure_columns()
+    database.ensure_indexes()
+    if settings.warmup_on_startup:
+        start_background_warmup()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await write_behind.stop()
+    shutdown_cpu_executor()
+    await database.async_engine.dispose()
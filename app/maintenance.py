@@ -0,0 +1,66 @@
+"""Command line entry point for database maintenance: ``python -m app.maintenance migrate|retention|partition``."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import asdict
+from typing import List
+
+from app.database import Base, SessionLocal, engine, ensure_columns, ensure_indexes
+from app.models import analytics_rollup, company, forecast, llm_explanation, revoked_token, risk_report, rule_definition, simulation, transaction, user  # noqa: F401
+from app.services.dedup_index import backfill_fingerprints
+from app.services.retention import SOURCES, convert_to_partitioned, partitioning_enabled, run_retention
+
+
+def command_migrate(args: argparse.Namespace) -> int:
+    Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    with SessionLocal() as db:
+        filled = backfill_fingerprints(db, batch_rows=args.batch_rows)
+        db.commit()
+    ensure_indexes()
+    print(f"schema up to date; {filled} transaction fingerprints backfilled")
+    return 0
+
+
+def command_retention(args: argparse.Namespace) -> int:
+    results = run_retention(args.tables)
+    print(json.dumps([asdict(result) for result in results], indent=2))
+    return 0
+
+
+def command_partition(args: argparse.Namespace) -> int:
+    if not partitioning_enabled():
+        print("Partitioning needs ANALYTICS_PARTITIONING=true and a Postgres DATABASE_URL; tables stay plain.", file=sys.stderr)
+        return 1
+    for table in args.tables or SOURCES:
+        converted = convert_to_partitioned(SOURCES[table])
+        print(f"{table}: {'partitioned' if converted else 'already partitioned'}")
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="add missing tables, columns and indexes and backfill fingerprints")
+    migrate_parser.add_argument("--batch-rows", type=int, default=5_000, help="fingerprints backfilled per flush")
+    migrate_parser.set_defaults(handler=command_migrate)
+
+    retention_parser = commands.add_parser("retention", help="roll up and prune analytics rows past their retention window")
+    retention_parser.add_argument("--tables", nargs="+", choices=sorted(SOURCES), help="subset of analytics tables")
+    retention_parser.set_defaults(handler=command_retention)
+
+    partition_parser = commands.add_parser("partition", help="convert analytics tables to monthly range partitions (Postgres)")
+    partition_parser.add_argument("--tables", nargs="+", choices=sorted(SOURCES), help="subset of analytics tables")
+    partition_parser.set_defaults(handler=command_partition)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
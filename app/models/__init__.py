@@ -1,2 +1,2 @@
 """Model package exports."""
-from app.models import company, forecast, risk_report, simulation, transaction, user  # noqa: F401
+from app.models import analytics_rollup, company, forecast, llm_explanation, revoked_token, risk_report, rule_definition, simulation, transaction, user  # noqa: F401
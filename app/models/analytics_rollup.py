@@ -0,0 +1,24 @@
+"""Downsampled analytics history ORM model."""
+from datetime import date, datetime
+
+from sqlalchemy import JSON, Column, Date, DateTime, ForeignKey, Integer, String, UniqueConstraint
+
+from app.database import Base
+
+
+class AnalyticsRollup(Base):
+    """Daily or monthly summary of pruned risk report, forecast or simulation rows for a company."""
+
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        UniqueConstraint("source", "company_id", "granularity", "period_start", name="uq_analytics_rollups_period"),
+    )
+
+    id: int = Column(Integer, primary_key=True, index=True)
+    company_id: int = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    source: str = Column(String(32), nullable=False)
+    granularity: str = Column(String(8), nullable=False)
+    period_start: date = Column(Date, nullable=False)
+    rows: int = Column(Integer, nullable=False, default=0)
+    metrics: dict = Column(JSON, nullable=False)
+    updated_at: datetime = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,17 @@
+"""Persistent tier of the LLM explanation cache."""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String, Text
+
+from app.database import Base
+
+
+class LLMExplanation(Base):
+    """A generated narrative keyed by the hash of its normalized input payload and model settings."""
+
+    __tablename__ = "llm_explanations"
+
+    cache_key: str = Column(String(64), primary_key=True)
+    model: str = Column(String(128), nullable=False)
+    summary: str = Column(Text, nullable=False)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,16 @@
+"""Revoked access tokens, kept until the token would have expired anyway."""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+
+from app.database import Base
+
+
+class RevokedToken(Base):
+    """A token ``jti`` that must no longer authenticate."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti: str = Column(String(64), primary_key=True)
+    expires_at: datetime = Column(DateTime, nullable=False, index=True)
+    revoked_at: datetime = Column(DateTime, default=datetime.utcnow)
@@ -1,7 +1,7 @@
 """Risk report ORM model."""
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -11,12 +11,14 @@ class RiskReport(Base):
     """Stores computed risk metrics for a company."""
 
     __tablename__ = "risk_reports"
+    __table_args__ = (Index("ix_risk_reports_company_created", "company_id", "created_at", "id"),)
 
     id: int = Column(Integer, primary_key=True, index=True)
     company_id: int = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
     survival_probability: float = Column(Float, nullable=False)
     heatmap: dict = Column(JSON, nullable=False)
     summary: str = Column(String(2048), nullable=False)
+    narrative_status: str = Column(String(16), nullable=False, default="ready", server_default="ready")
     report_payload: dict = Column(JSON, nullable=False)
     created_at: datetime = Column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,21 @@
+"""Stored rule definitions evaluated alongside the configured rule set."""
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+
+from app.database import Base
+
+
+class RuleDefinition(Base):
+    """A declarative rule; global when ``company_id`` is null, otherwise tenant-specific."""
+
+    __tablename__ = "rule_definitions"
+    __table_args__ = (UniqueConstraint("company_id", "name", name="uq_rule_definitions_company_name"),)
+
+    id: int = Column(Integer, primary_key=True, index=True)
+    company_id: int = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=True, index=True)
+    name: str = Column(String(100), nullable=False)
+    expression: str = Column(String(1000), nullable=False)
+    description: str = Column(String(255), nullable=False, default="")
+    enabled: bool = Column(Boolean, nullable=False, default=True)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow)
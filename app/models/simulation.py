@@ -1,7 +1,7 @@
 """Simulation ORM model."""
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Integer
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -11,6 +11,7 @@ class Simulation(Base):
     """Stores simulation results for a company."""
 
     __tablename__ = "simulations"
+    __table_args__ = (Index("ix_simulations_company_created", "company_id", "created_at", "id"),)
 
     id: int = Column(Integer, primary_key=True, index=True)
     company_id: int = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
@@ -1,7 +1,7 @@
 """Transaction model definition."""
 from datetime import datetime
 
-from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, Numeric, String
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, Numeric, String
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -11,6 +11,11 @@ class Transaction(Base):
     """Represents a financial transaction."""
 
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("uq_transactions_company_fingerprint", "company_id", "fingerprint", unique=True),
+        Index("ix_transactions_company_date", "company_id", "transaction_date", "id"),
+        Index("ix_transactions_company_created", "company_id", "created_at"),
+    )
 
     id: int = Column(Integer, primary_key=True, index=True)
     company_id: int = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
@@ -20,6 +25,7 @@ class Transaction(Base):
     description: str = Column(String(1024), nullable=True)
     currency: str = Column(String(10), default="USD")
     transaction_date: datetime = Column(Date, nullable=False)
+    fingerprint: str = Column(String(32), nullable=True)
     created_at: datetime = Column(DateTime, default=datetime.utcnow)
 
     company = relationship("Company", back_populates="transactions")
@@ -0,0 +1,34 @@
+"""Administrative endpoints for retrieving profile captures."""
+from __future__ import annotations
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.config import get_settings
+from app.utils.profiling import capture_store
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+settings = get_settings()
+
+
+def _authorize(token: str | None) -> None:
+    if not settings.profiling_token or token != settings.profiling_token:
+        raise HTTPException(status_code=404, detail="Not found")
+
+
+@router.get("/profiles")
+def list_profiles(x_profile_token: str | None = Header(default=None)) -> list[dict]:
+    """List stored profile captures, newest first."""
+
+    _authorize(x_profile_token)
+    return capture_store.list()
+
+
+@router.get("/profiles/{capture_id}")
+def get_profile(capture_id: str, x_profile_token: str | None = Header(default=None)) -> dict:
+    """Return a capture with its call tree, top service functions and wall/CPU times."""
+
+    _authorize(x_profile_token)
+    report = capture_store.get(capture_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
@@ -3,27 +3,27 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
 
-from app.api.dependencies import DBSession
-from app.models.company import Company
-from app.models.transaction import Transaction
+from app.api.admission import admit
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404, load_transaction_frame
 from app.services.anomaly_detector import detect_anomalies
-from app.utils.preprocess import to_dataframe, transactions_to_records
+from app.utils.concurrency import run_cpu
+from app.utils.metrics import stage
 
 router = APIRouter(prefix="/anomalies", tags=["anomalies"])
 
 
 @router.post("/{company_id}")
-def detect_company_anomalies(company_id: int, db: DBSession) -> dict:
+async def detect_company_anomalies(company_id: int, db: AsyncDBSession) -> dict:
     """Detect unusual activities for a company."""
 
-    company = db.query(Company).filter(Company.id == company_id).first()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    transactions = db.query(Transaction).filter(Transaction.company_id == company_id).all()
-    frame = to_dataframe(transactions_to_records(transactions))
-    result = detect_anomalies(frame)
+    await get_company_or_404(db, company_id)
+    async with admit(db, "anomalies", [company_id]):
+        frame = await load_transaction_frame(db, company_id)
+        with stage("anomalies.detect"):
+            result = await run_cpu(detect_anomalies, frame)
     result["company_id"] = company_id
     result["generated_at"] = datetime.utcnow().isoformat()
     return result
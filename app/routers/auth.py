@@ -1,53 +1,68 @@
 """Authentication routes."""
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 
-from app.api.dependencies import DBSession
+from app.api.dependencies import AsyncDBSession
 from app.config import get_settings
+from app.models.revoked_token import RevokedToken
 from app.models.user import User
-from app.security.auth_handler import create_access_token, hash_password, verify_password, verify_token
-from app.security.dependencies import oauth2_scheme
+from app.security.auth_handler import create_access_token, hash_password_async, verify_password_async
+from app.security.dependencies import decode_active_token, oauth2_scheme
+from app.security.user_cache import revocation_list, user_cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 settings = get_settings()
 
 
 @router.post("/register")
-def register(email: str, password: str, db: DBSession) -> dict:
+async def register(email: str, password: str, db: AsyncDBSession) -> dict:
     """Register a new user."""
 
-    existing = db.query(User).filter(User.email == email).first()
+    existing = await db.scalar(select(User).where(User.email == email))
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
-    user = User(email=email, hashed_password=hash_password(password))
+    user = User(email=email, hashed_password=await hash_password_async(password))
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     return {"id": user.id, "email": user.email}
 
 
 @router.post("/login")
-def login(db: DBSession, form_data: OAuth2PasswordRequestForm = Depends()) -> dict:
+async def login(db: AsyncDBSession, form_data: OAuth2PasswordRequestForm = Depends()) -> dict:
     """Authenticate a user and return access token."""
 
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    access_token = create_access_token({"sub": str(user.id)})
+    access_token = create_access_token({"sub": str(user.id), "email": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/refresh")
-def refresh_token(token: str = Depends(oauth2_scheme)) -> dict:
+async def refresh_token(token: str = Depends(oauth2_scheme)) -> dict:
     """Refresh a token by issuing a new one with the same subject."""
 
-    payload = verify_token(token)
-    subject = payload.get("sub")
-    if subject is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    new_token = create_access_token({"sub": subject}, expires_delta=timedelta(minutes=settings.access_token_expire_minutes))
+    payload = await decode_active_token(token)
+    claims = {key: payload[key] for key in ("sub", "email") if key in payload}
+    new_token = create_access_token(claims, expires_delta=timedelta(minutes=settings.access_token_expire_minutes))
     return {"access_token": new_token, "token_type": "bearer"}
+
+
+@router.post("/logout")
+async def logout(db: AsyncDBSession, token: str = Depends(oauth2_scheme)) -> dict:
+    """Revoke the presented token and drop it from the user cache."""
+
+    payload = await decode_active_token(token)
+    if not payload.get("jti"):
+        raise HTTPException(status_code=400, detail="Token cannot be revoked; it has no jti claim")
+    expires_at = datetime.utcfromtimestamp(payload["exp"])
+    await db.merge(RevokedToken(jti=payload["jti"], expires_at=expires_at))
+    await db.commit()
+    revocation_list.add(payload["jti"], expires_at)
+    user_cache.invalidate(payload["sub"], payload["jti"])
+    return {"revoked": True}
@@ -2,42 +2,70 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import List, Literal
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 
-from app.api.dependencies import DBSession
-from app.models.company import Company
+from app.api.admission import admit
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404, load_transaction_frame
+from app.api.pagination import Keyset, PageParams, date_range, paginate
 from app.models.forecast import Forecast
-from app.models.transaction import Transaction
 from app.schemas.forecast_schema import ForecastResponse
 from app.services.forecasting import forecast_financials
-from app.utils.preprocess import to_dataframe, transactions_to_records
+from app.utils.concurrency import run_cpu
+from app.utils.metrics import stage
+from app.utils.write_behind import persist
 
 router = APIRouter(prefix="/forecast", tags=["forecast"])
+HISTORY = Keyset(Forecast.created_at, Forecast.id, descending=True)
 
 
 @router.post("/{company_id}", response_model=ForecastResponse)
-def create_forecast(company_id: int, db: DBSession) -> ForecastResponse:
-    """Generate forecasts and persist summary."""
-
-    company = db.query(Company).filter(Company.id == company_id).first()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    transactions = db.query(Transaction).filter(Transaction.company_id == company_id).all()
-    frame = to_dataframe(transactions_to_records(transactions))
-    result = forecast_financials(frame)
-    horizons = []
-    for horizon in result["horizons"]:
-        db_forecast = Forecast(
+async def create_forecast(
+    company_id: int,
+    db: AsyncDBSession,
+    horizons: List[int] = Query(default=[30, 60, 90], description="Horizons in days, 30 to 365"),
+    ack: Literal["none", "committed"] | None = None,
+) -> ForecastResponse:
+    """Generate forecasts and persist summary (see ``PERSISTENCE_MODE`` for when it is written)."""
+
+    if any(horizon < 30 or horizon > 365 for horizon in horizons):
+        raise HTTPException(status_code=422, detail="Horizons must be between 30 and 365 days")
+    horizons = sorted(set(horizons))
+    await get_company_or_404(db, company_id)
+    async with admit(db, "forecast", [company_id], horizons=horizons):
+        frame = await load_transaction_frame(db, company_id)
+        with stage("forecast.compute"):
+            result = await run_cpu(forecast_financials, frame, horizons)
+    created_at = datetime.utcnow()
+    db_forecasts = [
+        Forecast(
             company_id=company_id,
             horizon_days=horizon["horizon_days"],
             revenue_projection=horizon["revenue_projection"],
             expense_projection=horizon["expense_projection"],
             runway_days=horizon["runway_days"],
             forecast_payload=result["metadata"],
+            created_at=created_at,
         )
-        db.add(db_forecast)
-        horizons.append(horizon)
-    db.commit()
-    created_at = datetime.utcnow()
-    return ForecastResponse(company_id=company_id, created_at=created_at, horizons=horizons, model_used=result["model_used"], metadata=result["metadata"])
+        for horizon in result["horizons"]
+    ]
+    await persist(db, db_forecasts, ack)
+    return ForecastResponse(company_id=company_id, created_at=created_at, horizons=result["horizons"], model_used=result["model_used"], metadata=result["metadata"])
+
+
+@router.get("/{company_id}")
+async def list_forecasts(
+    company_id: int,
+    db: AsyncDBSession,
+    page: PageParams = Depends(),
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Response:
+    """Forecast history for a company, newest first, optionally created within ``[start, end]``."""
+
+    await get_company_or_404(db, company_id)
+    statement = select(*Forecast.__table__.columns).where(Forecast.company_id == company_id)
+    return await paginate(db, date_range(statement, Forecast.created_at, start, end), HISTORY, page, "db.list_forecasts")
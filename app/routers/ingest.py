@@ -1,44 +1,130 @@
 """Transaction ingestion endpoints."""
 from __future__ import annotations
 
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
 from fastapi import APIRouter, HTTPException
+from sqlalchemy.exc import IntegrityError
 
-from app.api.dependencies import DBSession
-from app.models.company import Company
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404
+from app.config import get_settings
 from app.models.transaction import Transaction
-from app.schemas.transaction_schema import TransactionIngestRequest, TransactionResponse
-from app.utils.preprocess import remove_duplicates, to_dataframe
-from app.utils.validators import ensure_positive_amounts
+from app.schemas.transaction_schema import TransactionIngestRequest, TransactionIngestResponse, TransactionResponse
+from app.services.dedup_index import fingerprint_index, lookup_duplicates, rebuild_company
+from app.services.fx_rates import fx_rates
+from app.services.risk_aggregates import aggregate_cache
+from app.utils.concurrency import run_cpu
+from app.utils.metrics import record_rows, stage
+from app.utils.preprocess import fill_optional_fields, fingerprint_transactions, remove_duplicates, to_dataframe
+from app.utils.validators import BatchValidationReport, validate_transaction_frame
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
+settings = get_settings()
+
+
+def _prepare_batch(
+    records: List[Dict[str, Any]], currencies: List[str], convertible: List[str]
+) -> Tuple[BatchValidationReport, pd.DataFrame]:
+    """Validate, clean and fingerprint a raw batch; runs on the CPU executor."""
+
+    raw = pd.DataFrame(records)
+    report = validate_transaction_frame(raw, currencies, convertible=convertible)
+    frame = to_dataframe(fill_optional_fields(raw[report.valid]))
+    if not frame.empty:
+        frame = remove_duplicates(frame)
+        frame["fingerprint"] = fingerprint_transactions(frame)
+        frame = remove_duplicates(frame, subset=["fingerprint"])
+    return report, frame
+
+
+async def _ingest(payload: TransactionIngestRequest, db: AsyncDBSession) -> TransactionIngestResponse:
+    await get_company_or_404(db, payload.company_id)
+    record_rows("ingest.records", len(payload.records))
+    records = [record.model_dump() for record in payload.records]
+    # Rows the analytics could not convert later are rejected now instead of failing every report.
+    convertible = fx_rates.convertible(settings.supported_currencies, settings.reporting_currency)
+    with stage("ingest.prepare"):
+        report, frame = await run_cpu(_prepare_batch, records, settings.supported_currencies, convertible)
+    if report.errors and not payload.accept_valid:
+        raise HTTPException(status_code=422, detail=report.as_dict())
+    if frame.empty:
+        return TransactionIngestResponse(inserted=[], rejected=report.errors)
+    for attempt in range(2):
+        with stage("ingest.dedup"):
+            known_ids, resent = await lookup_duplicates(
+                db, payload.company_id, frame["unique_id"].tolist(), frame["fingerprint"].tolist()
+            )
+        fresh = frame[~frame["unique_id"].isin(known_ids) & ~frame["fingerprint"].isin(resent)]
+        transactions = [
+            Transaction(
+                company_id=payload.company_id,
+                unique_id=str(record["unique_id"]),
+                amount=record["amount"],
+                category=record["category"],
+                description=record["description"],
+                currency=record["currency"],
+                transaction_date=record["transaction_date"].date(),
+                fingerprint=record["fingerprint"],
+            )
+            for record in fresh.to_dict(orient="records")
+        ]
+        try:
+            with stage("db.commit"):
+                db.add_all(transactions)
+                await db.flush()
+                inserted = [TransactionResponse.model_validate(transaction) for transaction in transactions]
+                await db.commit()
+            break
+        except IntegrityError:
+            # A concurrent batch stored some of these rows after our lookup; look again and retry once.
+            await db.rollback()
+            if attempt:
+                raise HTTPException(status_code=409, detail="Transactions were ingested concurrently; retry the batch")
+    record_rows("ingest.inserted", len(transactions))
+    if transactions:
+        aggregate_cache.pop(payload.company_id)
+    return TransactionIngestResponse(
+        inserted=inserted,
+        rejected=report.errors,
+        duplicates_skipped=report.total_rows - report.invalid_rows - len(transactions),
+    )
+
+
+@router.post("/transactions", response_model=List[TransactionResponse])
+async def ingest_transactions(payload: TransactionIngestRequest, db: AsyncDBSession) -> List[TransactionResponse]:
+    """Validate the batch column-wise, deduplicate, and persist transactions; returns the inserted rows.
+
+    Invalid rows fail the whole batch with a 422 listing every row error, unless ``accept_valid``
+    is set, in which case only valid rows are stored. ``POST /ingest/batches`` also reports them.
+    """
+
+    return (await _ingest(payload, db)).inserted
+
+
+@router.post("/batches", response_model=TransactionIngestResponse)
+async def ingest_batch(payload: TransactionIngestRequest, db: AsyncDBSession) -> TransactionIngestResponse:
+    """Same as ``POST /ingest/transactions``, answering with inserted rows, rejected rows and skipped duplicates."""
+
+    return await _ingest(payload, db)
+
+
+@router.get("/dedup/{company_id}")
+async def dedup_index_stats(company_id: int, db: AsyncDBSession) -> dict:
+    """Report fingerprint index sizing, false-positive rate and lookup latency."""
+
+    await get_company_or_404(db, company_id)
+    stats = fingerprint_index.stats(company_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Dedup index not built yet; it is built on the next ingest or by POST .../rebuild")
+    return stats
+
 
+@router.post("/dedup/{company_id}/rebuild")
+async def rebuild_dedup_index(company_id: int, db: AsyncDBSession) -> dict:
+    """Backfill fingerprints and rebuild the company's Bloom filter from the transactions table."""
 
-@router.post("/transactions", response_model=list[TransactionResponse])
-def ingest_transactions(payload: TransactionIngestRequest, db: DBSession) -> list[TransactionResponse]:
-    """Clean, validate, deduplicate, and persist transactions."""
-
-    company = db.query(Company).filter(Company.id == payload.company_id).first()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    ensure_positive_amounts(record.model_dump() for record in payload.records)
-    frame = to_dataframe([record.model_dump() for record in payload.records])
-    frame = remove_duplicates(frame)
-    responses: list[TransactionResponse] = []
-    for record in frame.to_dict(orient="records"):
-        existing = db.query(Transaction).filter(Transaction.unique_id == record["unique_id"]).first()
-        if existing:
-            continue
-        transaction = Transaction(
-            company_id=payload.company_id,
-            unique_id=record["unique_id"],
-            amount=record["amount"],
-            category=record["category"],
-            description=record.get("description"),
-            currency=record.get("currency", "USD"),
-            transaction_date=record["transaction_date"],
-        )
-        db.add(transaction)
-        db.flush()
-        responses.append(TransactionResponse.model_validate(transaction))
-    db.commit()
-    return responses
+    await get_company_or_404(db, company_id)
+    return await asyncio.to_thread(rebuild_company, company_id)
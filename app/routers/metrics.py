@@ -0,0 +1,16 @@
+"""Prometheus-style metrics endpoint."""
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Expose stage histograms, request latency and DB pool state in Prometheus text format."""
+
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,46 +1,227 @@
 """Risk engine endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Tuple
 
-from app.api.dependencies import DBSession
-from app.models.company import Company
+import pandas as pd
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from sqlalchemy import select
+
+from app.api.admission import admit
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404, load_delta_frame, load_risk_aggregates, load_rule_plan, load_transaction_frame
+from app.api.pagination import Keyset, PageParams, date_range, paginate
+from app.config import get_settings
+from app.database import AsyncSessionLocal
 from app.models.risk_report import RiskReport
-from app.models.transaction import Transaction
-from app.schemas.risk_schema import RiskReportResponse
+from app.schemas.risk_schema import (
+    PortfolioRiskRequest,
+    RiskNarrativeResponse,
+    RiskReportResponse,
+    RiskScenario,
+    WhatIfRequest,
+    WhatIfResponse,
+)
+from app.services.explanation_service import Explanation, explanation_service
+from app.services.risk_aggregates import what_if
 from app.services.risk_engine import generate_risk_report
-from app.utils.preprocess import to_dataframe, transactions_to_records
+from app.services.rules_engine import evaluate_rules_grouped
+from app.utils.concurrency import run_cpu
+from app.utils.metrics import stage
+from app.utils.write_behind import persist
 
 router = APIRouter(prefix="/risk", tags=["risk"])
+settings = get_settings()
+HISTORY = Keyset(RiskReport.created_at, RiskReport.id, descending=True)
+
+
+async def _attach_narrative(report_id: int, payload: Dict[str, object]) -> None:
+    """Generate the narrative after the response was sent and store it on the report."""
+
+    explanation = await explanation_service.explain(payload)
+    async with AsyncSessionLocal() as db:
+        report = await db.get(RiskReport, report_id)
+        if report is None:
+            return
+        report.summary = explanation.text
+        report.narrative_status = "fallback" if explanation.source == "fallback" else "ready"
+        await db.commit()
+
 
+def _narrative(explanation: Explanation | None, payload: Dict[str, object]) -> Tuple[str, str]:
+    if explanation is None:
+        return explanation_service.fallback(payload), "pending"
+    return explanation.text, "fallback" if explanation.source == "fallback" else "ready"
 
-@router.post("/report/{company_id}", response_model=RiskReportResponse)
-def create_risk_report(company_id: int, db: DBSession) -> RiskReportResponse:
-    """Compute risk scores for a company and persist the report."""
 
-    company = db.query(Company).filter(Company.id == company_id).first()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    transactions = db.query(Transaction).filter(Transaction.company_id == company_id).all()
-    frame = to_dataframe(transactions_to_records(transactions))
-    report = generate_risk_report(frame, metadata={"company": company.name})
-    db_report = RiskReport(
+def _to_report(company_id: int, report: Dict[str, Any], summary: str, narrative_status: str) -> RiskReport:
+    return RiskReport(
         company_id=company_id,
         survival_probability=report["survival_probability"],
         heatmap=report["heatmap"],
-        summary=report["summary"],
+        summary=summary,
+        narrative_status=narrative_status,
         report_payload=report["report_payload"],
+        created_at=datetime.utcnow(),
     )
-    db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
+
+
+def _scores(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"metric": component.name, "score": component.score, "description": component.description} for component in report["components"]]
+
+
+def _to_response(db_report: RiskReport, report: Dict[str, Any]) -> RiskReportResponse:
     return RiskReportResponse(
         id=db_report.id,
-        company_id=company_id,
+        company_id=db_report.company_id,
         survival_probability=db_report.survival_probability,
         heatmap=db_report.heatmap,
         summary=db_report.summary,
+        narrative_status=db_report.narrative_status,
         report_payload=db_report.report_payload,
         created_at=db_report.created_at,
-        scores=[{"metric": component.name, "score": component.score, "description": component.description} for component in report["components"]],
+        scores=_scores(report),
     )
+
+
+@router.post("/report/{company_id}", response_model=RiskReportResponse, responses={202: {"description": "Queued for write-behind with ack=none"}})
+async def create_risk_report(
+    company_id: int,
+    db: AsyncDBSession,
+    background_tasks: BackgroundTasks,
+    narrative: Literal["inline", "deferred"] | None = None,
+    ack: Literal["none", "committed"] | None = None,
+) -> RiskReportResponse | Response:
+    """Compute risk scores for a company and persist the report.
+
+    In ``deferred`` narrative mode an uncached narrative is generated after the response: the
+    report is returned with the deterministic summary and ``narrative_status="pending"``.
+    With write-behind persistence and ``ack=none`` the report is queued and the answer is an empty
+    ``202``, since it has no id yet; a pending narrative always waits for the commit to get the id.
+    """
+
+    company = await get_company_or_404(db, company_id)
+    async with admit(db, "risk", [company_id]):
+        frame = await load_transaction_frame(db, company_id)
+        rule_plan = await load_rule_plan(db, [company_id])
+        with stage("risk.report"):
+            report = await run_cpu(generate_risk_report, frame, metadata={"company": company.name}, explain=False, rule_plan=rule_plan)
+    payload = report["summary_payload"]
+    with stage("llm.explain"):
+        if (narrative or settings.llm_narrative_mode) == "deferred":
+            explanation = await explanation_service.cached(payload)
+        else:
+            explanation = await explanation_service.explain(payload)
+    db_report = _to_report(company_id, report, *_narrative(explanation, payload))
+    pending = db_report.narrative_status == "pending"
+    if not await persist(db, [db_report], "committed" if pending else ack):
+        return Response(status_code=202)
+    if pending:
+        background_tasks.add_task(_attach_narrative, db_report.id, payload)
+    return _to_response(db_report, report)
+
+
+@router.post("/portfolio", response_model=List[RiskReportResponse], responses={202: {"description": "Queued for write-behind with ack=none"}})
+async def create_portfolio_reports(
+    request: PortfolioRiskRequest, db: AsyncDBSession, ack: Literal["none", "committed"] | None = None
+) -> List[RiskReportResponse] | Response:
+    """Compute and persist reports for several companies.
+
+    Rules for all companies are evaluated in one grouped pass and the narratives are explained in
+    batched LLM requests. Portfolio runs share one admission tenant, charged for every company.
+    Queued write-behind reports (``ack=none``) are answered with an empty ``202``.
+    """
+
+    company_ids = list(dict.fromkeys(request.company_ids))
+    companies = {company_id: await get_company_or_404(db, company_id) for company_id in company_ids}
+    async with admit(db, "risk", company_ids, tenant="portfolio"):
+        frames = {company_id: await load_transaction_frame(db, company_id) for company_id in company_ids}
+        rule_plan = await load_rule_plan(db, company_ids)
+        combined = pd.concat([frame.assign(company_id=company_id) for company_id, frame in frames.items()], ignore_index=True)
+        with stage("risk.rules"):
+            rules = await run_cpu(evaluate_rules_grouped, combined, "company_id", rule_plan)
+        with stage("risk.report"):
+            reports = await asyncio.gather(
+                *(
+                    run_cpu(
+                        generate_risk_report,
+                        frames[company_id],
+                        metadata={"company": companies[company_id].name},
+                        explain=False,
+                        rules=rules.get(company_id, []),
+                    )
+                    for company_id in company_ids
+                )
+            )
+    by_company = dict(zip(company_ids, reports))
+    with stage("llm.explain"):
+        explanations = await explanation_service.explain_many(
+            {str(company_id): report["summary_payload"] for company_id, report in by_company.items()}
+        )
+    db_reports = [
+        _to_report(company_id, report, *_narrative(explanations[str(company_id)], report["summary_payload"]))
+        for company_id, report in by_company.items()
+    ]
+    if not await persist(db, db_reports, ack):
+        return Response(status_code=202)
+    return [_to_response(db_report, by_company[db_report.company_id]) for db_report in db_reports]
+
+
+def _scenario(report: Dict[str, Any]) -> RiskScenario:
+    return RiskScenario(
+        survival_probability=report["survival_probability"],
+        heatmap=report["heatmap"],
+        scores=_scores(report),
+        rules=report["report_payload"]["rules"],
+    )
+
+
+@router.post("/whatif/{company_id}", response_model=WhatIfResponse)
+async def what_if_risk_report(company_id: int, request: WhatIfRequest, db: AsyncDBSession) -> WhatIfResponse:
+    """Risk with hypothetical transactions added and stored ones removed; nothing is persisted.
+
+    The company's cached aggregates are updated with only the changed rows, so the cost follows
+    the size of the change rather than the length of the history.
+    """
+
+    company = await get_company_or_404(db, company_id)
+    rule_plan = await load_rule_plan(db, [company_id])
+    baseline = await load_risk_aggregates(db, company_id, rule_plan)
+    additions = [{**item.model_dump(), "currency": item.currency.upper()} for item in request.add]
+    delta = await load_delta_frame(db, company_id, additions, request.remove)
+    metadata = {"company": company.name}
+    with stage("risk.whatif"):
+        before, after = await run_cpu(what_if, baseline, delta, rule_plan, metadata)
+    return WhatIfResponse(
+        company_id=company_id,
+        baseline=_scenario(before),
+        scenario=_scenario(after),
+        survival_change=after["survival_probability"] - before["survival_probability"],
+    )
+
+
+@router.get("/reports/{report_id}/narrative", response_model=RiskNarrativeResponse)
+async def get_risk_narrative(report_id: int, db: AsyncDBSession) -> RiskNarrativeResponse:
+    """Poll a report's narrative; ``pending`` until a deferred narrative has been attached."""
+
+    report = await db.get(RiskReport, report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Risk report not found")
+    return RiskNarrativeResponse(id=report.id, narrative_status=report.narrative_status, summary=report.summary)
+
+
+@router.get("/report/{company_id}")
+async def list_risk_reports(
+    company_id: int,
+    db: AsyncDBSession,
+    page: PageParams = Depends(),
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Response:
+    """Risk report history for a company, newest first, optionally created within ``[start, end]``."""
+
+    await get_company_or_404(db, company_id)
+    statement = select(*RiskReport.__table__.columns).where(RiskReport.company_id == company_id)
+    return await paginate(db, date_range(statement, RiskReport.created_at, start, end), HISTORY, page, "db.list_risk_reports")
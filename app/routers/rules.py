@@ -0,0 +1,72 @@
+"""Endpoints for managing stored rule definitions."""
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404
+from app.models.rule_definition import RuleDefinition
+from app.schemas.rule_schema import RuleDefinitionCreate, RuleDefinitionResponse
+from app.services.rule_dsl import RuleCompileError, RuleSpec
+from app.services.rules_engine import build_rule_plan, load_rule_config
+
+router = APIRouter(prefix="/rules", tags=["rules"])
+
+
+@router.get("", response_model=List[RuleDefinitionResponse])
+async def list_rules(db: AsyncDBSession, company_id: int | None = None) -> List[RuleDefinition]:
+    """List stored rules; with ``company_id`` only global rules and that company's rules."""
+
+    query = select(RuleDefinition).order_by(RuleDefinition.id)
+    if company_id is not None:
+        query = query.where((RuleDefinition.company_id.is_(None)) | (RuleDefinition.company_id == company_id))
+    return list((await db.scalars(query)).all())
+
+
+@router.post("", response_model=RuleDefinitionResponse, status_code=201)
+async def create_rule(request: RuleDefinitionCreate, db: AsyncDBSession) -> RuleDefinition:
+    """Store a rule after compiling it with the configured metrics and the rules it would run alongside.
+
+    A global rule may replace a configured rule of the same name. Tenant rules cannot reuse the name
+    of a configured or global rule, since both would then be evaluated for the tenant.
+    """
+
+    if request.company_id is not None:
+        await get_company_or_404(db, request.company_id)
+    existing = await list_rules(db, request.company_id)
+    if any(rule.name == request.name and rule.company_id == request.company_id for rule in existing):
+        raise HTTPException(status_code=409, detail="A rule with this name already exists for the company")
+    if request.company_id is not None:
+        global_names = {rule.name for rule in load_rule_config()[1]} | {rule.name for rule in existing if rule.company_id is None}
+        if request.name in global_names:
+            raise HTTPException(status_code=409, detail="A configured or global rule already uses this name")
+    elif await db.scalar(select(RuleDefinition.id).where(RuleDefinition.name == request.name).limit(1)) is not None:
+        raise HTTPException(status_code=409, detail="A company rule already uses this name")
+    specs = [RuleSpec(rule.name, rule.expression, rule.description, rule.company_id) for rule in existing if rule.enabled]
+    try:
+        build_rule_plan([*specs, RuleSpec(request.name, request.expression, request.description, request.company_id)])
+    except RuleCompileError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    rule = RuleDefinition(**request.model_dump())
+    db.add(rule)
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        raise HTTPException(status_code=409, detail="A rule with this name already exists for the company") from exc
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=204, response_class=Response)
+async def delete_rule(rule_id: int, db: AsyncDBSession) -> Response:
+    """Delete a stored rule."""
+
+    rule = await db.get(RuleDefinition, rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    await db.delete(rule)
+    await db.commit()
+    return Response(status_code=204)
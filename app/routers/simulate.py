@@ -2,39 +2,51 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select
 
-from app.api.dependencies import DBSession
-from app.models.company import Company
+from app.api.admission import admit
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404, load_transaction_frame
+from app.api.pagination import Keyset, PageParams, date_range, paginate
+from app.config import get_settings
 from app.models.simulation import Simulation
-from app.models.transaction import Transaction
 from app.schemas.simulation_schema import SimulationResponse
 from app.services.simulation_engine import run_simulation
-from app.utils.preprocess import to_dataframe, transactions_to_records
+from app.utils.concurrency import run_cpu
+from app.utils.metrics import stage
+from app.utils.write_behind import persist
 
 router = APIRouter(prefix="/simulate", tags=["simulation"])
+settings = get_settings()
+HISTORY = Keyset(Simulation.created_at, Simulation.id, descending=True)
 
 
 @router.post("/{company_id}", response_model=SimulationResponse)
-def simulate_company(company_id: int, db: DBSession) -> SimulationResponse:
-    """Run scenario stress tests."""
-
-    company = db.query(Company).filter(Company.id == company_id).first()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    transactions = db.query(Transaction).filter(Transaction.company_id == company_id).all()
-    frame = to_dataframe(transactions_to_records(transactions))
-    result = run_simulation(frame)
+async def simulate_company(
+    company_id: int,
+    db: AsyncDBSession,
+    iterations: int = Query(default=1000, ge=1, le=settings.simulation_max_iterations),
+    ack: Literal["none", "committed"] | None = None,
+) -> SimulationResponse:
+    """Run scenario stress tests and persist the result (see ``PERSISTENCE_MODE``)."""
+
+    await get_company_or_404(db, company_id)
+    async with admit(db, "simulate", [company_id], iterations=iterations):
+        frame = await load_transaction_frame(db, company_id)
+        with stage("simulate.compute"):
+            result = await run_cpu(run_simulation, frame, iterations)
+    created_at = datetime.utcnow()
     db_simulation = Simulation(
         company_id=company_id,
         insolvency_probability=result["insolvency_probability"],
         summary=result["summary"],
         simulation_payload=result["scenarios"],
+        created_at=created_at,
     )
-    db.add(db_simulation)
-    db.commit()
-    created_at = datetime.utcnow()
+    await persist(db, [db_simulation], ack)
     return SimulationResponse(
         company_id=company_id,
         created_at=created_at,
@@ -42,3 +54,18 @@ def simulate_company(company_id: int, db: DBSession) -> SimulationResponse:
         scenarios=result["scenarios"],
         summary=result["summary"],
     )
+
+
+@router.get("/{company_id}")
+async def list_simulations(
+    company_id: int,
+    db: AsyncDBSession,
+    page: PageParams = Depends(),
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Response:
+    """Simulation history for a company, newest first, optionally created within ``[start, end]``."""
+
+    await get_company_or_404(db, company_id)
+    statement = select(*Simulation.__table__.columns).where(Simulation.company_id == company_id)
+    return await paginate(db, date_range(statement, Simulation.created_at, start, end), HISTORY, page, "db.list_simulations")
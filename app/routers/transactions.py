@@ -0,0 +1,39 @@
+"""Transaction read endpoints."""
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import select
+
+from app.api.dependencies import AsyncDBSession
+from app.api.loaders import get_company_or_404
+from app.api.pagination import Keyset, PageParams, date_range, paginate
+from app.models.transaction import Transaction
+
+router = APIRouter(prefix="/transactions", tags=["transactions"])
+COLUMNS = (
+    Transaction.id,
+    Transaction.unique_id,
+    Transaction.transaction_date,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.category,
+    Transaction.description,
+)
+KEYSET = Keyset(Transaction.transaction_date, Transaction.id)
+
+
+@router.get("/{company_id}")
+async def list_transactions(
+    company_id: int,
+    db: AsyncDBSession,
+    page: PageParams = Depends(),
+    start: date | None = None,
+    end: date | None = None,
+) -> Response:
+    """Page through a company's transactions by date (oldest first), optionally within ``[start, end]``."""
+
+    await get_company_or_404(db, company_id)
+    statement = date_range(select(*COLUMNS).where(Transaction.company_id == company_id), Transaction.transaction_date, start, end)
+    return await paginate(db, statement, KEYSET, page, "db.list_transactions")
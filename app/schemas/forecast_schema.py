@@ -1,8 +1,8 @@
 """Forecast response schemas."""
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class ForecastHorizon(BaseModel):
@@ -13,8 +13,10 @@ class ForecastHorizon(BaseModel):
 
 
 class ForecastResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
     company_id: int
     created_at: datetime
     horizons: List[ForecastHorizon]
     model_used: str
-    metadata: Dict[str, float]
+    metadata: Dict[str, Any]
@@ -1,8 +1,8 @@
 """Risk report schemas."""
-from datetime import datetime
-from typing import Dict, List
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class RiskScore(BaseModel):
@@ -16,7 +16,8 @@ class RiskReportBase(BaseModel):
     survival_probability: float
     heatmap: Dict[str, float]
     summary: str
-    report_payload: Dict[str, float]
+    narrative_status: str = "ready"
+    report_payload: Dict[str, Any]
 
 
 class RiskReportResponse(RiskReportBase):
@@ -24,9 +25,45 @@ class RiskReportResponse(RiskReportBase):
     created_at: datetime
     scores: List[RiskScore]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RiskNarrativeResponse(BaseModel):
+    id: int
+    narrative_status: str
+    summary: str
+
+
+class PortfolioRiskRequest(BaseModel):
+    company_ids: List[int] = Field(min_length=1, max_length=100)
 
 
 class RiskRequest(BaseModel):
     company_id: int
+
+
+class HypotheticalTransaction(BaseModel):
+    amount: float
+    category: str = Field(min_length=1, max_length=255)
+    transaction_date: date
+    currency: str = Field(default="USD", min_length=3, max_length=3)
+    description: Optional[str] = None
+
+
+class WhatIfRequest(BaseModel):
+    add: List[HypotheticalTransaction] = Field(default_factory=list, max_length=10_000)
+    remove: List[str] = Field(default_factory=list, max_length=10_000, description="unique_id of stored transactions to leave out")
+
+
+class RiskScenario(BaseModel):
+    survival_probability: float
+    heatmap: Dict[str, float]
+    scores: List[RiskScore]
+    rules: List[Dict[str, Any]]
+
+
+class WhatIfResponse(BaseModel):
+    company_id: int
+    baseline: RiskScenario
+    scenario: RiskScenario
+    survival_change: float
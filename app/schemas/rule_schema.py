@@ -0,0 +1,19 @@
+"""Rule definition schemas."""
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class RuleDefinitionCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100, pattern=r"^[A-Za-z0-9_.-]+$")
+    expression: str = Field(min_length=1, max_length=1000)
+    description: str = Field(default="", max_length=255)
+    company_id: int | None = None
+    enabled: bool = True
+
+
+class RuleDefinitionResponse(RuleDefinitionCreate):
+    id: int
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
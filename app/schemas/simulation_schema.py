@@ -1,6 +1,6 @@
 """Simulation schemas."""
 from datetime import datetime
-from typing import Dict
+from typing import Any, Dict
 
 from pydantic import BaseModel
 
@@ -10,4 +10,4 @@ class SimulationResponse(BaseModel):
     created_at: datetime
     insolvency_probability: float
     scenarios: Dict[str, float]
-    summary: Dict[str, str]
+    summary: Dict[str, Any]
@@ -1,8 +1,8 @@
 """Pydantic schemas for transactions."""
-from datetime import date
-from typing import List, Optional
+from datetime import date, datetime
+from typing import List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class TransactionBase(BaseModel):
@@ -22,10 +22,34 @@ class TransactionResponse(TransactionBase):
     id: int
     company_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TransactionRecord(BaseModel):
+    """An ingest row; field types are checked on parse, missing values and business rules per row."""
+
+    unique_id: Optional[str] = Field(default=None, description="Unique transaction identifier")
+    amount: Optional[float] = Field(default=None, description="Transaction amount")
+    category: Optional[str] = Field(default=None, description="Transaction category")
+    description: Optional[str] = Field(default=None)
+    currency: Optional[str] = Field(default=None, description="Defaults to USD")
+    transaction_date: Optional[Union[date, datetime]] = Field(default=None, description="Date or ISO timestamp; offsets are converted to UTC")
 
 
 class TransactionIngestRequest(BaseModel):
     company_id: int
-    records: List[TransactionBase]
+    records: List[TransactionRecord] = Field(..., description="Rows validated column-wise as one batch")
+    accept_valid: bool = Field(default=False, description="Persist valid rows and report invalid ones instead of rejecting the batch")
+
+
+class RowError(BaseModel):
+    index: int
+    unique_id: Optional[str] = None
+    field: str
+    reason: str
+
+
+class TransactionIngestResponse(BaseModel):
+    inserted: List[TransactionResponse]
+    rejected: List[RowError] = Field(default_factory=list)
+    duplicates_skipped: int = 0
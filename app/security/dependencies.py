@@ -1,33 +1,60 @@
 """Security-related FastAPI dependencies."""
 from __future__ import annotations
 
+from typing import Any, Dict
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.config import get_settings
+from app.database import AsyncSessionLocal
 from app.models.user import User
 from app.security.auth_handler import verify_token
+from app.security.user_cache import revocation_list, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+settings = get_settings()
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-    """Resolve the authenticated user from the bearer token."""
+async def decode_active_token(token: str) -> Dict[str, Any]:
+    """Decode a bearer token and reject it when invalid or revoked."""
 
     try:
         payload = verify_token(token)
     except JWTError as exc:  # pragma: no cover - jose raises JWTError
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
-    subject = payload.get("sub")
-    if subject is None:
+    if payload.get("sub") is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    await revocation_list.refresh_if_stale()
+    if payload.get("jti") and revocation_list.is_revoked(payload["jti"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return payload
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """Resolve the authenticated user from the bearer token.
+
+    Users are served from :data:`user_cache` and only loaded from the database on a miss; with
+    ``AUTH_TRUST_TOKEN_CLAIMS`` the signed claims are used as-is and the database is never hit.
+    The returned ``User`` is detached from any session.
+    """
+
+    payload = await decode_active_token(token)
+    subject = payload["sub"]
     try:
         user_id = int(subject)
     except (TypeError, ValueError) as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token subject") from exc
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    if settings.auth_trust_token_claims:
+        return User(id=user_id, email=payload.get("email"))
+    token_id = payload.get("jti") or token
+    cached = user_cache.get(subject, token_id)
+    if cached is None:
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        cached = {"id": user.id, "email": user.email, "created_at": user.created_at}
+        user_cache.put(subject, token_id, cached)
+    return User(**cached)
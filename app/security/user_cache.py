@@ -0,0 +1,95 @@
+"""In-process caches for the authentication hot path."""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import event, select
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.utils.cache import TTLCache
+from app.utils.metrics import REGISTRY
+
+settings = get_settings()
+CacheKey = Tuple[str, str]
+
+
+class UserCache:
+    """Resolved users keyed by (subject, token id), held in a :class:`TTLCache`."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self._cache: TTLCache[CacheKey, Dict[str, Any]] = TTLCache(max_entries, ttl_seconds)
+
+    def get(self, subject: str, token_id: str) -> Dict[str, Any] | None:
+        return self._cache.get((subject, token_id))
+
+    def put(self, subject: str, token_id: str, user: Dict[str, Any]) -> None:
+        self._cache.put((subject, token_id), user)
+
+    def invalidate(self, subject: str | None = None, token_id: str | None = None) -> None:
+        """Drop one token's entry, every entry for a subject, or (no arguments) everything."""
+
+        if subject is None:
+            self._cache.clear()
+        elif token_id is not None:
+            self._cache.pop((subject, token_id))
+        else:
+            self._cache.pop_matching(lambda key: key[0] == subject)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        return self._cache.samples()
+
+
+class RevocationList:
+    """Revoked token ids mirrored from ``revoked_tokens``.
+
+    Revocations made by this process apply immediately; those made by other workers are picked up
+    by a single query at most every ``refresh_seconds``.
+    """
+
+    def __init__(self, refresh_seconds: float) -> None:
+        self.refresh_seconds = refresh_seconds
+        self._revoked: Dict[str, datetime] = {}
+        self._refreshed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def is_revoked(self, token_id: str) -> bool:
+        return token_id in self._revoked
+
+    def add(self, token_id: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked[token_id] = expires_at
+
+    async def refresh_if_stale(self) -> None:
+        now = time.monotonic()
+        if now - self._refreshed_at < self.refresh_seconds:
+            return
+        # Claim the refresh before awaiting so concurrent requests do not all query.
+        self._refreshed_at = now
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > datetime.utcnow())
+            )
+            snapshot = dict(rows.all())
+        # Merge rather than replace: a local revocation made while the query ran is not in the snapshot.
+        now = datetime.utcnow()
+        with self._lock:
+            revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+            revoked.update(snapshot)
+            self._revoked = revoked
+
+
+user_cache = UserCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
+revocation_list = RevocationList(settings.auth_revocation_refresh_seconds)
+REGISTRY.gauge("risk_engine_auth_user_cache", "Authenticated user cache hits, misses and size.", ["stat"], user_cache.samples)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User) -> None:
+    user_cache.invalidate(str(target.id))
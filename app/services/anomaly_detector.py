@@ -5,8 +5,6 @@ from typing import Dict, List
 
 import numpy as np
 import pandas as pd
-from sklearn.cluster import DBSCAN
-from sklearn.ensemble import IsolationForest
 
 
 class AnomalyResult(Dict[str, object]):
@@ -18,6 +16,10 @@ def detect_anomalies(frame: pd.DataFrame) -> AnomalyResult:
 
     if frame.empty:
         return AnomalyResult({"message": "No data supplied", "flags": []})
+    # sklearn is imported on first use to keep it out of application start-up.
+    from sklearn.cluster import DBSCAN
+    from sklearn.ensemble import IsolationForest
+
     amounts = frame[["amount"]].values
     iso = IsolationForest(contamination=0.1, random_state=42).fit(amounts)
     iso_flags = iso.predict(amounts) == -1
@@ -0,0 +1,276 @@
+"""Per-company transaction fingerprint index with an in-memory Bloom-filter front."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.transaction import Transaction
+from app.utils.preprocess import fingerprint_transactions, transactions_to_records
+
+settings = get_settings()
+_IN_CLAUSE_CHUNK = 500
+
+
+def _chunked(values: List[str], size: int = _IN_CLAUSE_CHUNK) -> Iterator[List[str]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex fingerprints using double hashing."""
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        self.capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint: str) -> Iterator[int]:
+        digest = bytes.fromhex(fingerprint)
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, fingerprint: str) -> None:
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+    def estimated_false_positive_rate(self) -> float:
+        """Theoretical false-positive rate for the current fill level."""
+
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+@dataclass
+class IndexStats:
+    """Lookup counters for one company's index."""
+
+    rows_checked: int = 0
+    bloom_rejections: int = 0
+    db_checked: int = 0
+    duplicates: int = 0
+    false_positives: int = 0
+    batches: int = 0
+    lookup_seconds: float = 0.0
+    rebuild_seconds: float = 0.0
+
+
+@dataclass
+class _CompanyIndex:
+    bloom: BloomFilter
+    watermark: int = 0
+    scanned_at: datetime = field(default_factory=datetime.utcnow)
+    stats: IndexStats = field(default_factory=IndexStats)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class FingerprintIndex:
+    """Registry of per-company Bloom filters backed by ``transactions.fingerprint``.
+
+    The filter answers "definitely new" for most novel rows so only probable duplicates are
+    checked against the database. Each lookup first folds in rows with an id above the last
+    seen watermark, which keeps the filter current when other workers insert transactions.
+    A concurrent writer can commit ids below the watermark after they were passed, so rows
+    created within ``DEDUP_RESCAN_SECONDS`` of the previous catch-up are read again too.
+    """
+
+    def __init__(self, expected_items: int | None = None, false_positive_rate: float | None = None) -> None:
+        self.expected_items = expected_items or settings.dedup_expected_transactions
+        self.false_positive_rate = false_positive_rate or settings.dedup_false_positive_rate
+        self._companies: Dict[int, _CompanyIndex] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session, company_id: int) -> _CompanyIndex:
+        """Backfill missing fingerprints for the company and rebuild its filter from the table."""
+
+        start = time.perf_counter()
+        scanned_at = datetime.utcnow()
+        backfill_fingerprints(db, company_id)
+        rows = db.execute(
+            select(Transaction.id, Transaction.fingerprint).where(Transaction.company_id == company_id)
+        ).all()
+        bloom = BloomFilter(max(self.expected_items, 2 * len(rows)), self.false_positive_rate)
+        for _, fingerprint in rows:
+            bloom.add(fingerprint)
+        entry = _CompanyIndex(bloom=bloom, watermark=max((row_id for row_id, _ in rows), default=0), scanned_at=scanned_at)
+        entry.stats.rebuild_seconds = time.perf_counter() - start
+        with self._lock:
+            self._companies[company_id] = entry
+        return entry
+
+    def forget(self, company_id: int) -> None:
+        """Drop the company's filter; the next lookup rebuilds it from the table."""
+
+        with self._lock:
+            self._companies.pop(company_id, None)
+
+    async def _current(self, db: AsyncSession, company_id: int) -> _CompanyIndex:
+        entry = self._companies.get(company_id)
+        if entry is None:
+            return await asyncio.to_thread(self._rebuild_in_session, company_id)
+        scanned_at = datetime.utcnow()
+        recent = entry.scanned_at - timedelta(seconds=settings.dedup_rescan_seconds)
+        rows = (
+            await db.execute(
+                select(Transaction.id, Transaction.fingerprint).where(
+                    Transaction.company_id == company_id,
+                    or_(Transaction.id > entry.watermark, Transaction.created_at >= recent),
+                )
+            )
+        ).all()
+        if any(fingerprint is None for _, fingerprint in rows):
+            return await asyncio.to_thread(self._rebuild_in_session, company_id)
+        with entry.lock:
+            for row_id, fingerprint in rows:
+                # Rescanned rows are mostly indexed already; only count fingerprints the filter lacks.
+                if fingerprint not in entry.bloom:
+                    entry.bloom.add(fingerprint)
+                entry.watermark = max(entry.watermark, row_id)
+            entry.scanned_at = max(entry.scanned_at, scanned_at)
+        if entry.bloom.count > entry.bloom.capacity:
+            return await asyncio.to_thread(self._rebuild_in_session, company_id)
+        return entry
+
+    def _rebuild_in_session(self, company_id: int) -> _CompanyIndex:
+        # A rebuild reads the company's whole table and may backfill fingerprints, so it runs on a
+        # worker thread with its own session rather than holding up the request's.
+        with SessionLocal() as db:
+            entry = self.rebuild(db, company_id)
+            db.commit()
+        return entry
+
+    async def find_existing(self, db: AsyncSession, company_id: int, fingerprints: Iterable[str]) -> Set[str]:
+        """Return the subset of ``fingerprints`` already stored for the company."""
+
+        start = time.perf_counter()
+        fingerprints = list(fingerprints)
+        entry = await self._current(db, company_id)
+        with entry.lock:
+            candidates = [fingerprint for fingerprint in fingerprints if fingerprint in entry.bloom]
+        existing: Set[str] = set()
+        for chunk in _chunked(candidates):
+            existing.update(
+                await db.scalars(
+                    select(Transaction.fingerprint).where(
+                        Transaction.company_id == company_id, Transaction.fingerprint.in_(chunk)
+                    )
+                )
+            )
+        with entry.lock:
+            stats = entry.stats
+            stats.rows_checked += len(fingerprints)
+            stats.bloom_rejections += len(fingerprints) - len(candidates)
+            stats.db_checked += len(candidates)
+            stats.duplicates += sum(1 for fingerprint in candidates if fingerprint in existing)
+            stats.false_positives += sum(1 for fingerprint in candidates if fingerprint not in existing)
+            stats.batches += 1
+            stats.lookup_seconds += time.perf_counter() - start
+        return existing
+
+    def stats(self, company_id: int) -> Dict[str, object] | None:
+        """Return filter sizing, false-positive rates and lookup latency for a company."""
+
+        entry = self._companies.get(company_id)
+        if entry is None:
+            return None
+        with entry.lock:
+            bloom, stats = entry.bloom, entry.stats
+            novel = stats.false_positives + stats.bloom_rejections
+            return {
+                "company_id": company_id,
+                "indexed_fingerprints": bloom.count,
+                "capacity": bloom.capacity,
+                "bit_size": bloom.size,
+                "hash_count": bloom.hash_count,
+                "estimated_false_positive_rate": bloom.estimated_false_positive_rate(),
+                "observed_false_positive_rate": stats.false_positives / novel if novel else 0.0,
+                "rows_checked": stats.rows_checked,
+                "bloom_rejections": stats.bloom_rejections,
+                "db_checked": stats.db_checked,
+                "duplicates": stats.duplicates,
+                "false_positives": stats.false_positives,
+                "batches": stats.batches,
+                "avg_lookup_ms": stats.lookup_seconds / stats.batches * 1000 if stats.batches else 0.0,
+                "avg_lookup_us_per_row": stats.lookup_seconds / stats.rows_checked * 1e6 if stats.rows_checked else 0.0,
+                "rebuild_ms": stats.rebuild_seconds * 1000,
+            }
+
+
+def backfill_fingerprints(db: Session, company_id: int | None = None, batch_rows: int = 5_000) -> int:
+    """Fill ``transactions.fingerprint`` for rows stored before it existed; flushes each batch, the caller commits.
+
+    Rows duplicating an already-fingerprinted row of the same company get a fingerprint salted with
+    their ``unique_id``, so ``uq_transactions_company_fingerprint`` can be created over legacy data.
+    """
+
+    filled = 0
+    while True:
+        query = select(Transaction).where(Transaction.fingerprint.is_(None)).order_by(Transaction.id).limit(batch_rows)
+        if company_id is not None:
+            query = query.where(Transaction.company_id == company_id)
+        missing = db.scalars(query).all()
+        if not missing:
+            return filled
+        fingerprints = fingerprint_transactions(pd.DataFrame(transactions_to_records(missing)))
+        taken: Set[Tuple[int, str]] = set()
+        for chunk in _chunked(sorted(set(fingerprints))):
+            taken.update(
+                db.execute(select(Transaction.company_id, Transaction.fingerprint).where(Transaction.fingerprint.in_(chunk))).tuples()
+            )
+        for transaction, fingerprint in zip(missing, fingerprints, strict=True):
+            if (transaction.company_id, fingerprint) in taken:
+                # Already-stored duplicates keep a row-specific fingerprint so the unique index holds;
+                # the first copy keeps the content fingerprint that catches future resends.
+                fingerprint = hashlib.blake2b(f"{fingerprint}|{transaction.unique_id}".encode("utf-8"), digest_size=16).hexdigest()
+            taken.add((transaction.company_id, fingerprint))
+            transaction.fingerprint = fingerprint
+        db.flush()
+        filled += len(missing)
+
+
+async def existing_unique_ids(db: AsyncSession, unique_ids: Iterable[str]) -> Set[str]:
+    """Return the subset of ``unique_ids`` already persisted, using chunked ``IN`` queries."""
+
+    existing: Set[str] = set()
+    for chunk in _chunked(list(unique_ids)):
+        existing.update(await db.scalars(select(Transaction.unique_id).where(Transaction.unique_id.in_(chunk))))
+    return existing
+
+
+fingerprint_index = FingerprintIndex()
+
+
+def rebuild_company(company_id: int) -> Dict[str, object] | None:
+    """Rebuild a company's filter in its own session, for a worker thread; commits backfilled fingerprints."""
+
+    fingerprint_index._rebuild_in_session(company_id)
+    return fingerprint_index.stats(company_id)
+
+
+async def lookup_duplicates(
+    db: AsyncSession, company_id: int, unique_ids: List[str], fingerprints: List[str]
+) -> Tuple[Set[str], Set[str]]:
+    """Known ``unique_ids`` and already-stored ``fingerprints``, read through the request's session.
+
+    A first lookup rebuilds the company's filter from the whole table on a worker thread.
+    """
+
+    return await existing_unique_ids(db, unique_ids), await fingerprint_index.find_existing(db, company_id, fingerprints)
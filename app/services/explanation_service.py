@@ -0,0 +1,323 @@
+"""Cached, concurrency-limited generation of risk narratives."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.llm_explanation import LLMExplanation
+from app.services.llm_explainer import (
+    AsyncLLMProvider,
+    BatchLLMProvider,
+    LLMProvider,
+    _build_prompt,
+    _fallback_summary,
+    default_provider,
+    explain_risk,
+    provider_identity,
+)
+from app.utils.cache import TTLCache
+from app.utils.metrics import REGISTRY, stage
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+_UNSET: Any = object()
+
+
+@dataclass
+class Explanation:
+    """A narrative plus where it came from: ``memory``, ``store``, ``llm``, ``coalesced`` or ``fallback``.
+
+    ``coalesced`` marks a request that waited on an identical in-flight provider call.
+    """
+
+    text: str
+    source: str
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def explanation_key(payload: Dict[str, object], provider: LLMProvider) -> str:
+    """Content hash of the normalized payload and the provider's model settings."""
+
+    body = json.dumps(
+        {
+            "payload": _normalize(payload),
+            "provider": provider_identity(provider),
+            "prompt_token_budget": settings.llm_prompt_token_budget,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class ExplanationService:
+    """Serves narratives from an LRU+TTL memory tier and the ``llm_explanations`` table.
+
+    Misses call the provider under a concurrency limit and timeout; identical payloads requested
+    concurrently share one call. Provider errors and timeouts fall back to the deterministic
+    summary, which is never cached so the next request retries the LLM.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.llm_cache_enabled,
+        max_entries: int = settings.llm_cache_max_entries,
+        ttl_seconds: float = settings.llm_cache_ttl_seconds,
+        persist: bool = settings.llm_cache_persist,
+        persist_ttl_seconds: float = settings.llm_cache_persist_ttl_seconds,
+        max_concurrency: int = settings.llm_max_concurrency,
+        timeout_seconds: float = settings.llm_timeout_seconds,
+        batch_size: int = settings.llm_batch_size,
+    ) -> None:
+        self.enabled = enabled
+        self.memory: TTLCache[str, str] = TTLCache(max_entries, ttl_seconds)
+        self.persist = enabled and persist
+        self.persist_ttl = timedelta(seconds=persist_ttl_seconds)
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.batch_size = batch_size
+        self.outcomes: Counter = Counter()
+        self._provider: Any = _UNSET
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._limiter: asyncio.Semaphore | None = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sync_executor: ThreadPoolExecutor | None = None
+
+    def provider(self, provider: LLMProvider | None = None) -> LLMProvider | None:
+        if provider is not None:
+            return provider
+        if self._provider is _UNSET:
+            self._provider = default_provider()
+        return self._provider
+
+    def fallback(self, payload: Dict[str, object]) -> str:
+        return _fallback_summary(payload)
+
+    def explain_sync(self, payload: Dict[str, object], provider: LLMProvider | None = None) -> str:
+        """Blocking variant for CPU-executor callers; uses the memory tier only.
+
+        Provider calls get the same timeout and fallback as :meth:`explain`. A timed-out call
+        keeps running on its worker thread, but the caller is not held up by it.
+        """
+
+        provider = self.provider(provider)
+        if provider is None:
+            return _fallback_summary(payload)
+        key = explanation_key(payload, provider)
+        text = self.memory.get(key) if self.enabled else None
+        if text is not None:
+            return text
+        if self._sync_executor is None:
+            # Created lazily so process-pool workers that import this module don't spawn threads.
+            self._sync_executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        try:
+            with stage("llm.provider"):
+                text = self._sync_executor.submit(explain_risk, payload, provider).result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            logger.warning("LLM explanation timed out after %.1fs; using fallback summary", self.timeout_seconds)
+            return _fallback_summary(payload)
+        except Exception:  # noqa: BLE001 - any provider failure degrades to the deterministic summary
+            logger.warning("LLM explanation failed; using fallback summary", exc_info=True)
+            return _fallback_summary(payload)
+        if self.enabled:
+            self.memory.put(key, text)
+        return text
+
+    async def cached(self, payload: Dict[str, object], provider: LLMProvider | None = None) -> Explanation | None:
+        """Return a cached narrative without calling the provider."""
+
+        provider = self.provider(provider)
+        if provider is None or not self.enabled:
+            return None
+        hit = await self._lookup(explanation_key(payload, provider))
+        return self._record(hit) if hit is not None else None
+
+    async def explain(self, payload: Dict[str, object], provider: LLMProvider | None = None) -> Explanation:
+        provider = self.provider(provider)
+        if provider is None:
+            return self._record(Explanation(_fallback_summary(payload), "fallback"))
+        key = explanation_key(payload, provider)
+        if self.enabled:
+            hit = await self._lookup(key)
+            if hit is not None:
+                return self._record(hit)
+        return self._record(await self._coalesced(key, payload, provider))
+
+    async def explain_many(
+        self, payloads: Dict[str, Dict[str, object]], provider: LLMProvider | None = None
+    ) -> Dict[str, Explanation]:
+        """Explain several reports keyed by name, e.g. one per company in a portfolio run.
+
+        Cache misses are packed ``batch_size`` at a time into single requests when the provider
+        supports :class:`BatchLLMProvider`, otherwise dispatched concurrently under the same
+        concurrency limit as single calls. Every name gets a result; names the provider failed
+        to answer fall back individually.
+        """
+
+        provider = self.provider(provider)
+        if provider is None:
+            return {
+                name: self._record(Explanation(_fallback_summary(payload), "fallback")) for name, payload in payloads.items()
+            }
+        results: Dict[str, Explanation] = {}
+        misses: Dict[str, Dict[str, object]] = {}
+        for name, payload in payloads.items():
+            hit = await self._lookup(explanation_key(payload, provider)) if self.enabled else None
+            if hit is not None:
+                results[name] = self._record(hit)
+            else:
+                misses[name] = payload
+        batch_size = min(self.batch_size, getattr(provider, "max_batch_size", self.batch_size))
+        if misses and isinstance(provider, BatchLLMProvider) and batch_size > 1:
+            limiter = self._bind_loop()
+            names = list(misses)
+            chunks = [
+                {name: misses[name] for name in names[start : start + batch_size]}
+                for start in range(0, len(names), batch_size)
+            ]
+            for chunk_results in await asyncio.gather(*(self._generate_batch(chunk, provider, limiter) for chunk in chunks)):
+                results.update({name: self._record(explanation) for name, explanation in chunk_results.items()})
+        elif misses:
+            explained = await asyncio.gather(
+                *(self._coalesced(explanation_key(payload, provider), payload, provider) for payload in misses.values())
+            )
+            results.update({name: self._record(explanation) for name, explanation in zip(misses, explained)})
+        return {name: results[name] for name in payloads}
+
+    async def _coalesced(self, key: str, payload: Dict[str, object], provider: LLMProvider) -> Explanation:
+        limiter = self._bind_loop()
+        pending = self._inflight.get(key)
+        if pending is not None:
+            shared = await asyncio.shield(pending)
+            return shared if shared.source == "fallback" else Explanation(shared.text, "coalesced")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._generate(key, payload, provider, limiter)
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop; rebuild them if the app runs on a new one.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._limiter, self._inflight = loop, asyncio.Semaphore(self.max_concurrency), {}
+        return self._limiter  # type: ignore[return-value]
+
+    async def _generate(
+        self, key: str, payload: Dict[str, object], provider: LLMProvider, limiter: asyncio.Semaphore
+    ) -> Explanation:
+        prompt = _build_prompt(payload)
+        async with limiter:
+            try:
+                with stage("llm.provider"):
+                    call = provider.aexplain(prompt) if isinstance(provider, AsyncLLMProvider) else asyncio.to_thread(provider.explain, prompt)
+                    text = await asyncio.wait_for(call, self.timeout_seconds)
+            except asyncio.TimeoutError:
+                logger.warning("LLM explanation timed out after %.1fs; using fallback summary", self.timeout_seconds)
+                return Explanation(_fallback_summary(payload), "fallback")
+            except Exception:  # noqa: BLE001 - any provider failure degrades to the deterministic summary
+                logger.warning("LLM explanation failed; using fallback summary", exc_info=True)
+                return Explanation(_fallback_summary(payload), "fallback")
+        await self._remember(key, provider, text)
+        return Explanation(text, "llm")
+
+    async def _generate_batch(
+        self, payloads: Dict[str, Dict[str, object]], provider: LLMProvider, limiter: asyncio.Semaphore
+    ) -> Dict[str, Explanation]:
+        prompts = {name: _build_prompt(payload) for name, payload in payloads.items()}
+        texts: Dict[str, str] = {}
+        async with limiter:
+            try:
+                with stage("llm.provider_batch"):
+                    batch_call = getattr(provider, "aexplain_batch", None)
+                    call = batch_call(prompts) if batch_call is not None else asyncio.to_thread(provider.explain_batch, prompts)
+                    # Packed requests generate one narrative per report, so allow proportionally longer.
+                    texts = await asyncio.wait_for(call, self.timeout_seconds * len(prompts))
+            except asyncio.TimeoutError:
+                logger.warning("Batched LLM explanation of %d reports timed out; using fallback summaries", len(prompts))
+            except Exception:  # noqa: BLE001 - any provider failure degrades to the deterministic summaries
+                logger.warning("Batched LLM explanation failed; using fallback summaries", exc_info=True)
+        missing: List[str] = [name for name in payloads if not texts.get(name)]
+        if missing and texts:
+            logger.warning("Batched LLM response omitted %d of %d reports; using fallback summaries", len(missing), len(payloads))
+        results = {}
+        for name, payload in payloads.items():
+            text = texts.get(name)
+            if not text:
+                results[name] = Explanation(_fallback_summary(payload), "fallback")
+                continue
+            await self._remember(explanation_key(payload, provider), provider, text)
+            results[name] = Explanation(text, "llm")
+        return results
+
+    async def _remember(self, key: str, provider: LLMProvider, text: str) -> None:
+        if self.enabled:
+            self.memory.put(key, text)
+            if self.persist:
+                await self._store(key, provider, text)
+
+    async def _lookup(self, key: str) -> Explanation | None:
+        text = self.memory.get(key)
+        if text is not None:
+            return Explanation(text, "memory")
+        if not self.persist:
+            return None
+        try:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(LLMExplanation, key)
+        except SQLAlchemyError:
+            logger.warning("Explanation store lookup failed", exc_info=True)
+            return None
+        if row is None or row.created_at < datetime.utcnow() - self.persist_ttl:
+            return None
+        self.memory.put(key, row.summary)
+        return Explanation(row.summary, "store")
+
+    async def _store(self, key: str, provider: LLMProvider, text: str) -> None:
+        model = str(provider_identity(provider)["model"] or type(provider).__qualname__)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(LLMExplanation(cache_key=key, model=model[:128], summary=text, created_at=datetime.utcnow()))
+                await db.commit()
+        except SQLAlchemyError:
+            logger.warning("Explanation store write failed", exc_info=True)
+
+    def _record(self, explanation: Explanation) -> Explanation:
+        self.outcomes[explanation.source] += 1
+        return explanation
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        samples = {(f"memory_{name}",): value for (name,), value in self.memory.samples().items()}
+        samples.update({(f"source_{source}",): float(count) for source, count in self.outcomes.items()})
+        return samples
+
+
+explanation_service = ExplanationService()
+REGISTRY.gauge("risk_engine_llm_explanations", "LLM explanation cache state and outcomes by source.", ["stat"], explanation_service.samples)
@@ -5,7 +5,6 @@ from typing import Dict, List
 
 import numpy as np
 import pandas as pd
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
 
 
 class ForecastResult(Dict[str, object]):
@@ -24,6 +23,9 @@ def _prepare_series(frame: pd.DataFrame) -> pd.Series:
 def forecast_financials(frame: pd.DataFrame, horizons: List[int] | None = None) -> ForecastResult:
     """Create revenue/expense projections for the specified horizons."""
 
+    # statsmodels is imported on first use to keep it out of application start-up.
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
     horizons = horizons or [30, 60, 90]
     series = _prepare_series(frame)
     model_used = "exponential_smoothing"
@@ -0,0 +1,211 @@
+"""Date-indexed FX rate table with vectorized as-of conversion to the reporting currency."""
+from __future__ import annotations
+
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import get_settings
+from app.utils.metrics import REGISTRY, stage
+
+settings = get_settings()
+RATE_COLUMNS = ["date", "base", "quote", "rate"]
+_TAIL_BYTES = 64
+Pair = Tuple[str, str]
+
+
+class FxRateError(ValueError):
+    """Raised when a currency cannot be converted into the reporting currency."""
+
+
+@dataclass
+class _PairRates:
+    dates: np.ndarray  # datetime64[ns], sorted and unique
+    rates: np.ndarray
+
+    def merge(self, dates: np.ndarray, rates: np.ndarray) -> "_PairRates":
+        return _sorted_rates(np.concatenate([self.dates, dates]), np.concatenate([self.rates, rates]))
+
+    def asof(self, dates: np.ndarray) -> np.ndarray:
+        """Rate in effect on each date; dates before the first quote use the first quote."""
+
+        index = np.searchsorted(self.dates, dates, side="right") - 1
+        return self.rates[np.clip(index, 0, None)]
+
+
+def _sorted_rates(dates: np.ndarray, rates: np.ndarray) -> _PairRates:
+    order = np.argsort(dates, kind="stable")
+    dates, rates = dates[order], rates[order]
+    # Keep the last quote for a date so appended corrections win.
+    last = np.append(dates[1:] != dates[:-1], True)
+    return _PairRates(dates[last], rates[last])
+
+
+class FxRateTable:
+    """Rates from an append-only CSV of ``date,base,quote,rate`` rows (1 ``base`` = ``rate`` ``quote``).
+
+    Each pair is held as sorted date and rate arrays. :meth:`refresh` parses only the bytes
+    appended since the last load. It re-reads the whole file when it was replaced, truncated
+    or rewritten in place, detected by the bytes before the last offset no longer matching.
+    Conversions use the direct pair, its inverse, or a cross rate through ``pivot``.
+
+    Updates build a new pair mapping and publish it with one assignment, so conversions running
+    on other threads read ``_pairs`` without the lock and always see a complete table.
+    """
+
+    def __init__(self, path: str | None, pivot: str = "USD", reload_seconds: float = 60.0) -> None:
+        self.path = path
+        self.pivot = pivot.upper()
+        self.reload_seconds = reload_seconds
+        self.rows_loaded = 0
+        self.reloads = 0
+        self._pairs: Dict[Pair, _PairRates] = {}
+        self._offset = 0
+        self._tail = b""
+        self._file_id: Tuple[int, int] | None = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def add_rates(self, rates: pd.DataFrame) -> None:
+        """Merge ``date, base, quote, rate`` rows into the table."""
+
+        with self._lock:
+            self._pairs = self._merged(self._pairs, rates)
+            self.rows_loaded += len(rates)
+
+    @staticmethod
+    def _merged(pairs: Dict[Pair, _PairRates], rates: pd.DataFrame) -> Dict[Pair, _PairRates]:
+        """Copy of ``pairs`` with ``rates`` merged in; the existing arrays are never modified."""
+
+        if rates.empty:
+            return pairs
+        pairs = dict(pairs)
+        rates = rates.assign(
+            date=pd.to_datetime(rates["date"], format="ISO8601"),
+            base=rates["base"].astype(str).str.strip().str.upper(),
+            quote=rates["quote"].astype(str).str.strip().str.upper(),
+            rate=pd.to_numeric(rates["rate"]),
+        )
+        for (base, quote), group in rates.groupby(["base", "quote"], sort=False):
+            dates, values = group["date"].to_numpy("datetime64[ns]"), group["rate"].to_numpy(dtype=float)
+            existing = pairs.get((base, quote))
+            pairs[(base, quote)] = existing.merge(dates, values) if existing else _sorted_rates(dates, values)
+        return pairs
+
+    def refresh(self) -> None:
+        """Load rows appended to the CSV since the last call (or everything after a rewrite)."""
+
+        if not self.path:
+            return
+        with self._lock:
+            stat = os.stat(self.path)
+            file_id = (stat.st_dev, stat.st_ino)
+            pairs, offset, rows_loaded, tail = self._pairs, self._offset, self.rows_loaded, self._tail
+            with open(self.path, "rb") as handle:
+                if offset:
+                    handle.seek(offset - len(tail))
+                    if file_id != self._file_id or stat.st_size < offset or handle.read(len(tail)) != tail:
+                        pairs, offset, rows_loaded, tail = {}, 0, 0, b""
+                handle.seek(offset)
+                chunk = handle.read(stat.st_size - offset)
+            # Only parse complete lines; a partially written last line is picked up next time.
+            complete = chunk[: chunk.rfind(b"\n") + 1]
+            if complete:
+                header = 0 if offset == 0 else None
+                rows = pd.read_csv(io.StringIO(complete.decode("utf-8")), header=header, names=None if header == 0 else RATE_COLUMNS)
+                pairs = self._merged(pairs, rows[RATE_COLUMNS])
+                rows_loaded += len(rows)
+                offset += len(complete)
+                tail = (tail + complete)[-_TAIL_BYTES:]
+                self.reloads += 1
+            self._pairs, self._offset, self._file_id, self.rows_loaded, self._tail = pairs, offset, file_id, rows_loaded, tail
+
+    def refresh_if_stale(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_seconds:
+            self._checked_at = now
+            self.refresh()
+
+    def rates(self, currency: str, target: str, dates: np.ndarray, pairs: Dict[Pair, _PairRates] | None = None) -> np.ndarray:
+        """As-of rates converting ``currency`` into ``target`` on each of ``dates``."""
+
+        pairs = self._pairs if pairs is None else pairs
+        if currency == target:
+            return np.ones(len(dates))
+        if (currency, target) in pairs:
+            return pairs[(currency, target)].asof(dates)
+        if (target, currency) in pairs:
+            return 1.0 / pairs[(target, currency)].asof(dates)
+        if self.pivot not in (currency, target):
+            return self.rates(currency, self.pivot, dates, pairs) * self.rates(self.pivot, target, dates, pairs)
+        raise KeyError((currency, target))
+
+    def convertible(self, currencies: List[str], target: str) -> List[str]:
+        """The subset of ``currencies`` that has a rate path into ``target``."""
+
+        self.refresh_if_stale()
+        pairs, target, no_dates = self._pairs, target.upper(), np.empty(0, dtype="datetime64[ns]")
+        result = []
+        for currency in currencies:
+            try:
+                self.rates(currency.upper(), target, no_dates, pairs)
+            except KeyError:
+                continue
+            result.append(currency)
+        return result
+
+    def convert(self, frame: pd.DataFrame, target: str) -> pd.DataFrame:
+        """Return ``frame`` with ``amount`` in ``target``; originals are kept in ``original_amount``/``original_currency``.
+
+        Each foreign currency is converted with one vectorized as-of lookup over its rows.
+        """
+
+        if frame.empty or "currency" not in frame:
+            return frame
+        target = target.upper()
+        # Factorize once so per-currency masks compare integer codes instead of strings.
+        codes, uniques = pd.factorize(frame["currency"].fillna(target))
+        names = pd.Index(uniques).astype(str).str.upper()
+        if (names == target).all():
+            return frame
+        self.refresh_if_stale()
+        pairs = self._pairs
+        dates = frame["transaction_date"].to_numpy("datetime64[ns]")
+        factors = np.ones(len(frame))
+        missing: List[str] = []
+        for index, code in enumerate(names):
+            if code == target:
+                continue
+            mask = codes == index
+            try:
+                factors[mask] = self.rates(code, target, dates[mask], pairs)
+            except KeyError:
+                missing.append(code)
+        if missing:
+            raise FxRateError(f"No FX rates to convert {', '.join(sorted(set(missing)))} into {target}")
+        return frame.assign(
+            original_amount=frame["amount"],
+            original_currency=names.to_numpy()[codes],
+            amount=frame["amount"].to_numpy(dtype=float) * factors,
+            currency=target,
+        )
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        return {("pairs",): float(len(self._pairs)), ("rows",): float(self.rows_loaded), ("reloads",): float(self.reloads)}
+
+
+fx_rates = FxRateTable(settings.fx_rates_file, settings.fx_pivot_currency, settings.fx_reload_seconds)
+REGISTRY.gauge("risk_engine_fx_rates", "Loaded FX rate table size and reload count.", ["stat"], fx_rates.samples)
+
+
+def to_reporting_currency(frame: pd.DataFrame) -> pd.DataFrame:
+    """Convert a cleaned transaction frame into ``REPORTING_CURRENCY`` using the shared rate table."""
+
+    with stage("fx.convert"):
+        return fx_rates.convert(frame, settings.reporting_currency)
@@ -1,15 +1,40 @@
 """LLM explainer services and provider implementations."""
 from __future__ import annotations
 
+import hashlib
 import json
+import math
 import os
+import re
+import time
+from dataclasses import dataclass, field
 from textwrap import dedent
-from typing import Dict, Protocol, runtime_checkable
+from typing import Any, Callable, Dict, Iterable, List, Protocol, runtime_checkable
 
-try:  # pragma: no cover - imported at runtime when dependency is installed
-    from anthropic import Anthropic
-except ImportError:  # pragma: no cover - fallback when Anthropic is unavailable
-    Anthropic = None  # type: ignore[assignment]
+from app.config import get_settings
+from app.utils.metrics import REGISTRY
+
+settings = get_settings()
+PROMPT_TOKENS = REGISTRY.histogram(
+    "risk_engine_llm_prompt_tokens",
+    "Estimated input tokens per explainer prompt.",
+    ["mode"],
+    (100, 250, 500, 1_000, 2_000, 4_000, 8_000, 16_000),
+)
+COMPACT_JSON = {"separators": (",", ":"), "sort_keys": True, "default": str}
+SECTION_MARKER = re.compile(r"^=== (\S+) ===[ \t]*$", re.MULTILINE)
+# Output token limit of the default Anthropic model; a packed batch has to fit in one response.
+ANTHROPIC_MAX_OUTPUT_TOKENS = 4_096
+
+
+def _load_anthropic(client: str = "Anthropic") -> type | None:
+    """Import an Anthropic client class on first use; ``None`` when the library is missing."""
+
+    try:  # pragma: no cover - imported at runtime when dependency is installed
+        import anthropic
+    except ImportError:  # pragma: no cover - fallback when Anthropic is unavailable
+        return None
+    return getattr(anthropic, client)
 
 
 @runtime_checkable
@@ -20,6 +45,49 @@ class LLMProvider(Protocol):
         """Return a human-readable explanation generated from the prompt."""
 
 
+@runtime_checkable
+class AsyncLLMProvider(Protocol):
+    """Provider that can also generate explanations without blocking the event loop."""
+
+    async def aexplain(self, prompt: str) -> str:
+        """Asynchronous variant of :meth:`LLMProvider.explain`."""
+
+
+@runtime_checkable
+class BatchLLMProvider(Protocol):
+    """Provider that explains several prompts, keyed by name, in one request.
+
+    Names missing from the result (or mapped to empty text) are treated as failed and fall back
+    individually. Providers may also offer ``async aexplain_batch`` with the same contract, and a
+    ``max_batch_size`` attribute capping how many prompts are packed into one request.
+    """
+
+    def explain_batch(self, prompts: Dict[str, str]) -> Dict[str, str]:
+        """Return an explanation per prompt name."""
+
+
+def pack_prompts(prompts: Dict[str, str]) -> str:
+    """Combine per-company prompts into one request whose answer can be split by section markers."""
+
+    header = (
+        f"Write {len(prompts)} separate briefings, one per section below. Start each briefing with its "
+        "section marker line copied exactly (for example `=== name ===`) and write nothing outside the sections."
+    )
+    return "\n\n".join([header, *(f"=== {name} ===\n{prompt}" for name, prompt in prompts.items())])
+
+
+def unpack_response(text: str, names: Iterable[str]) -> Dict[str, str]:
+    """Split a packed response on section markers; unknown and empty sections are dropped."""
+
+    wanted = set(names)
+    parts = SECTION_MARKER.split(text)
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        if name in wanted and body.strip():
+            sections[name] = body.strip()
+    return sections
+
+
 class AnthropicExplainer:
     """Concrete provider backed by the Anthropic Messages API."""
 
@@ -29,27 +97,107 @@ class AnthropicExplainer:
         max_tokens: int = 700,
         temperature: float = 0.2,
     ) -> None:
-        if Anthropic is None:
-            raise RuntimeError(
-                "anthropic library is not installed. Ensure requirements are installed to use AnthropicExplainer."
-            )
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise RuntimeError("ANTHROPIC_API_KEY environment variable is not configured.")
-        self.client = Anthropic(api_key=api_key)
+        anthropic_client = _load_anthropic()
+        if anthropic_client is None:
+            raise RuntimeError(
+                "anthropic library is not installed. Ensure requirements are installed to use AnthropicExplainer."
+            )
+        self.client = anthropic_client(api_key=api_key)
+        self._api_key = api_key
+        self._async_client: Any = None
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
 
-    def explain(self, prompt: str) -> str:
+    def explain(self, prompt: str, max_tokens: int | None = None) -> str:
         response = self.client.messages.create(
             model=self.model,
             temperature=self.temperature,
-            max_tokens=self.max_tokens,
+            max_tokens=max_tokens or self.max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return _response_text(response)
+
+    async def aexplain(self, prompt: str, max_tokens: int | None = None) -> str:
+        if self._async_client is None:
+            self._async_client = _load_anthropic("AsyncAnthropic")(api_key=self._api_key)
+        response = await self._async_client.messages.create(
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=max_tokens or self.max_tokens,
             messages=[{"role": "user", "content": prompt}],
         )
-        text_blocks = [block.text for block in response.content if getattr(block, "text", None)]
-        return "\n".join(text_blocks).strip()
+        return _response_text(response)
+
+    @property
+    def max_batch_size(self) -> int:
+        """Reports per packed request that still get ``max_tokens`` each within the output limit."""
+
+        return max(1, ANTHROPIC_MAX_OUTPUT_TOKENS // self.max_tokens)
+
+    def _batch_max_tokens(self, count: int) -> int:
+        return min(self.max_tokens * count, ANTHROPIC_MAX_OUTPUT_TOKENS)
+
+    def explain_batch(self, prompts: Dict[str, str]) -> Dict[str, str]:
+        text = self.explain(pack_prompts(prompts), max_tokens=self._batch_max_tokens(len(prompts)))
+        return unpack_response(text, prompts)
+
+    async def aexplain_batch(self, prompts: Dict[str, str]) -> Dict[str, str]:
+        text = await self.aexplain(pack_prompts(prompts), max_tokens=self._batch_max_tokens(len(prompts)))
+        return unpack_response(text, prompts)
+
+
+class FakeExplainer:
+    """Deterministic local provider for development, load tests and benchmarks; makes no network calls.
+
+    ``latency_ms`` is slept once per request, so packed batches cost the same as a single prompt.
+    Names in ``fail`` are left out of batch responses to exercise per-company fallback, and
+    ``max_batch_size`` mimics a provider output limit. ``requests`` counts provider calls.
+    """
+
+    model = "fake"
+
+    def __init__(self, latency_ms: float = 0.0, fail: Iterable[str] = (), max_batch_size: int = 64) -> None:
+        self.latency_ms = latency_ms
+        self.fail = set(fail)
+        self.max_batch_size = max_batch_size
+        self.requests = 0
+
+    def _narrative(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return f"Fake risk narrative {digest} for a {estimate_tokens(prompt)}-token prompt."
+
+    def explain(self, prompt: str) -> str:
+        self.requests += 1
+        time.sleep(self.latency_ms / 1000)
+        return self._narrative(prompt)
+
+    def explain_batch(self, prompts: Dict[str, str]) -> Dict[str, str]:
+        self.requests += 1
+        time.sleep(self.latency_ms / 1000)
+        response = "\n".join(
+            f"=== {name} ===\n{self._narrative(prompt)}" for name, prompt in prompts.items() if name not in self.fail
+        )
+        return unpack_response(response, prompts)
+
+
+def _response_text(response: Any) -> str:
+    text_blocks = [block.text for block in response.content if getattr(block, "text", None)]
+    return "\n".join(text_blocks).strip()
+
+
+def provider_identity(provider: LLMProvider) -> Dict[str, object]:
+    """Settings that change a provider's output; part of the explanation cache key."""
+
+    return {
+        "provider": type(provider).__qualname__,
+        "model": getattr(provider, "model", None),
+        "max_tokens": getattr(provider, "max_tokens", None),
+        "temperature": getattr(provider, "temperature", None),
+    }
 
 
 def _fallback_summary(report_json: Dict[str, object]) -> str:
@@ -73,8 +221,28 @@ def _fallback_summary(report_json: Dict[str, object]) -> str:
     return "\n".join(parts)
 
 
-def _build_prompt(report_json: Dict[str, object]) -> str:
-    """Create a prompt that guides the LLM to narrate the risk report."""
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English prose and JSON)."""
+
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class PromptPlan:
+    """A built prompt, its estimated size and the sections trimmed to fit the budget."""
+
+    text: str
+    estimated_tokens: int
+    token_budget: int
+    trimmed: List[str] = field(default_factory=list)
+
+    @property
+    def over_budget(self) -> bool:
+        return bool(self.token_budget) and self.estimated_tokens > self.token_budget
+
+
+def _build_full_prompt(report_json: Dict[str, object]) -> str:
+    """Verbose prompt that also embeds the whole payload as indented JSON (``token_budget=0``)."""
 
     components = report_json.get("components", [])
     rules = report_json.get("rules", [])
@@ -113,21 +281,134 @@ def _build_prompt(report_json: Dict[str, object]) -> str:
     return prompt
 
 
+class _CompactPrompt:
+    """Sections of the compact prompt; each ``trim_*`` step removes lower-signal content."""
+
+    def __init__(self, report_json: Dict[str, object]) -> None:
+        rules = report_json.get("rules", [])
+        self.survival = float(report_json.get("survival_probability", 0.0))
+        self.metadata: Dict[str, Any] = dict(report_json.get("metadata") or {})
+        self.components = sorted(report_json.get("components", []), key=lambda component: component["score"], reverse=True)
+        self.triggered = [rule for rule in rules if rule.get("triggered")]
+        self.passed = [rule["name"] for rule in rules if not rule.get("triggered")]
+        self.omitted_metadata = 0
+        self.component_context = True
+        self.list_passed = True
+        self.rationale_limit: int | None = None
+
+    def render(self) -> str:
+        lines = [
+            "You are a senior financial risk analyst. Write a concise executive briefing covering:",
+            f"1. Overall financial resilience and survival probability ({self.survival:.1f}%).",
+            "2. The top drivers of risk from the components.",
+            "3. Rule violations plus recommended follow-up questions.",
+            "Respond with 2-3 paragraphs and at most 3 actionable bullets. Quote the numbers below; do not invent data.",
+            "",
+            "Metadata: " + json.dumps(self.metadata, **COMPACT_JSON)
+            + (f" (+{self.omitted_metadata} fields omitted)" if self.omitted_metadata else ""),
+            "Components by score (0-100, higher is riskier):",
+        ]
+        for component in self.components:
+            context = f" - {component['description']}" if self.component_context else ""
+            lines.append(f"- {component['name']}: {component['score']:.1f}{context}")
+        lines.append("Triggered rules:" if self.triggered else "Triggered rules: none")
+        for rule in self.triggered:
+            rationale = rule.get("description", "")
+            if self.rationale_limit is not None and len(rationale) > self.rationale_limit:
+                rationale = rationale[: self.rationale_limit - 3] + "..."
+            lines.append(f"- {rule['name']}: {rationale}")
+        if self.passed:
+            lines.append(
+                "Rules passed: " + ", ".join(self.passed) if self.list_passed else f"Rules passed: {len(self.passed)}"
+            )
+        return "\n".join(lines)
+
+    def trim_passed_rules(self) -> bool:
+        changed, self.list_passed = self.list_passed and bool(self.passed), False
+        return changed
+
+    def trim_metadata_field(self, min_chars: int = 0) -> bool:
+        sizes = {key: len(json.dumps(value, default=str)) for key, value in self.metadata.items()}
+        largest = max(sizes, key=sizes.__getitem__, default=None)
+        if largest is None or sizes[largest] < min_chars:
+            return False
+        del self.metadata[largest]
+        self.omitted_metadata += 1
+        return True
+
+    def trim_component_context(self) -> bool:
+        changed, self.component_context = self.component_context, False
+        return changed
+
+    def trim_rationales(self) -> bool:
+        if not self.triggered or self.rationale_limit == 40:
+            return False
+        self.rationale_limit = 80 if self.rationale_limit is None else 40
+        return True
+
+
+def build_prompt(report_json: Dict[str, object], token_budget: int | None = None) -> PromptPlan:
+    """Build the explainer prompt within ``token_budget`` estimated tokens.
+
+    The compact prompt states each fact once (no embedded JSON copy of the report). While it is over
+    budget, low-signal content is trimmed in priority order: the list of passed rules, oversized
+    metadata fields, component descriptions, triggered-rule rationales, then the remaining metadata
+    (largest first). Numbers and triggered rule names are always kept, so the result may still
+    exceed a very small budget.
+    ``token_budget=0`` returns the original verbose prompt.
+    """
+
+    budget = settings.llm_prompt_token_budget if token_budget is None else token_budget
+    if budget <= 0:
+        text = _build_full_prompt(report_json)
+        return PromptPlan(text, estimate_tokens(text), 0)
+    prompt = _CompactPrompt(report_json)
+    steps: List[tuple[str, Callable[[], bool]]] = [
+        ("passed_rules", prompt.trim_passed_rules),
+        ("metadata", lambda: prompt.trim_metadata_field(min_chars=200)),
+        ("component_context", prompt.trim_component_context),
+        ("rationales", prompt.trim_rationales),
+        ("metadata", prompt.trim_metadata_field),
+    ]
+    text, trimmed = prompt.render(), []
+    for name, trim in steps:
+        while estimate_tokens(text) > budget and trim():
+            if name not in trimmed:
+                trimmed.append(name)
+            text = prompt.render()
+    return PromptPlan(text, estimate_tokens(text), budget, trimmed)
+
+
+def _build_prompt(report_json: Dict[str, object], token_budget: int | None = None) -> str:
+    """Create a prompt that guides the LLM to narrate the risk report."""
+
+    plan = build_prompt(report_json, token_budget)
+    PROMPT_TOKENS.observe(plan.estimated_tokens, "compact" if plan.token_budget else "full")
+    return plan.text
+
+
+def default_provider() -> LLMProvider | None:
+    """Return the provider selected by ``LLM_PROVIDER``; ``None`` when it is unavailable or disabled."""
+
+    if settings.llm_provider == "fake":
+        return FakeExplainer()
+    if settings.llm_provider != "anthropic":
+        return None
+    try:
+        return AnthropicExplainer()
+    except RuntimeError:
+        return None
+
+
 def explain_risk(report_json: Dict[str, object], provider: LLMProvider | None = None) -> str:
     """Convert structured risk data into an explanation provided by the LLM provider."""
 
     prompt = _build_prompt(report_json)
-    active_provider: LLMProvider | None = provider
-    if active_provider is None:
-        try:
-            active_provider = AnthropicExplainer()
-        except RuntimeError:
-            active_provider = None
-
+    active_provider = provider if provider is not None else default_provider()
     if active_provider is None:
         return _fallback_summary(report_json)
     return active_provider.explain(prompt)
 
 
-__all__ = ["LLMProvider", "AnthropicExplainer", "explain_risk"]
+__all__ = ["LLMProvider", "AsyncLLMProvider", "BatchLLMProvider", "AnthropicExplainer", "FakeExplainer", "explain_risk"]
 
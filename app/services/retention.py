@@ -0,0 +1,344 @@
+"""Retention for analytics results: roll old rows into per-company summaries and prune them in bounded batches."""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.models.analytics_rollup import AnalyticsRollup
+from app.models.forecast import Forecast
+from app.models.risk_report import RiskReport
+from app.models.simulation import Simulation
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+Stats = Dict[str, Dict[str, float]]
+Partials = Dict[Tuple[int, date], Tuple[int, Stats]]
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class RollupSource:
+    """An analytics table and the numeric columns summarized for it.
+
+    ``dimension`` splits metrics by another column (forecast horizon), e.g. ``runway_days@30``.
+    """
+
+    model: type
+    metrics: Tuple[str, ...]
+    dimension: str | None = None
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+
+SOURCES: Dict[str, RollupSource] = {
+    source.table: source
+    for source in (
+        RollupSource(RiskReport, ("survival_probability",)),
+        RollupSource(Forecast, ("revenue_projection", "expense_projection", "runway_days"), "horizon_days"),
+        RollupSource(Simulation, ("insolvency_probability",)),
+    )
+}
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    raw_days: int
+    daily_days: int
+
+
+def policy_for(table: str) -> RetentionPolicy:
+    """The global retention windows with any ``RETENTION_POLICIES`` override for ``table``."""
+
+    override = settings.retention_policies.get(table, {})
+    return RetentionPolicy(
+        override.get("raw_days", settings.retention_raw_days), override.get("daily_days", settings.retention_daily_days)
+    )
+
+
+@dataclass
+class RetentionResult:
+    table: str
+    rolled_up: int = 0
+    compacted: int = 0
+    batches: int = 0
+    dropped_partitions: List[str] = field(default_factory=list)
+
+
+def merge_stats(left: Stats, right: Stats) -> Stats:
+    """Combine count/sum/min/max summaries; merging is associative so batches can land in any order."""
+
+    merged = {name: dict(values) for name, values in left.items()}
+    for name, values in right.items():
+        current = merged.get(name)
+        if current is None:
+            merged[name] = dict(values)
+            continue
+        current["count"] += values["count"]
+        current["sum"] += values["sum"]
+        current["min"] = min(current["min"], values["min"])
+        current["max"] = max(current["max"], values["max"])
+    return merged
+
+
+def _observe(stats: Stats, name: str, value: float | None) -> None:
+    if value is None:
+        return
+    value = float(value)
+    current = stats.setdefault(name, {"count": 0, "sum": 0.0, "min": value, "max": value})
+    current["count"] += 1
+    current["sum"] += value
+    current["min"] = min(current["min"], value)
+    current["max"] = max(current["max"], value)
+
+
+def _add_partial(partials: Partials, key: Tuple[int, date], rows: int, stats: Stats) -> None:
+    count, existing = partials.get(key, (0, {}))
+    partials[key] = (count + rows, merge_stats(existing, stats))
+
+
+def _merge_rollups(db: Session, table: str, granularity: str, partials: Partials) -> None:
+    existing = {
+        (rollup.company_id, rollup.period_start): rollup
+        for rollup in db.scalars(
+            select(AnalyticsRollup).where(
+                AnalyticsRollup.source == table,
+                AnalyticsRollup.granularity == granularity,
+                tuple_(AnalyticsRollup.company_id, AnalyticsRollup.period_start).in_(list(partials)),
+            )
+        )
+    }
+    for (company_id, period_start), (rows, stats) in partials.items():
+        rollup = existing.get((company_id, period_start))
+        if rollup is None:
+            db.add(AnalyticsRollup(source=table, company_id=company_id, granularity=granularity, period_start=period_start, rows=rows, metrics=stats))
+        else:
+            rollup.rows += rows
+            rollup.metrics = merge_stats(rollup.metrics, stats)
+
+
+def _companies_with(company_id: ColumnElement, *criteria: ColumnElement) -> List[int]:
+    """Distinct companies with rows matching ``criteria``, so companies with nothing expired cost no queries."""
+
+    with SessionLocal() as db:
+        return list(db.scalars(select(company_id).where(*criteria).distinct().order_by(company_id)))
+
+
+def _pause() -> None:
+    if settings.retention_batch_pause_ms:
+        time.sleep(settings.retention_batch_pause_ms / 1000)
+
+
+def rollup_expired(source: RollupSource, cutoff: datetime, result: RetentionResult) -> None:
+    """Fold rows created before ``cutoff`` into daily rollups and delete them.
+
+    Each batch is one short transaction per company, read through the ``(company_id, created_at, id)`` index.
+    """
+
+    model = source.model
+    columns = [model.id, model.created_at, *(getattr(model, name) for name in source.metrics)]
+    if source.dimension:
+        columns.append(getattr(model, source.dimension))
+    for company_id in _companies_with(model.company_id, model.created_at < cutoff):
+        statement = (
+            select(*columns)
+            .where(model.company_id == company_id, model.created_at < cutoff)
+            .order_by(model.created_at, model.id)
+            .limit(settings.retention_batch_rows)
+        )
+        while True:
+            with SessionLocal() as db:
+                rows = db.execute(statement).all()
+                if not rows:
+                    break
+                partials: Partials = {}
+                for row in rows:
+                    values = row._mapping
+                    suffix = f"@{values[source.dimension]}" if source.dimension else ""
+                    stats: Stats = {}
+                    for name in source.metrics:
+                        _observe(stats, name + suffix, values[name])
+                    _add_partial(partials, (company_id, row.created_at.date()), 1, stats)
+                _merge_rollups(db, source.table, "day", partials)
+                db.execute(delete(model).where(model.id.in_([row.id for row in rows])))
+                db.commit()
+            result.rolled_up += len(rows)
+            result.batches += 1
+            _pause()
+
+
+def compact_daily(table: str, cutoff: date, result: RetentionResult) -> None:
+    """Merge daily rollups for days before ``cutoff`` into monthly rollups, in bounded batches."""
+
+    expired = (AnalyticsRollup.source == table, AnalyticsRollup.granularity == "day", AnalyticsRollup.period_start < cutoff)
+    for company_id in _companies_with(AnalyticsRollup.company_id, *expired):
+        statement = (
+            select(AnalyticsRollup)
+            .where(AnalyticsRollup.company_id == company_id, *expired)
+            .order_by(AnalyticsRollup.period_start)
+            .limit(settings.retention_batch_rows)
+        )
+        while True:
+            with SessionLocal() as db:
+                daily = list(db.scalars(statement))
+                if not daily:
+                    break
+                partials: Partials = {}
+                for rollup in daily:
+                    _add_partial(partials, (company_id, rollup.period_start.replace(day=1)), rollup.rows, rollup.metrics)
+                _merge_rollups(db, table, "month", partials)
+                db.execute(delete(AnalyticsRollup).where(AnalyticsRollup.id.in_([rollup.id for rollup in daily])))
+                db.commit()
+            result.compacted += len(daily)
+            result.batches += 1
+            _pause()
+
+
+# --- Postgres range partitioning -------------------------------------------------------------
+
+
+def partitioning_enabled() -> bool:
+    return settings.analytics_partitioning and engine.dialect.name == "postgresql"
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _set_lock_timeout(connection: Connection) -> None:
+    connection.execute(text(f"SET lock_timeout = {int(settings.maintenance_lock_timeout_ms)}"))
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    query = text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table")
+    return connection.execute(query, {"table": table}).first() is not None
+
+
+def _partitions(connection: Connection, table: str) -> List[Tuple[str, datetime | None]]:
+    """Partition names with their exclusive upper bound (``None`` for the default partition)."""
+
+    query = text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"
+    )
+    partitions = []
+    for name, bound in connection.execute(query, {"table": table}):
+        match = _UPPER_BOUND.search(bound or "")
+        partitions.append((name, datetime.fromisoformat(match.group(1)) if match else None))
+    return partitions
+
+
+def ensure_partitions(connection: Connection, table: str, today: date) -> None:
+    """Add monthly partitions after the last existing one through ``ANALYTICS_PARTITION_MONTHS_AHEAD``, plus a default."""
+
+    uppers = [upper.date() for _, upper in _partitions(connection, table) if upper is not None]
+    start = max(uppers, default=_month_start(today))
+    while start < _month_start(today, settings.analytics_partition_months_ahead + 1):
+        end = _month_start(start, 1)
+        connection.execute(text(f"CREATE TABLE {table}_p{start:%Y_%m} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"))
+        start = end
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+
+def convert_to_partitioned(source: RollupSource, today: date | None = None) -> bool:
+    """Turn a plain analytics table into a table range-partitioned by month on ``created_at``.
+
+    The existing table becomes the ``<table>_legacy`` partition for everything before the first
+    monthly partition. A validated CHECK constraint and a prebuilt ``(id, created_at)`` unique index
+    let Postgres attach it without rescanning, so the swap only holds locks briefly. The
+    primary key becomes ``(id, created_at)``; the ORM keeps addressing rows by ``id``.
+    """
+
+    table = source.table
+    bound = _month_start(today or date.today(), 2)
+    with engine.connect() as connection:
+        if is_partitioned(connection, table):
+            return False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {table}_id_created_key ON {table} (id, created_at)"))
+        connection.execute(
+            text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_range CHECK (created_at IS NOT NULL AND created_at < '{bound}') NOT VALID")
+        )
+        connection.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_legacy_range"))
+    with engine.begin() as connection:
+        _set_lock_timeout(connection)
+        connection.execute(text(f"ALTER TABLE {table} RENAME TO {table}_legacy"))
+        for index in (f"{table}_pkey", *(index.name for index in source.model.__table__.indexes)):
+            connection.execute(text(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_legacy"))
+        connection.execute(text(f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"))
+        connection.execute(text(f"ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {table}.id"))
+        connection.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)"))
+        connection.execute(
+            text(f"ALTER TABLE {table} ADD FOREIGN KEY (company_id) REFERENCES companies (id) ON DELETE CASCADE")
+        )
+        for index in source.model.__table__.indexes:
+            index.create(connection)
+        connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {table}_legacy FOR VALUES FROM (MINVALUE) TO ('{bound}')"))
+        ensure_partitions(connection, table, bound)
+    return True
+
+
+def drop_expired_partitions(table: str, cutoff: datetime) -> List[str]:
+    """Detach and drop partitions whose range ends before ``cutoff`` once retention has emptied them.
+
+    Dropping an emptied partition returns its space at once instead of leaving dead rows for vacuum.
+    A partition whose lock cannot be taken within ``MAINTENANCE_LOCK_TIMEOUT_MS`` is left for the next run.
+    """
+
+    dropped = []
+    with engine.connect() as connection:
+        partitions = _partitions(connection, table)
+    for name, upper in partitions:
+        if upper is None or upper > cutoff:
+            continue
+        try:
+            with engine.begin() as connection:
+                _set_lock_timeout(connection)
+                if connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+                    continue
+                connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                connection.execute(text(f"DROP TABLE {name}"))
+        except OperationalError:
+            logger.warning("Could not lock partition %s within the lock timeout; retrying next run", name)
+            continue
+        dropped.append(name)
+    return dropped
+
+
+def run_retention(tables: Iterable[str] | None = None, now: datetime | None = None) -> List[RetentionResult]:
+    """Apply the retention policy of each analytics table; safe to rerun after an interruption."""
+
+    now = now or datetime.utcnow()
+    results = []
+    for table in tables or SOURCES:
+        source, policy = SOURCES[table], policy_for(table)
+        result = RetentionResult(table)
+        partitioned = False
+        if partitioning_enabled():
+            with engine.begin() as connection:
+                partitioned = is_partitioned(connection, table)
+                if partitioned:
+                    _set_lock_timeout(connection)
+                    ensure_partitions(connection, table, now.date())
+        raw_cutoff = now - timedelta(days=policy.raw_days)
+        rollup_expired(source, raw_cutoff, result)
+        compact_daily(table, (now - timedelta(days=policy.daily_days)).date(), result)
+        if partitioned:
+            result.dropped_partitions = drop_expired_partitions(table, raw_cutoff)
+        logger.info("Retention for %s: %s", table, result)
+        results.append(result)
+    return results
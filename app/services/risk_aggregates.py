@@ -0,0 +1,381 @@
+"""Additive risk aggregates that can be updated with a few transactions without reloading the history.
+
+:class:`RiskAggregates` keeps everything the risk components and rule aggregates need as sums and
+counts: totals, per-category spend and row counts, rows per date for each category, and monthly
+sums. Adding or removing rows therefore only touches those rows. :meth:`RiskAggregates.apply`
+returns a new snapshot and leaves the cached baseline as it was, so what-if scenarios never leak
+into other requests.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import get_settings
+from app.services.risk_engine import RECEIVABLES_CATEGORY, RECEIVABLES_OVERDUE_DAYS, RiskComponent, assemble_report, score_components
+from app.services.rule_dsl import AggregateKey, RulePlan
+from app.services.rules_engine import evaluate_rules_from_aggregates
+from app.utils.cache import TTLCache
+from app.utils.metrics import REGISTRY
+
+settings = get_settings()
+RollingKey = Tuple[str, int]
+DAY_NS = 86_400 * 10**9
+# Beyond this many changed dates an overlay is folded into the sorted arrays.
+_OVERLAY_LIMIT = 64
+
+
+@dataclass(frozen=True)
+class _DateCounts:
+    """Rows per date: sorted arrays shared between snapshots plus a small overlay of changed dates."""
+
+    dates: np.ndarray  # int64 nanoseconds, sorted and unique
+    cumulative: np.ndarray  # running row count up to and including each date
+    overlay: Mapping[int, int] = field(default_factory=dict)
+
+    def _count(self, index: int) -> int:
+        return int(self.cumulative[index] - (self.cumulative[index - 1] if index else 0))
+
+    def _base(self, date: int) -> int:
+        index = int(np.searchsorted(self.dates, date))
+        return self._count(index) if index < len(self.dates) and self.dates[index] == date else 0
+
+    def count_before(self, cutoff: int) -> int:
+        """Rows dated strictly before ``cutoff``."""
+
+        index = int(np.searchsorted(self.dates, cutoff, side="left"))
+        base = int(self.cumulative[index - 1]) if index else 0
+        return base + sum(change for date, change in self.overlay.items() if date < cutoff)
+
+    def latest(self) -> int | None:
+        """Latest date that still has rows; walks back only over dates whose rows were all removed."""
+
+        added = [date for date, change in self.overlay.items() if self._base(date) + change > 0]
+        latest = max(added) if added else None
+        for index in range(len(self.dates) - 1, -1, -1):
+            date = int(self.dates[index])
+            if latest is not None and date <= latest:
+                break
+            if self._count(index) + self.overlay.get(date, 0) > 0:
+                return date
+        return latest
+
+    def changed(self, dates: np.ndarray, changes: np.ndarray) -> _DateCounts:
+        """Counts with ``changes`` added on ``dates`` (unique)."""
+
+        if len(self.overlay) + len(dates) > _OVERLAY_LIMIT:
+            base = np.diff(self.cumulative, prepend=0)
+            merged = np.concatenate([self.dates, np.fromiter(self.overlay, np.int64, len(self.overlay)), dates])
+            weights = np.concatenate([base, np.fromiter(self.overlay.values(), np.int64, len(self.overlay)), changes])
+            unique, inverse = np.unique(merged, return_inverse=True)
+            counts = np.bincount(inverse, weights=weights).astype(np.int64)
+            keep = counts > 0
+            return _DateCounts(unique[keep], np.cumsum(counts[keep]))
+        overlay = dict(self.overlay)
+        for date, change in zip(dates.tolist(), changes.tolist()):
+            overlay[date] = overlay.get(date, 0) + change
+        return replace(self, overlay={date: change for date, change in overlay.items() if change})
+
+
+_NO_DATES = _DateCounts(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+
+@dataclass(frozen=True)
+class _CategoryStats:
+    rows: int
+    spend: float  # sum of absolute amounts
+    expense_rows: int  # rows with a negative amount
+    dates: _DateCounts
+
+
+@dataclass(frozen=True)
+class _Sequence:
+    """One category's rows in frame (date) order, needed by the order-dependent ``rolling_increase``.
+
+    Rows appended after the latest date go to a short tail first, so an append does not copy the
+    arrays; the tail is folded in once it exceeds ``_OVERLAY_LIMIT`` rows.
+    """
+
+    dates: np.ndarray
+    amounts: np.ndarray  # absolute amounts
+    ids: np.ndarray
+    tail: Tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self.dates) + (len(self.tail[0]) if self.tail else 0)
+
+    def last_date(self) -> int | None:
+        if self.tail:
+            return int(self.tail[0][-1])
+        return int(self.dates[-1]) if len(self.dates) else None
+
+    def last_amounts(self, count: int) -> np.ndarray:
+        """The last ``count`` amounts (fewer when the sequence is shorter)."""
+
+        tail = self.tail[1] if self.tail else self.amounts[:0]
+        if len(tail) >= count:
+            return tail[len(tail) - count :]
+        return np.concatenate([self.amounts[max(len(self.amounts) - (count - len(tail)), 0) :], tail])
+
+    def folded(self) -> _Sequence:
+        if not self.tail:
+            return self
+        return _Sequence(*(np.concatenate([base, extra]) for base, extra in zip((self.dates, self.amounts, self.ids), self.tail)))
+
+    def appended(self, dates: np.ndarray, amounts: np.ndarray, ids: np.ndarray) -> _Sequence:
+        """Rows (already in order) dated on or after :meth:`last_date`."""
+
+        tail = (dates, amounts, ids) if not self.tail else tuple(np.concatenate(pair) for pair in zip(self.tail, (dates, amounts, ids)))
+        sequence = replace(self, tail=tail)
+        return sequence.folded() if len(tail[0]) > _OVERLAY_LIMIT else sequence
+
+    def without(self, dates: np.ndarray, ids: np.ndarray) -> _Sequence:
+        """Drop the rows with these ids, searching only among rows of the same date."""
+
+        rows = self.folded()
+        positions = []
+        for date, row_id in zip(dates, ids):
+            low, high = np.searchsorted(rows.dates, date, side="left"), np.searchsorted(rows.dates, date, side="right")
+            positions.extend(low + np.flatnonzero(rows.ids[low:high] == row_id))
+        return _Sequence(np.delete(rows.dates, positions), np.delete(rows.amounts, positions), np.delete(rows.ids, positions))
+
+    def with_rows(self, dates: np.ndarray, amounts: np.ndarray, ids: np.ndarray) -> _Sequence:
+        """Insert rows after existing rows of the same date, as the stable date sort of the frame does."""
+
+        if not len(dates):
+            return self
+        rows = self.folded()
+        order = np.argsort(dates, kind="stable")
+        positions = np.searchsorted(rows.dates, dates[order], side="right")
+        return _Sequence(
+            np.insert(rows.dates, positions, dates[order]),
+            np.insert(rows.amounts, positions, amounts[order]),
+            np.insert(rows.ids, positions, ids[order]),
+        )
+
+
+_NO_SEQUENCE = _Sequence(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=object))
+
+
+def _rolling_increase(amounts: np.ndarray, window: int) -> float:
+    return float(pd.Series(amounts).rolling(window=window, min_periods=1).mean().diff().max())
+
+
+def _extended_increase(current: float, sequence: _Sequence, amounts: np.ndarray, window: int) -> float:
+    """``rolling_increase`` after appending ``amounts``, from the previous maximum and the last ``window`` rows.
+
+    Once a sequence holds ``window`` rows the preceding ones no longer affect any later step.
+    """
+
+    context = sequence.last_amounts(window)
+    steps = pd.Series(np.concatenate([context, amounts])).rolling(window=window, min_periods=1).mean().diff().iloc[len(context) :]
+    return float(pd.Series(np.append(steps.to_numpy(), current)).max())
+
+
+def rolling_keys(plan: RulePlan) -> Set[RollingKey]:
+    """``(category, window)`` of every ``rolling_increase`` the plan references."""
+
+    return {args for kind, args in plan.aggregates if kind == "rolling_increase"}
+
+
+@dataclass(frozen=True)
+class RiskAggregates:
+    """Sufficient statistics for the risk components and rule aggregates of one company.
+
+    ``rolling_increase`` depends on row order rather than on sums, so the categories it is computed
+    for keep their amounts in date order. Rows appended after a category's latest date extend its
+    maximum from the last ``window`` rows; removing rows, or inserting them before the latest date,
+    rescans that category only. Every other update costs time proportional to the changed rows.
+    """
+
+    rows: int = 0
+    net: float = 0.0
+    shift: float = 0.0  # amounts are accumulated around this value so the variance keeps its precision
+    squares: float = 0.0  # sum of squared deviations from ``shift``
+    revenue: float = 0.0
+    expense: float = 0.0
+    categories: Mapping[str, _CategoryStats] = field(default_factory=dict)
+    months: Mapping[int, Tuple[float, int]] = field(default_factory=dict)  # month ordinal -> (sum, rows)
+    sequences: Mapping[str, _Sequence] = field(default_factory=dict)
+    rolling: Mapping[RollingKey, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, rolling: Iterable[RollingKey] = ()) -> RiskAggregates:
+        """Aggregates of a cleaned transaction frame, tracking the given ``rolling_increase`` keys."""
+
+        empty = cls(rolling={key: float("nan") for key in rolling})
+        return empty.apply(frame.assign(sign=1)) if not frame.empty else empty
+
+    def covers(self, plan: RulePlan) -> bool:
+        return rolling_keys(plan) <= set(self.rolling)
+
+    def apply(self, delta: pd.DataFrame) -> RiskAggregates:
+        """A new snapshot with ``delta`` rows added (``sign`` 1) or removed (``sign`` -1).
+
+        Removed rows must be part of these aggregates, with the same cleaned amounts and dates.
+        """
+
+        if delta.empty:
+            return self
+        signs = delta["sign"].to_numpy(dtype=np.int64)
+        amounts = delta["amount"].to_numpy(dtype=float)
+        signed = signs * amounts
+        dates = delta["transaction_date"].to_numpy("datetime64[ns]").view(np.int64)
+        shift = self.shift if self.rows else float(amounts.mean())
+        codes, names = pd.factorize(delta["category"])
+        spend = signs * np.abs(amounts)
+        expense = signs * (amounts < 0)
+        categories = dict(self.categories)
+        for code, category in enumerate(names):
+            mask = codes == code
+            stats = categories.get(category, _CategoryStats(0, 0.0, 0, _NO_DATES))
+            rows = stats.rows + int(signs[mask].sum())
+            if rows <= 0:
+                categories.pop(category, None)
+                continue
+            changed_dates, inverse = np.unique(dates[mask], return_inverse=True)
+            categories[category] = _CategoryStats(
+                rows,
+                stats.spend + float(spend[mask].sum()),
+                stats.expense_rows + int(expense[mask].sum()),
+                stats.dates.changed(changed_dates, np.bincount(inverse, weights=signs[mask]).astype(np.int64)),
+            )
+        months = dict(self.months)
+        changed_months, inverse = np.unique(delta["transaction_date"].to_numpy("datetime64[M]").view(np.int64), return_inverse=True)
+        month_sums = np.bincount(inverse, weights=signed)
+        month_rows = np.bincount(inverse, weights=signs)
+        for month, change, count in zip(changed_months.tolist(), month_sums.tolist(), month_rows.tolist()):
+            total, rows = months.get(month, (0.0, 0))
+            if rows + count > 0:
+                months[month] = (total + change, rows + int(count))
+            else:
+                months.pop(month, None)
+        sequences, rolling = self._rolling(delta, signs, amounts, dates)
+        return replace(
+            self,
+            rows=self.rows + int(signs.sum()),
+            net=self.net + float(signed.sum()),
+            shift=shift,
+            squares=self.squares + float((signs * (amounts - shift) ** 2).sum()),
+            revenue=self.revenue + float(signed[amounts > 0].sum()),
+            expense=self.expense - float(signed[amounts < 0].sum()),
+            categories=categories,
+            months=months,
+            sequences=sequences,
+            rolling=rolling,
+        )
+
+    def _rolling(
+        self, delta: pd.DataFrame, signs: np.ndarray, amounts: np.ndarray, dates: np.ndarray
+    ) -> Tuple[Mapping[str, _Sequence], Mapping[RollingKey, float]]:
+        tracked = {category for category, _ in self.rolling}
+        category = delta["category"].to_numpy()
+        touched = tracked.intersection(category)
+        if not touched:
+            return self.sequences, self.rolling
+        sequences, rolling = dict(self.sequences), dict(self.rolling)
+        ids = delta["unique_id"].to_numpy()
+        for name in touched:
+            sequence = sequences.get(name, _NO_SEQUENCE)
+            mask = category == name
+            removed = mask & (signs < 0)
+            added = np.flatnonzero(mask & (signs > 0))
+            keys = [key for key in self.rolling if key[0] == name]
+            order = added[np.argsort(dates[added], kind="stable")]
+            last = sequence.last_date()
+            if not removed.any() and (last is None or dates[order[0]] >= last):
+                # Appending after the latest row only adds steps at the end of the rolling mean.
+                for key in keys:
+                    rolling[key] = _extended_increase(rolling[key], sequence, np.abs(amounts[order]), key[1])
+                sequences[name] = sequence.appended(dates[order], np.abs(amounts[order]), ids[order])
+                continue
+            if removed.any():
+                sequence = sequence.without(dates[removed], ids[removed])
+            sequences[name] = sequence.with_rows(dates[added], np.abs(amounts[added]), ids[added])
+            for key in keys:
+                rolling[key] = _rolling_increase(sequences[name].amounts, key[1])
+        return sequences, rolling
+
+    def components(self) -> List[RiskComponent]:
+        """The risk components :func:`~app.services.risk_engine.generate_risk_report` derives from the frame."""
+
+        return score_components(
+            {
+                "cashflow_volatility": self._cashflow_volatility(),
+                "burn_rate": max(0.0, min(100.0, (self.expense - self.revenue) / 1000)),
+                "debtor_aging": self._debtor_aging(),
+                "vendor_concentration": self._vendor_concentration(),
+                "seasonality": self._seasonality(),
+            }
+        )
+
+    def _cashflow_volatility(self) -> float:
+        if self.rows == 0:
+            return 10.0
+        if self.rows == 1:
+            return float("nan")  # sample standard deviation of a single row, as pandas reports it
+        deviation = self.net - self.rows * self.shift
+        return float(np.sqrt(max(self.squares - deviation**2 / self.rows, 0.0) / (self.rows - 1))) * 0.1
+
+    def _debtor_aging(self) -> float:
+        receivables = self.categories.get(RECEIVABLES_CATEGORY)
+        if receivables is None:
+            return 15.0
+        cutoff = receivables.dates.latest() - RECEIVABLES_OVERDUE_DAYS * DAY_NS
+        return receivables.dates.count_before(cutoff) / receivables.rows * 100
+
+    def _vendor_concentration(self) -> float:
+        expense_rows = [stats.expense_rows for stats in self.categories.values() if stats.expense_rows > 0]
+        if not expense_rows:
+            return 5.0
+        return max(expense_rows) / sum(expense_rows) * 100
+
+    def _seasonality(self) -> float:
+        if self.rows == 0:
+            return 10.0
+        monthly = np.array([total for total, _ in self.months.values()])
+        return float(np.std(monthly) / (np.mean(monthly) + 1e-9) * 100)
+
+    def rule_values(self, plan: RulePlan, today: datetime | None = None) -> Dict[AggregateKey, float]:
+        """Every aggregate referenced by ``plan``, as :meth:`RulePlan.aggregate` computes it for one company."""
+
+        today = pd.Timestamp(today) if today is not None else pd.Timestamp.utcnow().tz_localize(None)
+        values: Dict[AggregateKey, float] = {}
+        for key in plan.aggregates:
+            kind, args = key
+            if kind in ("revenue", "expense", "net"):
+                values[key] = getattr(self, kind)
+            elif kind == "transactions":
+                values[key] = float(self.rows)
+            elif kind in ("category_spend", "category_count"):
+                stats = [self.categories[category] for category in args if category in self.categories]
+                values[key] = sum(item.spend for item in stats) if kind == "category_spend" else float(sum(item.rows for item in stats))
+            elif kind == "overdue":
+                stats = self.categories.get(args[0])
+                cutoff = (today - pd.Timedelta(days=args[1])).value
+                values[key] = float(stats.dates.count_before(cutoff)) if stats else 0.0
+            else:
+                values[key] = self.rolling[args]
+        return values
+
+    def report(self, plan: RulePlan, metadata: Dict[str, str] | None = None, today: datetime | None = None) -> Dict[str, object]:
+        """The :func:`~app.services.risk_engine.generate_risk_report` result for these aggregates, without a narrative."""
+
+        rules = evaluate_rules_from_aggregates(self.rule_values(plan, today), plan) if self.rows else []
+        return assemble_report(self.components(), rules, metadata)
+
+
+def what_if(
+    baseline: RiskAggregates, delta: pd.DataFrame, plan: RulePlan, metadata: Dict[str, str] | None = None
+) -> Tuple[Dict[str, object], Dict[str, object]]:
+    """Reports for ``baseline`` and for ``baseline`` with ``delta`` applied; runs on the CPU executor."""
+
+    return baseline.report(plan, metadata), baseline.apply(delta).report(plan, metadata)
+
+
+aggregate_cache: TTLCache[int, RiskAggregates] = TTLCache(settings.whatif_cache_max_entries, settings.whatif_cache_ttl_seconds)
+REGISTRY.gauge("risk_engine_risk_aggregates_cache", "Cached per-company risk aggregates hits, misses and size.", ["stat"], aggregate_cache.samples)
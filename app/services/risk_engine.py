@@ -7,8 +7,11 @@ from typing import Dict, List
 import numpy as np
 import pandas as pd
 
+from app.services.explanation_service import explanation_service
+from app.services.llm_explainer import LLMProvider
+from app.services.rule_dsl import RulePlan
 from app.services.rules_engine import RuleEvaluation, evaluate_rules
-from app.services.llm_explainer import LLMProvider, explain_risk
+from app.utils.metrics import stage
 
 
 @dataclass
@@ -20,6 +23,17 @@ class RiskComponent:
     description: str
 
 
+COMPONENTS: Dict[str, str] = {
+    "cashflow_volatility": "Std-dev of daily net cash.",
+    "burn_rate": "Difference between expenses and revenue.",
+    "debtor_aging": "Receivables overdue risk.",
+    "vendor_concentration": "Dependence on a single vendor.",
+    "seasonality": "Variability of monthly cashflows.",
+}
+RECEIVABLES_CATEGORY = "accounts_receivable"
+RECEIVABLES_OVERDUE_DAYS = 45
+
+
 def _normalize_score(raw_score: float) -> float:
     return float(np.clip(raw_score, 0, 100))
 
@@ -36,10 +50,11 @@ def _burn_rate_detection(frame: pd.DataFrame) -> float:
 
 
 def _debtor_aging_risk(frame: pd.DataFrame) -> float:
-    receivables = frame[frame["category"] == "accounts_receivable"]
+    receivables = frame[frame["category"] == RECEIVABLES_CATEGORY]
     if receivables.empty:
         return 15.0
-    overdue = receivables[receivables["transaction_date"] < receivables["transaction_date"].max() - pd.Timedelta(days=45)]
+    cutoff = receivables["transaction_date"].max() - pd.Timedelta(days=RECEIVABLES_OVERDUE_DAYS)
+    overdue = receivables[receivables["transaction_date"] < cutoff]
     ratio = len(overdue) / len(receivables)
     return float(ratio * 100)
 
@@ -66,24 +81,17 @@ def _survival_probability(scores: List[RiskComponent], rules: List[RuleEvaluatio
     return float(np.clip(survival, 0, 100))
 
 
-def generate_risk_report(
-    frame: pd.DataFrame,
-    metadata: Dict[str, str] | None = None,
-    explainer: LLMProvider | None = None,
-) -> Dict[str, object]:
-    """Return the computed risk report payload."""
+def score_components(raw_scores: Dict[str, float]) -> List[RiskComponent]:
+    """Normalized components from raw scores keyed by the names in :data:`COMPONENTS`."""
+
+    return [RiskComponent(name, _normalize_score(raw_scores[name]), description) for name, description in COMPONENTS.items()]
+
+
+def assemble_report(components: List[RiskComponent], rules: List[RuleEvaluation], metadata: Dict[str, str] | None = None) -> Dict[str, object]:
+    """Survival probability, heatmap and payloads for scored components and evaluated rules; ``summary`` is left ``None``."""
 
     metadata = metadata or {}
-    components = [
-        RiskComponent("cashflow_volatility", _normalize_score(_cashflow_volatility(frame)), "Std-dev of daily net cash."),
-        RiskComponent("burn_rate", _normalize_score(_burn_rate_detection(frame)), "Difference between expenses and revenue."),
-        RiskComponent("debtor_aging", _normalize_score(_debtor_aging_risk(frame)), "Receivables overdue risk."),
-        RiskComponent("vendor_concentration", _normalize_score(_vendor_concentration(frame)), "Dependence on a single vendor."),
-        RiskComponent("seasonality", _normalize_score(_seasonality_adjustment(frame)), "Variability of monthly cashflows."),
-    ]
-    rules = evaluate_rules(frame)
     survival_probability = _survival_probability(components, rules)
-    heatmap = {component.name: component.score for component in components}
     report_payload = {
         "metadata": metadata,
         "rules": [rule.model_dump() for rule in rules],
@@ -95,12 +103,48 @@ def generate_risk_report(
         "rules": [rule.model_dump() for rule in rules],
         "survival_probability": survival_probability,
     }
-    summary = explain_risk(summary_payload, provider=explainer)
     return {
         "components": components,
         "rules": rules,
         "survival_probability": survival_probability,
-        "heatmap": heatmap,
-        "summary": summary,
+        "heatmap": {component.name: component.score for component in components},
+        "summary": None,
         "report_payload": report_payload,
+        "summary_payload": summary_payload,
     }
+
+
+def generate_risk_report(
+    frame: pd.DataFrame,
+    metadata: Dict[str, str] | None = None,
+    explainer: LLMProvider | None = None,
+    explain: bool = True,
+    rule_plan: RulePlan | None = None,
+    rules: List[RuleEvaluation] | None = None,
+) -> Dict[str, object]:
+    """Return the computed risk report payload.
+
+    With ``explain=False`` the narrative is left to the caller: ``summary`` is ``None`` and
+    ``summary_payload`` holds the input for :mod:`app.services.explanation_service`. Rules are
+    evaluated with ``rule_plan`` (default: the configured rules) unless already-evaluated
+    ``rules`` are passed, e.g. from a grouped portfolio evaluation.
+    """
+
+    with stage("risk.components"):
+        components = score_components(
+            {
+                "cashflow_volatility": _cashflow_volatility(frame),
+                "burn_rate": _burn_rate_detection(frame),
+                "debtor_aging": _debtor_aging_risk(frame),
+                "vendor_concentration": _vendor_concentration(frame),
+                "seasonality": _seasonality_adjustment(frame),
+            }
+        )
+    if rules is None:
+        with stage("risk.rules"):
+            rules = evaluate_rules(frame, rule_plan)
+    report = assemble_report(components, rules, metadata)
+    if explain:
+        with stage("llm.explain"):
+            report["summary"] = explanation_service.explain_sync(report["summary_payload"], provider=explainer)
+    return report
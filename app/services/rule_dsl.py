@@ -0,0 +1,312 @@
+"""Declarative rule expressions compiled into a vectorized evaluation plan.
+
+Rules are boolean expressions over aggregates of a transaction frame, written in a small Python
+expression subset, e.g. ``"category_spend('rent', 'utilities') / expense > 0.3"``. A
+:class:`RulePlan` collects every aggregate referenced by its rules and named metrics, computes
+them together in one grouped pass and then evaluates each rule over whole columns of groups, so
+adding rules or tenants does not add scans of the frame.
+
+Available aggregates:
+
+* ``revenue``, ``expense``, ``net``, ``transactions`` - sums of positive amounts, absolute negative
+  amounts, all amounts, and the row count.
+* ``category_spend(*categories)`` / ``category_count(*categories)`` - absolute amount sum and row
+  count for the listed categories.
+* ``overdue(category, days)`` - rows of ``category`` dated more than ``days`` days before today.
+* ``rolling_increase(category, window)`` - largest step increase of the ``window``-row rolling mean
+  of absolute amounts for ``category`` (in frame order).
+
+Expressions support ``+ - * /``, comparisons, ``and``/``or``/``not``, ``x if cond else y``,
+numeric constants and named metrics defined on the plan. A rule must be a condition: its outer
+expression is a comparison or ``and``/``or``/``not`` (possibly through a metric or both branches of
+an ``if``), so ``"expense"`` alone is rejected rather than read as "non-zero".
+"""
+from __future__ import annotations
+
+import ast
+import functools
+import operator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+BASE_AGGREGATES = ("revenue", "expense", "net", "transactions")
+SUM_FUNCTIONS = {"category_spend", "category_count", "overdue"}
+ROLLING_FUNCTIONS = {"rolling_increase"}
+
+AggregateKey = Tuple[str, Tuple[Any, ...]]
+Node = Tuple[Any, ...]
+
+_BINARY: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_COMPARE: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+
+class RuleCompileError(ValueError):
+    """Raised when a rule or metric expression uses unsupported syntax or unknown names."""
+
+
+@dataclass(frozen=True)
+class RuleSpec:
+    """A declarative rule; ``company_id`` limits it to one tenant in grouped evaluation."""
+
+    name: str
+    when: str
+    description: str = ""
+    company_id: int | None = None
+
+    @property
+    def key(self) -> str:
+        """Result column: the name, suffixed with ``[company_id]`` for tenant rules."""
+
+        return self.name if self.company_id is None else f"{self.name}[{self.company_id}]"
+
+
+def _aggregate_label(key: AggregateKey) -> str:
+    kind, args = key
+    return kind if not args else f"{kind}({', '.join(map(repr, args))})"
+
+
+class _Compiler:
+    """Translate a parsed expression into picklable tuple nodes, collecting referenced aggregates."""
+
+    def __init__(self, metrics: Iterable[str]) -> None:
+        self.metrics = set(metrics)
+        self.aggregates: Dict[AggregateKey, None] = {}
+        self.metric_refs: set[str] = set()
+
+    def compile(self, source: str) -> Node:
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as exc:
+            raise RuleCompileError(f"Invalid expression {source!r}: {exc.msg}") from exc
+        return self._node(tree.body, source)
+
+    def _node(self, node: ast.AST, source: str) -> Node:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return ("const", float(node.value))
+        if isinstance(node, ast.Name):
+            if node.id in self.metrics:
+                self.metric_refs.add(node.id)
+                return ("metric", node.id)
+            if node.id in BASE_AGGREGATES:
+                return self._aggregate((node.id, ()))
+            raise RuleCompileError(f"Unknown name {node.id!r} in {source!r}")
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            return self._call(node, source)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            return ("bin", type(node.op), self._node(node.left, source), self._node(node.right, source))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.Not)):
+            return ("neg" if isinstance(node.op, ast.USub) else "not", self._node(node.operand, source))
+        if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+            operands = [self._node(operand, source) for operand in [node.left, *node.comparators]]
+            return ("cmp", tuple(type(op) for op in node.ops), tuple(operands))
+        if isinstance(node, ast.BoolOp):
+            return ("and" if isinstance(node.op, ast.And) else "or", tuple(self._node(value, source) for value in node.values))
+        if isinstance(node, ast.IfExp):
+            return ("if", self._node(node.test, source), self._node(node.body, source), self._node(node.orelse, source))
+        raise RuleCompileError(f"Unsupported syntax ({type(node).__name__}) in {source!r}")
+
+    def _call(self, node: ast.Call, source: str) -> Node:
+        name = node.func.id  # type: ignore[attr-defined]
+        if name not in SUM_FUNCTIONS | ROLLING_FUNCTIONS or node.keywords:
+            raise RuleCompileError(f"Unknown function {name!r} in {source!r}")
+        args = []
+        for arg in node.args:
+            if not isinstance(arg, ast.Constant) or isinstance(arg.value, bool):
+                raise RuleCompileError(f"{name}() takes constant arguments in {source!r}")
+            args.append(arg.value)
+        if name in {"category_spend", "category_count"}:
+            if not args or not all(isinstance(arg, str) for arg in args):
+                raise RuleCompileError(f"{name}() takes one or more category names in {source!r}")
+            args = sorted(set(args))
+        elif len(args) != 2 or not isinstance(args[0], str) or not isinstance(args[1], int) or args[1] < 1:
+            raise RuleCompileError(f"{name}() takes a category name and a positive integer in {source!r}")
+        return self._aggregate((name, tuple(args)))
+
+    def _aggregate(self, key: AggregateKey) -> Node:
+        self.aggregates[key] = None
+        return ("agg", key)
+
+
+def _evaluate(node: Node, aggregates: Mapping[AggregateKey, np.ndarray], metrics: Mapping[str, np.ndarray]) -> Any:
+    kind = node[0]
+    if kind == "const":
+        return node[1]
+    if kind == "agg":
+        return aggregates[node[1]]
+    if kind == "metric":
+        return metrics[node[1]]
+    if kind == "bin":
+        return _BINARY[node[1]](_evaluate(node[2], aggregates, metrics), _evaluate(node[3], aggregates, metrics))
+    if kind == "neg":
+        return -_evaluate(node[1], aggregates, metrics)
+    if kind == "not":
+        return np.logical_not(_evaluate(node[1], aggregates, metrics))
+    if kind == "cmp":
+        values = [_evaluate(operand, aggregates, metrics) for operand in node[2]]
+        results = [_COMPARE[op](left, right) for op, left, right in zip(node[1], values, values[1:])]
+        return functools.reduce(np.logical_and, results)
+    if kind in ("and", "or"):
+        combine = np.logical_and if kind == "and" else np.logical_or
+        values = [np.asarray(_evaluate(value, aggregates, metrics), dtype=bool) for value in node[1]]
+        return functools.reduce(combine, values)
+    if kind == "if":
+        test = np.asarray(_evaluate(node[1], aggregates, metrics), dtype=bool)
+        return np.where(test, _evaluate(node[2], aggregates, metrics), _evaluate(node[3], aggregates, metrics))
+    raise RuleCompileError(f"Unknown node {kind!r}")
+
+
+class RulePlan:
+    """Compiled rules and named metrics sharing one set of aggregates.
+
+    ``metrics`` map names to expressions usable by rules and by later metrics; each is evaluated
+    once per plan run however many rules reference it.
+    """
+
+    def __init__(self, rules: Sequence[RuleSpec], metrics: Mapping[str, str] | None = None) -> None:
+        metrics = dict(metrics or {})
+        clashes = set(metrics) & set(BASE_AGGREGATES)
+        if clashes:
+            raise RuleCompileError(f"Metric names shadow built-in aggregates: {sorted(clashes)}")
+        self.rules = list(rules)
+        keys = [rule.key for rule in self.rules]
+        if len(set(keys)) != len(keys):
+            raise RuleCompileError(f"Duplicate rules: {sorted({key for key in keys if keys.count(key) > 1})}")
+        compiler = _Compiler(metrics)
+        compiled_metrics = {}
+        for name, source in metrics.items():
+            compiler.metric_refs = set()
+            compiled_metrics[name] = (compiler.compile(source), set(compiler.metric_refs))
+        self.metric_order = _metric_order(compiled_metrics)
+        self.metrics = {name: compiled_metrics[name][0] for name in self.metric_order}
+        self.compiled = [compiler.compile(rule.when) for rule in self.rules]
+        for rule, node in zip(self.rules, self.compiled):
+            if not _is_condition(node, self.metrics):
+                raise RuleCompileError(f"Rule {rule.name!r} must be a condition (comparison or and/or/not), got {rule.when!r}")
+        self.aggregates = list(compiler.aggregates)
+
+    def aggregate(self, frame: pd.DataFrame, by: str | None = None, today: datetime | None = None) -> pd.DataFrame:
+        """One row per group and one column per referenced aggregate."""
+
+        amounts = frame["amount"].to_numpy(dtype=float)
+        keys = frame[by].to_numpy() if by else np.zeros(len(frame), dtype=np.int8)
+        category = frame["category"]
+        today = pd.Timestamp(today) if today is not None else pd.Timestamp.utcnow().tz_localize(None)
+        sums: Dict[str, np.ndarray] = {}
+        rolling: List[AggregateKey] = []
+        for key in self.aggregates:
+            kind, args = key
+            label = _aggregate_label(key)
+            if kind == "revenue":
+                sums[label] = np.where(amounts > 0, amounts, 0.0)
+            elif kind == "expense":
+                sums[label] = np.where(amounts < 0, -amounts, 0.0)
+            elif kind == "net":
+                sums[label] = amounts
+            elif kind == "transactions":
+                sums[label] = np.ones(len(frame))
+            elif kind in ("category_spend", "category_count"):
+                mask = category.isin(args).to_numpy()
+                sums[label] = np.where(mask, np.abs(amounts), 0.0) if kind == "category_spend" else mask.astype(float)
+            elif kind == "overdue":
+                cutoff = today - pd.Timedelta(days=args[1])
+                sums[label] = ((category == args[0]) & (frame["transaction_date"] < cutoff)).to_numpy(dtype=float)
+            else:
+                rolling.append(key)
+        result = pd.DataFrame(sums, index=frame.index).groupby(keys, sort=False).sum()
+        if not sums:
+            result = pd.DataFrame(index=pd.unique(keys))
+        for key in rolling:
+            result[_aggregate_label(key)] = _rolling_increase(frame, keys, *key[1]).reindex(result.index)
+        return result
+
+    def evaluate(self, frame: pd.DataFrame, by: str | None = None, today: datetime | None = None) -> pd.DataFrame:
+        """Evaluate every rule for every group in one pass.
+
+        Returns a nullable boolean frame indexed by group with one column per rule key. When ``by`` is
+        given, tenant rules are ``<NA>`` for other tenants' groups; without ``by`` the frame is a
+        single group and every rule applies.
+        """
+
+        aggregated = self.aggregate(frame, by=by, today=today)
+        columns = {key: aggregated[_aggregate_label(key)].to_numpy(dtype=float) for key in self.aggregates}
+        result = self.evaluate_aggregates(columns, aggregated.index)
+        if by:
+            for rule in self.rules:
+                if rule.company_id is not None:
+                    result.loc[result.index != rule.company_id, rule.key] = pd.NA
+        return result
+
+    def evaluate_aggregates(self, columns: Mapping[AggregateKey, np.ndarray], index: pd.Index) -> pd.DataFrame:
+        """Evaluate every rule over already computed aggregates, one array per key of :attr:`aggregates`.
+
+        Lets callers that maintain the aggregates themselves skip :meth:`aggregate`; tenant rules are
+        not masked.
+        """
+
+        return pd.DataFrame(self.triggered(columns, len(index)), index=index).astype("boolean")
+
+    def triggered(self, columns: Mapping[AggregateKey, np.ndarray], size: int) -> Dict[str, np.ndarray]:
+        """Boolean array of length ``size`` per rule key, without building a frame."""
+
+        values: Dict[str, np.ndarray] = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name in self.metric_order:
+                values[name] = np.broadcast_to(_evaluate(self.metrics[name], columns, values), size)
+            return {
+                rule.key: np.broadcast_to(np.asarray(_evaluate(node, columns, values), dtype=bool), size)
+                for rule, node in zip(self.rules, self.compiled)
+            }
+
+
+def _is_condition(node: Node, metrics: Mapping[str, Node]) -> bool:
+    kind = node[0]
+    if kind == "metric":
+        return _is_condition(metrics[node[1]], metrics)
+    if kind == "if":
+        return _is_condition(node[2], metrics) and _is_condition(node[3], metrics)
+    return kind in ("cmp", "and", "or", "not")
+
+
+def _rolling_increase(frame: pd.DataFrame, keys: np.ndarray, category: str, window: int) -> pd.Series:
+    mask = (frame["category"] == category).to_numpy()
+    values = pd.Series(np.abs(frame["amount"].to_numpy(dtype=float)[mask]))
+    groups = pd.Series(keys[mask])
+    means = values.groupby(groups, sort=False).rolling(window=window, min_periods=1).mean().reset_index(level=0, drop=True)
+    steps = means.sort_index().groupby(groups, sort=False).diff()
+    return steps.groupby(groups, sort=False).max()
+
+
+def _metric_order(compiled: Mapping[str, Tuple[Node, set]]) -> List[str]:
+    order: List[str] = []
+    visiting: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            raise RuleCompileError(f"Metric {name!r} depends on itself")
+        visiting.add(name)
+        for dependency in sorted(compiled[name][1]):
+            visit(dependency)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in compiled:
+        visit(name)
+    return order
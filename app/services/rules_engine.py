@@ -1,11 +1,33 @@
 """Rules engine evaluations."""
 from __future__ import annotations
 
-from typing import List
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Hashable, List, Mapping, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel
 
+from app.config import get_settings
+from app.services.rule_dsl import AggregateKey, RulePlan, RuleSpec
+
+settings = get_settings()
+
+DEFAULT_METRICS: Dict[str, str] = {
+    "liquidity_ratio": "revenue / (expense + 1e-9) if expense else 2.0",
+    "rent_ratio": "category_spend('rent', 'utilities') / (expense + 1e-9) if expense else 0.0",
+    "margin": "(revenue - expense) / (revenue + 1e-9) if revenue else -1.0",
+}
+DEFAULT_RULES: List[RuleSpec] = [
+    RuleSpec("liquidity_ratio", "liquidity_ratio < 1.2", "Liquidity ratio below safe threshold"),
+    RuleSpec("rent_utilities", "rent_ratio > 0.3", "Rent/utility spend too high"),
+    RuleSpec("subscription_creep", "rolling_increase('subscriptions', 3) > 1000", "Subscriptions growing rapidly"),
+    RuleSpec("margin_compression", "margin < 0.2", "Gross margin compression"),
+    RuleSpec("debtor_overdue", "overdue('accounts_receivable', 60) > 0", "Overdue debtor pattern"),
+]
+
 
 class RuleEvaluation(BaseModel):
     name: str
@@ -13,23 +35,68 @@ class RuleEvaluation(BaseModel):
     description: str
 
 
-def evaluate_rules(frame: pd.DataFrame) -> List[RuleEvaluation]:
+@lru_cache(maxsize=8)
+def load_rule_config(path: str | None = None) -> Tuple[Tuple[Tuple[str, str], ...], Tuple[RuleSpec, ...]]:
+    """Return the metrics and rules from ``RULES_FILE`` (JSON, read once), or the built-in defaults.
+
+    The file holds ``{"metrics": {name: expression}, "rules": [{"name", "when", "description"}]}``.
+    """
+
+    path = path or settings.rules_file
+    if not path:
+        return tuple(DEFAULT_METRICS.items()), tuple(DEFAULT_RULES)
+    with open(path, encoding="utf-8") as handle:
+        config = json.load(handle)
+    return tuple(config.get("metrics", {}).items()), tuple(RuleSpec(**rule) for rule in config.get("rules", []))
+
+
+@lru_cache(maxsize=128)
+def compile_rules(rules: Tuple[RuleSpec, ...], metrics: Tuple[Tuple[str, str], ...]) -> RulePlan:
+    """Compile (and memoize) a plan; arguments are tuples so identical rule sets share a plan."""
+
+    return RulePlan(rules, dict(metrics))
+
+
+def build_rule_plan(extra_rules: Sequence[RuleSpec] = ()) -> RulePlan:
+    """Plan for the configured rules plus ``extra_rules``; an extra rule replaces a global rule of the same name."""
+
+    metrics, rules = load_rule_config()
+    overrides = {rule.name for rule in extra_rules if rule.company_id is None}
+    combined = [rule for rule in rules if rule.name not in overrides] + list(extra_rules)
+    return compile_rules(tuple(combined), metrics)
+
+
+def _evaluations(plan: RulePlan, row: pd.Series) -> List[RuleEvaluation]:
+    return [
+        RuleEvaluation(name=rule.name, triggered=bool(row[rule.key]), description=rule.description)
+        for rule in plan.rules
+        if not pd.isna(row[rule.key])
+    ]
+
+
+def evaluate_rules(frame: pd.DataFrame, plan: RulePlan | None = None, today: datetime | None = None) -> List[RuleEvaluation]:
     """Run deterministic rule checks and return their evaluations."""
 
     if frame.empty:
         return []
-    total_revenue = frame[frame["amount"] > 0]["amount"].sum()
-    total_expense = frame[frame["amount"] < 0]["amount"].abs().sum()
-    liquidity_ratio = float(total_revenue / (total_expense + 1e-9)) if total_expense else 2.0
-    rent_utilities = frame[frame["category"].isin(["rent", "utilities"])]
-    rent_ratio = float(rent_utilities["amount"].abs().sum() / (total_expense + 1e-9)) if total_expense else 0.0
-    subscription_creep = frame[frame["category"] == "subscriptions"]["amount"].abs().rolling(window=3, min_periods=1).mean()
-    margin = float((total_revenue - total_expense) / (total_revenue + 1e-9)) if total_revenue else -1.0
-    debtor_overdue = frame[(frame["category"] == "accounts_receivable") & (frame["transaction_date"] < pd.Timestamp.utcnow() - pd.Timedelta(days=60))]
-    return [
-        RuleEvaluation(name="liquidity_ratio", triggered=liquidity_ratio < 1.2, description="Liquidity ratio below safe threshold"),
-        RuleEvaluation(name="rent_utilities", triggered=rent_ratio > 0.3, description="Rent/utility spend too high"),
-        RuleEvaluation(name="subscription_creep", triggered=bool((subscription_creep.diff() > 1000).any()), description="Subscriptions growing rapidly"),
-        RuleEvaluation(name="margin_compression", triggered=margin < 0.2, description="Gross margin compression"),
-        RuleEvaluation(name="debtor_overdue", triggered=not debtor_overdue.empty, description="Overdue debtor pattern"),
-    ]
+    plan = plan or build_rule_plan()
+    return _evaluations(plan, plan.evaluate(frame, today=today).iloc[0])
+
+
+def evaluate_rules_grouped(
+    frame: pd.DataFrame, by: str = "company_id", plan: RulePlan | None = None, today: datetime | None = None
+) -> Dict[Hashable, List[RuleEvaluation]]:
+    """Evaluate rules for every ``by`` group of a multi-company frame in a single pass."""
+
+    if frame.empty:
+        return {}
+    plan = plan or build_rule_plan()
+    results = plan.evaluate(frame, by=by, today=today)
+    return {key: _evaluations(plan, row) for key, row in results.iterrows()}
+
+
+def evaluate_rules_from_aggregates(values: Mapping[AggregateKey, float], plan: RulePlan) -> List[RuleEvaluation]:
+    """Evaluate rules for one company from precomputed aggregate values, one per key of ``plan.aggregates``."""
+
+    triggered = plan.triggered({key: np.array([values[key]], dtype=float) for key in plan.aggregates}, 1)
+    return [RuleEvaluation(name=rule.name, triggered=bool(triggered[rule.key][0]), description=rule.description) for rule in plan.rules]
@@ -0,0 +1,72 @@
+"""Background preloading of heavy scientific and LLM dependencies."""
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+HEAVY_MODULES = ("sklearn.ensemble", "sklearn.cluster", "statsmodels.tsa.holtwinters", "anthropic")
+_status: Dict[str, object] = {"state": "idle", "seconds": None, "failed": []}
+
+
+def preload_modules() -> List[str]:
+    """Import the heavy modules and run tiny fits so their first real use is fast; returns failures."""
+
+    failed = []
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            failed.append(name)
+    try:
+        import pandas as pd
+
+        from app.services.anomaly_detector import detect_anomalies
+        from app.services.forecasting import forecast_financials
+
+        frame = pd.DataFrame(
+            {
+                "unique_id": [f"warmup-{index}" for index in range(24)],
+                "amount": [float(100 + index * (-1) ** index) for index in range(24)],
+                "category": ["sales", "rent"] * 12,
+                "transaction_date": pd.date_range("2024-01-01", periods=24, freq="15D"),
+            }
+        )
+        detect_anomalies(frame)
+        forecast_financials(frame)
+    except Exception:  # noqa: BLE001 - warm-up must never take the server down
+        logger.exception("Warm-up model fit failed")
+    return failed
+
+
+def _run() -> None:
+    from app.utils.concurrency import get_cpu_executor
+
+    _status["state"] = "running"
+    start = time.perf_counter()
+    failed = preload_modules()
+    executor = get_cpu_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        # Best effort: one task per worker slot so most worker processes import the modules too.
+        for future in [executor.submit(preload_modules) for _ in range(settings.cpu_executor_workers)]:
+            future.result()
+    _status.update(state="ready", seconds=time.perf_counter() - start, failed=failed)
+
+
+def start_background_warmup() -> threading.Thread:
+    """Preload heavy dependencies on a daemon thread so start-up and health checks are not delayed."""
+
+    thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def warmup_status() -> Dict[str, object]:
+    return dict(_status)
@@ -0,0 +1,65 @@
+"""Dedicated executor for CPU-bound pandas/statsmodels/sklearn work."""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.config import get_settings
+from app.utils.profiling import _profiled_call, active_capture
+
+settings = get_settings()
+T = TypeVar("T")
+_executor: Executor | None = None
+_lock = threading.Lock()
+
+
+def get_cpu_executor() -> Executor:
+    """Return the shared CPU executor, creating it from settings on first use."""
+
+    global _executor
+    with _lock:
+        if _executor is None:
+            if settings.cpu_executor == "process":
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.cpu_executor_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=settings.cpu_executor_workers, thread_name_prefix="cpu")
+        return _executor
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run ``func`` on the CPU executor so it does not block the event loop or the I/O threadpool.
+
+    With the process executor ``func`` and its arguments must be picklable, and stage timings
+    recorded inside ``func`` stay in the worker process. Thread workers run in a copy of the
+    caller's context so per-request timings are kept.
+    """
+
+    loop = asyncio.get_running_loop()
+    executor = get_cpu_executor()
+    capture = active_capture()
+    if capture is not None:
+        call = functools.partial(_profiled_call, func, args, kwargs)
+    else:
+        call = functools.partial(func, *args, **kwargs)
+    if isinstance(executor, ThreadPoolExecutor):
+        call = functools.partial(contextvars.copy_context().run, call)
+    if capture is None:
+        return await loop.run_in_executor(executor, call)
+    result, stats, wall, cpu = await loop.run_in_executor(executor, call)
+    capture.add(getattr(func, "__qualname__", repr(func)), stats, wall, cpu)
+    return result
+
+
+def shutdown_cpu_executor() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
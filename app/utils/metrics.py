@@ -0,0 +1,214 @@
+"""Lightweight per-stage timing with Prometheus text exposition."""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_request_timings: ContextVar[Dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: object, quotes: bool = True) -> str:
+    """Escape a label value (or, without ``quotes``, HELP text) for the Prometheus text format."""
+
+    escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return escaped.replace('"', '\\"') if quotes else escaped
+
+
+def _help(name: str, documentation: str, kind: str) -> List[str]:
+    return [f"# HELP {name} {_escape(documentation, quotes=False)}", f"# TYPE {name} {kind}"]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # bucket counts, +Inf count, sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = _help(self.name, self.documentation, "histogram")
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            bucket_labels = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are produced by a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = _help(self.name, self.documentation, self.kind)
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Counter(Gauge):
+    """Monotonic counter read from a callback at scrape time; the callback returns running totals."""
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    """Holds all process metrics and renders them in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Histogram | Gauge | Counter] = {}
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, label_names, buckets))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]) -> Gauge:
+        self._metrics[name] = Gauge(name, documentation, label_names, callback)
+        return self._metrics[name]  # type: ignore[return-value]
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]) -> Counter:
+        self._metrics[name] = Counter(name, documentation, label_names, callback)
+        return self._metrics[name]  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram("risk_engine_stage_seconds", "Wall time spent per processing stage.", ["stage"], LATENCY_BUCKETS)
+STAGE_ROWS = REGISTRY.histogram("risk_engine_stage_rows", "Rows handled per processing stage.", ["stage"], ROW_BUCKETS)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "risk_engine_http_request_seconds", "HTTP request latency by route.", ["method", "route", "status"], LATENCY_BUCKETS
+)
+_pools: Dict[str, object] = {}
+
+
+def _pool_samples() -> Dict[Tuple[str, ...], float]:
+    samples: Dict[Tuple[str, ...], float] = {}
+    for engine_name, pool in _pools.items():
+        for stat in ("size", "checkedin", "checkedout", "overflow"):
+            reader = getattr(pool, stat, None)
+            if callable(reader):
+                samples[(engine_name, stat)] = float(reader())
+    return samples
+
+
+REGISTRY.gauge("risk_engine_db_pool", "SQLAlchemy connection pool state.", ["engine", "stat"], _pool_samples)
+
+
+def register_pool(engine_name: str, pool: object) -> None:
+    """Expose a SQLAlchemy pool's size/checked-out/overflow counts on ``/metrics``."""
+
+    _pools[engine_name] = pool
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block, record it in the stage histogram and the current request's timings."""
+
+    if not settings.metrics_enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def record_rows(name: str, count: int) -> None:
+    """Record how many rows a stage handled."""
+
+    if settings.metrics_enabled:
+        STAGE_ROWS.observe(count, name)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Format request stage timings as a ``Server-Timing`` header value (milliseconds)."""
+
+    return ", ".join(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in timings.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and optionally emitting ``Server-Timing``."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.metrics_timing_headers:
+                    timings["total"] = time.perf_counter() - start
+                    headers = [*message.get("headers", []), (b"server-timing", server_timing(timings).encode("latin-1"))]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route, str(status))
@@ -1,24 +1,42 @@
 """Utility helpers for preprocessing financial data."""
 from __future__ import annotations
 
+import hashlib
 from typing import Iterable, List
 
 import pandas as pd
 
 
-def to_dataframe(records: Iterable[dict]) -> pd.DataFrame:
-    """Convert iterable of transaction dicts into a cleaned DataFrame."""
+def parse_dates(values: pd.Series, errors: str = "raise") -> pd.Series:
+    """Parse ISO dates or timestamps; offsets are converted to UTC and dropped so aware and naive values compare."""
 
-    frame = pd.DataFrame(list(records))
+    return pd.to_datetime(values, errors=errors, format="ISO8601", utc=True).dt.tz_convert(None)
+
+
+def to_dataframe(records: Iterable[dict] | pd.DataFrame) -> pd.DataFrame:
+    """Convert iterable of transaction dicts (or a raw frame) into a cleaned DataFrame."""
+
+    frame = records.copy() if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
     if frame.empty:
         return frame
-    frame["transaction_date"] = pd.to_datetime(frame["transaction_date"])
+    frame["transaction_date"] = parse_dates(frame["transaction_date"])
     frame["amount"] = pd.to_numeric(frame["amount"])
     frame.sort_values("transaction_date", inplace=True)
     frame.reset_index(drop=True, inplace=True)
     return frame
 
 
+def fill_optional_fields(frame: pd.DataFrame) -> pd.DataFrame:
+    """Default missing currencies to USD and turn missing descriptions into ``None``."""
+
+    frame = frame.copy()
+    currency = frame["currency"] if "currency" in frame else pd.Series("USD", index=frame.index)
+    frame["currency"] = currency.fillna("USD").astype(str).str.upper()
+    description = frame["description"] if "description" in frame else pd.Series(None, index=frame.index, dtype=object)
+    frame["description"] = description.astype(object).where(description.notna(), None)
+    return frame
+
+
 def remove_duplicates(frame: pd.DataFrame, subset: List[str] | None = None) -> pd.DataFrame:
     """Drop duplicate rows based on provided subset."""
 
@@ -26,6 +44,35 @@ def remove_duplicates(frame: pd.DataFrame, subset: List[str] | None = None) -> p
     return frame.drop_duplicates(subset=subset)
 
 
+def normalize_descriptions(descriptions: pd.Series) -> pd.Series:
+    """Lower-case descriptions and collapse punctuation/whitespace so resent rows compare equal."""
+
+    return (
+        descriptions.fillna("")
+        .astype(str)
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def fingerprint_transactions(frame: pd.DataFrame) -> pd.Series:
+    """Return a content hash per row built from amount, date, category and normalized description.
+
+    The fingerprint ignores ``unique_id`` so the same transaction resent by a bank feed under a
+    new identifier hashes to the same value.
+    """
+
+    if frame.empty:
+        return pd.Series([], index=frame.index, dtype=object)
+    amounts = pd.to_numeric(frame["amount"]).round(2).map("{:.2f}".format)
+    dates = pd.to_datetime(frame["transaction_date"]).dt.strftime("%Y-%m-%d")
+    categories = frame["category"].fillna("").astype(str).str.strip().str.lower()
+    descriptions = normalize_descriptions(frame["description"]) if "description" in frame else ""
+    keys = amounts + "|" + dates + "|" + categories + "|" + descriptions
+    return keys.map(lambda key: hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest())
+
+
 def transactions_to_records(transactions: Iterable[object]) -> list[dict]:
     """Serialize SQLAlchemy transaction objects into plain dictionaries."""
 
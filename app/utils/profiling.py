@@ -0,0 +1,210 @@
+"""Opt-in per-request profiling with captures kept in a bounded on-disk ring buffer."""
+from __future__ import annotations
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+PROFILE_HEADER = b"x-profile"
+SERVICES_PATH = os.path.join("app", "services")
+
+FuncKey = Tuple[str, int, str]
+_active_capture: ContextVar["Capture | None"] = ContextVar("active_capture", default=None)
+
+
+def _profiled_call(func: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, Dict[FuncKey, tuple], float, float]:
+    """Run ``func`` under cProfile; module-level so it can be shipped to process workers."""
+
+    profile = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    result = profile.runcall(func, *args, **kwargs)
+    cpu, wall = time.thread_time() - cpu_start, time.perf_counter() - wall_start
+    profile.create_stats()
+    return result, profile.stats, wall, cpu
+
+
+class Capture:
+    """Profile data collected for one request across its CPU-executor calls."""
+
+    def __init__(self, method: str, path: str, reason: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.stats: Dict[FuncKey, tuple] = {}
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, stats: Dict[FuncKey, tuple], wall: float, cpu: float) -> None:
+        with self._lock:
+            for func, func_stats in stats.items():
+                self.stats[func] = pstats.add_func_stats(self.stats[func], func_stats) if func in self.stats else func_stats
+            self.calls.append({"function": name, "wall_ms": wall * 1000, "cpu_ms": cpu * 1000})
+
+    def report(self, status: int, wall: float) -> Dict[str, Any]:
+        rows = [_function_row(func, func_stats) for func, func_stats in self.stats.items()]
+        by_own_time = sorted(rows, key=lambda row: row["tottime_ms"], reverse=True)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "reason": self.reason,
+            "captured_at": self.started_at.isoformat(),
+            "wall_ms": wall * 1000,
+            "cpu_ms": sum(call["cpu_ms"] for call in self.calls),
+            "profiled_wall_ms": sum(call["wall_ms"] for call in self.calls),
+            "calls": self.calls,
+            "top_services": [row for row in by_own_time if SERVICES_PATH in row["file"]][:20],
+            "top_functions": by_own_time[:20],
+            "call_tree": _call_tree(self.stats),
+        }
+
+
+def _label(func: FuncKey) -> str:
+    filename, line, name = func
+    return f"{name} ({filename}:{line})" if line else name
+
+
+def _function_row(func: FuncKey, func_stats: tuple) -> Dict[str, Any]:
+    primitive_calls, calls, own_time, cumulative_time, _ = func_stats
+    return {
+        "function": func[2],
+        "file": func[0],
+        "line": func[1],
+        "calls": calls,
+        "primitive_calls": primitive_calls,
+        "tottime_ms": own_time * 1000,
+        "cumtime_ms": cumulative_time * 1000,
+    }
+
+
+def _call_tree(stats: Dict[FuncKey, tuple], max_depth: int = 8, max_children: int = 6, min_share: float = 0.01) -> List[Dict[str, Any]]:
+    """Build a pruned callee tree from pstats caller edges, heaviest branches first."""
+
+    callees: Dict[FuncKey, Dict[FuncKey, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+    roots = [func for func, func_stats in stats.items() if not func_stats[4]]
+    total = sum(stats[root][3] for root in roots) or 1e-9
+
+    def build(func: FuncKey, cumulative: float, depth: int, path: frozenset) -> Dict[str, Any]:
+        node: Dict[str, Any] = {"function": _label(func), "cumtime_ms": cumulative * 1000}
+        if depth < max_depth:
+            children = sorted(callees.get(func, {}).items(), key=lambda item: item[1], reverse=True)[:max_children]
+            node["children"] = [
+                build(child, child_time, depth + 1, path | {child})
+                for child, child_time in children
+                if child_time / total >= min_share and child not in path
+            ]
+        return node
+
+    return [build(root, stats[root][3], 0, frozenset({root})) for root in roots]
+
+
+class CaptureStore:
+    """Ring buffer of JSON captures on disk; the oldest files are dropped beyond ``max_captures``."""
+
+    def __init__(self, directory: str, max_captures: int) -> None:
+        self.directory = Path(directory)
+        self.max_captures = max_captures
+        self._lock = threading.Lock()
+
+    def _files(self) -> List[Path]:
+        return sorted(self.directory.glob("*.json")) if self.directory.exists() else []
+
+    def save(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{time.time_ns():020d}-{report['id']}.json"
+            path.write_text(json.dumps(report), encoding="utf-8")
+            files = self._files()
+            for stale in files[: max(len(files) - self.max_captures, 0)]:
+                stale.unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for path in reversed(self._files()):
+            report = json.loads(path.read_text(encoding="utf-8"))
+            summaries.append({key: report[key] for key in ("id", "method", "path", "status", "reason", "captured_at", "wall_ms", "cpu_ms")})
+        return summaries
+
+    def get(self, capture_id: str) -> Dict[str, Any] | None:
+        if not capture_id.isalnum():
+            return None
+        for path in self.directory.glob(f"*-{capture_id}.json") if self.directory.exists() else []:
+            return json.loads(path.read_text(encoding="utf-8"))
+        return None
+
+
+capture_store = CaptureStore(settings.profiling_dir, settings.profiling_max_captures)
+
+
+def active_capture() -> Capture | None:
+    """Return the capture for the current request when it is being profiled."""
+
+    return _active_capture.get()
+
+
+def _profile_reason(scope) -> str | None:
+    if settings.profiling_token:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                return "header" if value.decode("latin-1") == settings.profiling_token else None
+    if settings.profiling_sample_rate and random.random() < settings.profiling_sample_rate:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile requests carrying a valid ``X-Profile`` token or picked by the sampling rate.
+
+    Unprofiled requests only pay for a header scan and, when sampling is on, one random draw.
+    Work dispatched through :func:`app.utils.concurrency.run_cpu` is profiled with cProfile in the
+    worker that runs it, so concurrent requests on the event loop do not pollute the capture.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        reason = _profile_reason(scope) if scope["type"] == "http" else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+        capture = Capture(scope["method"], scope["path"], reason)
+        token = _active_capture.set(capture)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", capture.id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active_capture.reset(token)
+            try:
+                capture_store.save(capture.report(status, time.perf_counter() - start))
+            except OSError:
+                logger.exception("Failed to store profile capture %s", capture.id)
@@ -1,12 +1,94 @@
 """Validation helpers."""
-from typing import Iterable
+from __future__ import annotations
 
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List
 
-def ensure_positive_amounts(records: Iterable[dict]) -> None:
-    """Ensure no transaction contains a zero or missing amount."""
+import numpy as np
+import pandas as pd
 
-    for record in records:
-        amount = record.get("amount")
-        if amount is None or float(amount) == 0:
-            msg = f"Invalid transaction amount for record {record.get('unique_id')}"
-            raise ValueError(msg)
+from app.models.transaction import Transaction
+from app.utils.preprocess import parse_dates
+
+REQUIRED_COLUMNS = ["unique_id", "amount", "category", "transaction_date"]
+TEXT_COLUMNS = ["unique_id", "category", "description", "currency"]
+
+
+@dataclass
+class BatchValidationReport:
+    """Outcome of validating a columnar transaction batch."""
+
+    total_rows: int
+    valid: pd.Series
+    errors: List[Dict[str, object]] = field(default_factory=list)
+
+    @property
+    def invalid_rows(self) -> int:
+        return int((~self.valid).sum())
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"total_rows": self.total_rows, "invalid_rows": self.invalid_rows, "errors": self.errors}
+
+
+def _column_length(name: str) -> int | None:
+    return getattr(Transaction.__table__.columns[name].type, "length", None)
+
+
+def validate_transaction_frame(
+    frame: pd.DataFrame,
+    currencies: Iterable[str],
+    today: datetime | None = None,
+    convertible: Iterable[str] | None = None,
+) -> BatchValidationReport:
+    """Run vectorized checks over a raw transaction batch and collect every failing row.
+
+    ``frame`` must carry a positional index; reported ``index`` values refer to it. Checks cover
+    zero/missing amounts, unparseable or future dates, unknown currencies, missing identifiers and
+    strings longer than the matching ``Transaction`` column. When ``convertible`` is given, known
+    currencies outside it are rejected as having no FX rate into the reporting currency.
+    """
+
+    frame = frame.reindex(columns=list(dict.fromkeys([*frame.columns, *REQUIRED_COLUMNS, "description", "currency"])))
+    today = pd.Timestamp((today or datetime.utcnow()).date())
+    amounts = pd.to_numeric(frame["amount"], errors="coerce")
+    dates = parse_dates(frame["transaction_date"], errors="coerce").dt.normalize()
+    currency = frame["currency"].fillna("USD").astype(str).str.upper()
+    checks = [
+        ("unique_id", "missing unique_id", frame["unique_id"].isna() | (frame["unique_id"].astype(str).str.strip() == "")),
+        ("category", "missing category", frame["category"].isna() | (frame["category"].astype(str).str.strip() == "")),
+        ("amount", "missing or non-numeric amount", amounts.isna()),
+        ("amount", "zero amount", amounts == 0),
+        ("transaction_date", "missing or unparseable date", dates.isna()),
+        ("transaction_date", "date is in the future", dates > today),
+        ("currency", "unknown currency", ~currency.isin({code.upper() for code in currencies})),
+    ]
+    if convertible is not None:
+        known = currency.isin({code.upper() for code in currencies})
+        checks.append(("currency", "no FX rate into the reporting currency", known & ~currency.isin({code.upper() for code in convertible})))
+    for column in TEXT_COLUMNS:
+        limit = _column_length(column)
+        if limit is not None:
+            lengths = frame[column].astype("string").str.len()
+            checks.append((column, f"longer than {limit} characters", lengths.gt(limit).fillna(False)))
+
+    valid = pd.Series(True, index=frame.index)
+    errors: List[Dict[str, object]] = []
+    unique_ids = frame["unique_id"]
+    for column, reason, mask in checks:
+        mask = mask.to_numpy(dtype=bool)
+        if not mask.any():
+            continue
+        valid &= ~mask
+        for position in np.flatnonzero(mask):
+            unique_id = unique_ids.iloc[position]
+            errors.append(
+                {
+                    "index": int(frame.index[position]),
+                    "unique_id": None if pd.isna(unique_id) else str(unique_id),
+                    "field": column,
+                    "reason": reason,
+                }
+            )
+    errors.sort(key=lambda error: error["index"])
+    return BatchValidationReport(total_rows=len(frame), valid=valid, errors=errors)
@@ -0,0 +1,168 @@
+"""Write-behind persistence: analytics results are queued and inserted in batches off the response path."""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal, Base
+from app.utils.metrics import REGISTRY, record_rows, stage
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    instances: List[Base]
+    done: asyncio.Future | None
+
+
+class WriteBehindQueue:
+    """Bounded queue drained by one background task that commits many requests' rows per transaction.
+
+    Producers block when ``max_size`` submissions are pending, so a slow database applies
+    backpressure instead of growing memory. A batch that fails to commit is retried one
+    submission at a time so a single bad row only fails its own request.
+    """
+
+    def __init__(self, max_size: int, batch_rows: int, flush_interval: float) -> None:
+        self.max_size = max_size
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue: asyncio.Queue[_Pending | None] | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            # A fresh context keeps the writer's stage timings out of the request that started it.
+            self._task = loop.create_task(self._run(self._queue), context=contextvars.Context())
+        return self._queue
+
+    async def submit(self, instances: Sequence[Base], wait: bool = False) -> None:
+        """Queue ``instances`` for insertion; with ``wait`` return only after they are committed."""
+
+        queue = self._ensure_started()
+        done = asyncio.get_running_loop().create_future() if wait else None
+        with stage("db.enqueue"):
+            await queue.put(_Pending(list(instances), done))
+        if done is not None:
+            with stage("db.commit"):
+                await done
+
+    async def stop(self) -> None:
+        """Flush everything queued so far and stop the writer (called on shutdown)."""
+
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch, rows, stopping = [item], len(item.instances), False
+            if self.flush_interval and queue.empty():
+                # Give concurrent requests a moment to join this transaction.
+                await asyncio.sleep(self.flush_interval)
+            while rows < self.batch_rows and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item.instances)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        rows = sum(len(pending.instances) for pending in batch)
+        with stage("db.write_behind"):
+            try:
+                await _commit([instance for pending in batch for instance in pending.instances])
+            except Exception:
+                logger.warning("Write-behind batch of %d rows failed; retrying per submission", rows)
+                for pending in batch:
+                    try:
+                        await _commit(pending.instances)
+                    except Exception as exc:
+                        self.failed += len(pending.instances)
+                        logger.exception("Dropping %d write-behind rows", len(pending.instances))
+                        _resolve(pending, exc)
+                    else:
+                        self.written += len(pending.instances)
+                        _resolve(pending)
+            else:
+                self.written += rows
+                for pending in batch:
+                    _resolve(pending)
+        self.batches += 1
+        record_rows("db.write_behind", rows)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {
+            ("queued",): float(depth),
+            ("written",): float(self.written),
+            ("failed",): float(self.failed),
+            ("batches",): float(self.batches),
+        }
+
+
+async def _commit(instances: List[Base]) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add_all(instances)
+        try:
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            raise
+
+
+def _resolve(pending: _Pending, error: Exception | None = None) -> None:
+    if pending.done is None or pending.done.done():
+        return
+    if error is None:
+        pending.done.set_result(None)
+    else:
+        pending.done.set_exception(error)
+
+
+write_behind = WriteBehindQueue(
+    settings.persistence_queue_size, settings.persistence_batch_rows, settings.persistence_flush_ms / 1000
+)
+REGISTRY.gauge("risk_engine_write_behind", "Write-behind queue depth and rows written or dropped.", ["stat"], write_behind.samples)
+
+
+async def persist(db: AsyncSession, instances: Sequence[Base], ack: str | None = None) -> bool:
+    """Store analytics results according to ``PERSISTENCE_MODE``; returns whether they are committed.
+
+    In ``sync`` mode the request session commits before responding. In ``write_behind`` mode the
+    rows are queued, and the call waits for the batch commit only when ``ack`` is ``committed``.
+    """
+
+    if settings.persistence_mode != "write_behind":
+        db.add_all(instances)
+        with stage("db.commit"):
+            await db.commit()
+        return True
+    wait = (ack or settings.persistence_ack) == "committed"
+    await write_behind.submit(instances, wait=wait)
+    return wait
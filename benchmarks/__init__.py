@@ -0,0 +1 @@
+"""Benchmark suite for the risk engine services and ingest path."""
@@ -0,0 +1,204 @@
+"""Command line entry point: ``python -m benchmarks run|compare|load|imports|prompts``."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from benchmarks.history import append_run, compare_runs, load_history
+from benchmarks.runner import run_case
+
+DEFAULT_HISTORY = Path(__file__).parent / "results" / "history.json"
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def command_run(args: argparse.Namespace) -> int:
+    from benchmarks.cases import CASES
+
+    names = args.cases or list(CASES)
+    results = []
+    # One spawned process per case keeps peak RSS and warm caches from leaking between measurements.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as pool:
+        for name in names:
+            for rows in args.sizes:
+                if rows > CASES[name].max_rows and not args.no_caps:
+                    print(f"{name:<22} {rows:>10,}  skipped (max_rows={CASES[name].max_rows:,})")
+                    continue
+                try:
+                    result = pool.submit(run_case, name, rows, args.seed, args.repeat, args.warmup).result()
+                    print(f"{name:<22} {rows:>10,}  {result['seconds']:>9.4f}s  peak RSS {result['peak_rss_mb']:>8.1f} MB")
+                except Exception as exc:  # noqa: BLE001 - record failures instead of aborting the suite
+                    result = {"case": name, "rows": rows, "error": repr(exc)}
+                    print(f"{name:<22} {rows:>10,}  error: {exc!r}")
+                results.append(result)
+    run = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    append_run(args.history, run)
+    print(f"Appended run to {args.history}")
+    return 0
+
+
+def command_compare(args: argparse.Namespace) -> int:
+    history = load_history(args.history)
+    if len(history) < 2:
+        print("Need at least two runs in the history to compare.")
+        return 0
+    baseline, current = history[args.baseline], history[-1]
+    rows = compare_runs(baseline, current, args.threshold, args.rss_threshold)
+    print(f"baseline {baseline.get('git_commit')} @ {baseline['timestamp']}  vs  current {current.get('git_commit')} @ {current['timestamp']}")
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(
+            f"{row['case']:<22} {row['rows']:>10,}  {row['baseline_seconds']:>9.4f}s -> {row['seconds']:>9.4f}s "
+            f"({row['time_change']:+.1%} time, {row['rss_change']:+.1%} RSS) {flag}"
+        )
+    regressions = [row for row in rows if row["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} time / {args.rss_threshold:.0%} RSS")
+        return 1
+    return 0
+
+
+def command_load(args: argparse.Namespace) -> int:
+    from benchmarks import loadtest
+
+    temporary = loadtest.configure_database(args.database_url)
+    report = asyncio.run(
+        loadtest.run_load_test(
+            mode=args.mode,
+            levels=args.rates or args.concurrency,
+            open_loop=bool(args.rates),
+            duration=args.duration,
+            mix=loadtest.parse_mix(args.mix),
+            companies=args.companies,
+            rows=args.rows,
+            ingest_batch=args.ingest_batch,
+            workers=args.workers,
+            max_in_flight=args.max_in_flight,
+            seed=args.seed,
+            reset_database=temporary or args.reset_database,
+        )
+    )
+    print("\nsaturation point per endpoint:", json.dumps(report["saturation"]))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote report to {args.output}")
+    return 0
+
+
+def command_imports(args: argparse.Namespace) -> int:
+    from benchmarks.imports import import_report, measure_imports
+
+    report = import_report(measure_imports(args.module), args.top)
+    print(f"import {args.module}: {report['total_ms']:.1f} ms across {report['modules']} modules")
+    for name, milliseconds in report["packages"]:
+        print(f"  {name:<24} {milliseconds:>9.1f} ms")
+    failed = False
+    if report["heavy_loaded"]:
+        print(f"heavy packages imported eagerly: {', '.join(report['heavy_loaded'])}")
+        failed = not args.allow_heavy
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"over budget: {report['total_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+def command_prompts(args: argparse.Namespace) -> int:
+    from benchmarks.prompts import StubProvider, compare_prompts
+
+    provider = StubProvider(args.base_ms, args.per_token_ms)
+    results = compare_prompts(args.budgets, args.metadata_fields, provider, args.repeat, args.rows, args.seed)
+    print(f"{'metadata':>8} {'budget':>7} {'chars':>8} {'tokens':>7} {'explain ms':>11}  trimmed")
+    for row in results:
+        budget = row["token_budget"] or "full"
+        print(
+            f"{row['metadata_fields']:>8} {budget:>7} {row['prompt_chars']:>8,} {row['estimated_tokens']:>7,} "
+            f"{row['explain_ms']:>11.1f}  {','.join(row['trimmed']) or '-'}"
+        )
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--history", type=Path, default=DEFAULT_HISTORY)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", parents=[common], help="run benchmark cases and append results to the history")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="row counts (1k to 10M)")
+    run_parser.add_argument("--cases", nargs="+", help="subset of case names")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--warmup", type=int, default=1, help="untimed iterations before measuring")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--no-caps", action="store_true", help="ignore per-case max_rows limits")
+    run_parser.set_defaults(handler=command_run)
+
+    compare_parser = commands.add_parser("compare", parents=[common], help="compare the latest run against a baseline run")
+    compare_parser.add_argument("--baseline", type=int, default=-2, help="history index of the baseline run")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="allowed fractional slowdown")
+    compare_parser.add_argument("--rss-threshold", type=float, default=0.25, help="allowed fractional peak RSS growth")
+    compare_parser.set_defaults(handler=command_compare)
+
+    load_parser = commands.add_parser("load", help="drive the HTTP API and report per-endpoint latency percentiles")
+    load_parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    load_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    load_parser.add_argument("--database-url", help="defaults to a temporary SQLite file; a local Postgres URL also works")
+    load_parser.add_argument("--reset-database", action="store_true", help="allow dropping and reseeding every table in --database-url")
+    load_parser.add_argument("--mix", help="endpoint weights, e.g. ingest=1,risk=2,forecast=2,simulate=2,anomalies=1")
+    load_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="closed-loop concurrency levels")
+    load_parser.add_argument("--rates", type=float, nargs="+", help="open-loop request rates (req/s) instead of concurrency")
+    load_parser.add_argument("--max-in-flight", type=int, default=1000, help="open-loop cap before arrivals are dropped")
+    load_parser.add_argument("--duration", type=float, default=20.0, help="seconds per load level")
+    load_parser.add_argument("--companies", type=int, default=5)
+    load_parser.add_argument("--rows", type=int, default=5_000, help="seeded transactions per company")
+    load_parser.add_argument("--ingest-batch", type=int, default=100)
+    load_parser.add_argument("--seed", type=int, default=42)
+    load_parser.add_argument("--output", type=Path, help="write the JSON report here")
+    load_parser.set_defaults(handler=command_load)
+
+    imports_parser = commands.add_parser("imports", help="report import time of the app and fail over budget")
+    imports_parser.add_argument("--module", default="app.main")
+    imports_parser.add_argument("--budget-ms", type=float, help="fail when total import time exceeds this")
+    imports_parser.add_argument("--top", type=int, default=15, help="packages to list")
+    imports_parser.add_argument("--allow-heavy", action="store_true", help="do not fail when sklearn/statsmodels/scipy/anthropic load eagerly")
+    imports_parser.set_defaults(handler=command_imports)
+
+    prompts_parser = commands.add_parser("prompts", help="compare explainer prompt size and stub-provider latency by token budget")
+    prompts_parser.add_argument("--budgets", type=int, nargs="+", default=[0, 600], help="token budgets; 0 is the verbose prompt")
+    prompts_parser.add_argument("--metadata-fields", type=int, nargs="+", default=[0, 20, 100], help="extra metadata entries per report")
+    prompts_parser.add_argument("--base-ms", type=float, default=50.0, help="stub provider fixed latency")
+    prompts_parser.add_argument("--per-token-ms", type=float, default=0.1, help="stub provider latency per input token")
+    prompts_parser.add_argument("--rows", type=int, default=5_000)
+    prompts_parser.add_argument("--repeat", type=int, default=3)
+    prompts_parser.add_argument("--seed", type=int, default=42)
+    prompts_parser.set_defaults(handler=command_prompts)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
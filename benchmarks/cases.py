@@ -0,0 +1,154 @@
+"""Benchmark cases for the risk engine services and the ingest router."""
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+# Benchmarks always run against a throwaway SQLite database; settings are read on first app import.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.gettempdir()}/risk-bench-{os.getpid()}.db"
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.company import Company  # noqa: E402
+from app.services.anomaly_detector import detect_anomalies  # noqa: E402
+from app.services.dedup_index import fingerprint_index  # noqa: E402
+from app.services.forecasting import forecast_financials  # noqa: E402
+from app.services.fx_rates import FxRateTable  # noqa: E402
+from app.services.risk_engine import generate_risk_report  # noqa: E402
+from app.services.rule_dsl import RuleSpec  # noqa: E402
+from app.services.rules_engine import build_rule_plan, evaluate_rules, evaluate_rules_grouped  # noqa: E402
+from app.services.simulation_engine import run_simulation  # noqa: E402
+from app.utils.preprocess import to_dataframe  # noqa: E402
+from benchmarks.generator import generate_transactions, to_records  # noqa: E402
+
+INGEST_BATCH_SIZE = 5_000
+PORTFOLIO_COMPANIES = 20
+TENANT_RULES = 50
+FX_RATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_data", "fx_rates.csv")
+
+
+@dataclass
+class BenchmarkCase:
+    """A timed operation; ``prepare`` builds its input and is excluded from timing."""
+
+    name: str
+    prepare: Callable[[int, int], Any]
+    run: Callable[[Any], Any]
+    max_rows: int = 10_000_000
+    fresh_state: bool = False
+
+
+class StaticExplainer:
+    """LLM provider stub so report benchmarks measure the engine, not the network."""
+
+    def explain(self, prompt: str) -> str:
+        return "benchmark narrative"
+
+
+def _frame(rows: int, seed: int) -> Any:
+    return generate_transactions(rows, seed=seed)
+
+
+def _db_records(rows: int, seed: int) -> Any:
+    frame = generate_transactions(rows, seed=seed)
+    return frame.assign(transaction_date=frame["transaction_date"].dt.date).to_dict(orient="records")
+
+
+def _to_dataframe(records: Any) -> Any:
+    return to_dataframe(records)
+
+
+def _risk_report(frame: Any) -> Any:
+    return generate_risk_report(frame, metadata={"company": "bench"}, explainer=StaticExplainer())
+
+
+def _rules(frame: Any) -> Any:
+    return evaluate_rules(frame)
+
+
+def _portfolio_frame(rows: int, seed: int) -> Any:
+    frame = generate_transactions(rows, seed=seed)
+    frame["company_id"] = frame.index % PORTFOLIO_COMPANIES
+    tenant_rules = [
+        RuleSpec(f"rent_cap_{index}", f"category_spend('rent') > {1_000 * (index + 1)}", company_id=index % PORTFOLIO_COMPANIES)
+        for index in range(TENANT_RULES)
+    ]
+    return frame, build_rule_plan(tenant_rules)
+
+
+def _rules_grouped(state: Any) -> Any:
+    frame, plan = state
+    return evaluate_rules_grouped(frame, "company_id", plan)
+
+
+def _fx_frame(rows: int, seed: int) -> Any:
+    frame = generate_transactions(rows, seed=seed)
+    frame["currency"] = np.array(["USD", "EUR", "GBP"])[frame.index % 3]
+    table = FxRateTable(FX_RATES_FILE, reload_seconds=float("inf"))
+    table.refresh()
+    return frame, table
+
+
+def _fx_convert(state: Any) -> Any:
+    frame, table = state
+    return table.convert(frame, "USD")
+
+
+def _forecast(frame: Any) -> Any:
+    return forecast_financials(frame)
+
+
+def _simulation(frame: Any) -> Any:
+    return run_simulation(frame)
+
+
+def _anomalies(frame: Any) -> Any:
+    return detect_anomalies(frame)
+
+
+def _prepare_ingest(rows: int, seed: int) -> Any:
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        company = Company(name="bench")
+        db.add(company)
+        db.commit()
+        company_id = company.id
+    # Ids restart after drop_all; a filter left from a previous run would flag every row as a duplicate.
+    fingerprint_index.forget(company_id)
+    client = TestClient(app)
+    client.__enter__()
+    records = to_records(generate_transactions(rows, seed=seed))
+    batches = [records[start : start + INGEST_BATCH_SIZE] for start in range(0, len(records), INGEST_BATCH_SIZE)]
+    return client, company_id, batches
+
+
+def _ingest(state: Any) -> None:
+    client, company_id, batches = state
+    try:
+        for batch in batches:
+            response = client.post("/ingest/transactions", json={"company_id": company_id, "records": batch})
+            response.raise_for_status()
+    finally:
+        client.__exit__(None, None, None)
+
+
+CASES: Dict[str, BenchmarkCase] = {
+    case.name: case
+    for case in [
+        BenchmarkCase("to_dataframe", _db_records, _to_dataframe, max_rows=1_000_000),
+        BenchmarkCase("generate_risk_report", _frame, _risk_report),
+        BenchmarkCase("evaluate_rules", _frame, _rules),
+        BenchmarkCase("evaluate_rules_grouped", _portfolio_frame, _rules_grouped),
+        BenchmarkCase("fx_convert", _fx_frame, _fx_convert),
+        BenchmarkCase("forecast_financials", _frame, _forecast),
+        BenchmarkCase("run_simulation", _frame, _simulation),
+        BenchmarkCase("detect_anomalies", _frame, _anomalies, max_rows=100_000),
+        BenchmarkCase("ingest", _prepare_ingest, _ingest, max_rows=100_000, fresh_state=True),
+    ]
+}
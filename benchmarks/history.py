@@ -0,0 +1,48 @@
+"""JSON benchmark history and regression comparison."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def load_history(path: Path) -> List[dict]:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def append_run(path: Path, run: dict) -> None:
+    history = load_history(path)
+    history.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(history, indent=2), encoding="utf-8")
+
+
+def _index(run: dict) -> Dict[Tuple[str, int], dict]:
+    return {(result["case"], result["rows"]): result for result in run["results"] if "error" not in result}
+
+
+def compare_runs(baseline: dict, current: dict, threshold: float, rss_threshold: float) -> List[dict]:
+    """Compare matching (case, rows) results; ``regressed`` marks slowdowns or RSS growth beyond the thresholds."""
+
+    before = _index(baseline)
+    rows = []
+    for key, result in sorted(_index(current).items()):
+        if key not in before:
+            continue
+        old = before[key]
+        time_change = result["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        rss_change = result["peak_rss_mb"] / old["peak_rss_mb"] - 1 if old["peak_rss_mb"] else 0.0
+        rows.append(
+            {
+                "case": key[0],
+                "rows": key[1],
+                "baseline_seconds": old["seconds"],
+                "seconds": result["seconds"],
+                "time_change": time_change,
+                "rss_change": rss_change,
+                "regressed": time_change > threshold or rss_change > rss_threshold,
+            }
+        )
+    return rows
@@ -0,0 +1,42 @@
+"""Import-time report for the application entry point using ``python -X importtime``."""
+from __future__ import annotations
+
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+HEAVY_PACKAGES = ("sklearn", "statsmodels", "scipy", "anthropic")
+
+
+def measure_imports(module: str = "app.main") -> List[Dict[str, Any]]:
+    """Import ``module`` in a fresh interpreter and return one row per imported module."""
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+
+def import_report(rows: List[Dict[str, Any]], top: int = 15) -> Dict[str, Any]:
+    """Aggregate self time per top-level package and flag heavy optional dependencies."""
+
+    packages: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        packages[row["module"].split(".")[0]] += row["self_us"]
+    loaded = {row["module"].split(".")[0] for row in rows}
+    return {
+        "total_ms": sum(row["self_us"] for row in rows) / 1000,
+        "modules": len(rows),
+        "packages": sorted(((name, us / 1000) for name, us in packages.items()), key=lambda item: item[1], reverse=True)[:top],
+        "heavy_loaded": sorted(loaded & set(HEAVY_PACKAGES)),
+    }
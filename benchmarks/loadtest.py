@@ -0,0 +1,302 @@
+"""HTTP load driver reporting throughput, latency percentiles and saturation per endpoint.
+
+The app is served either in-process through ``httpx.ASGITransport`` (client and server share one
+event loop, so numbers include client overhead) or by a ``uvicorn`` subprocess on localhost, against
+a SQLite or local Postgres database seeded with generated transactions.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.generator import generate_transactions, to_records
+
+ENDPOINTS = ["ingest", "risk", "forecast", "simulate", "anomalies"]
+DEFAULT_MIX = {"ingest": 1, "risk": 2, "forecast": 2, "simulate": 2, "anomalies": 1}
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Counter = field(default_factory=Counter)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        requests = len(self.latencies)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "throughput_rps": (requests - self.errors) / elapsed if elapsed else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p90_ms": float(np.percentile(latencies, 90)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+        }
+
+
+def parse_mix(spec: str | None) -> Dict[str, float]:
+    """Parse ``"risk=2,forecast=1"`` into endpoint weights."""
+
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {ENDPOINTS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def seed_database(companies: int, rows: int, seed: int, reset: bool = False) -> List[int]:
+    """Recreate the tables and bulk-insert ``rows`` generated transactions for each company.
+
+    Every table is dropped first, so ``reset`` must be set unless the database is the temporary
+    file chosen by :func:`configure_database`.
+    """
+
+    from sqlalchemy import insert
+
+    from app import database
+    from app.models.company import Company
+    from app.models.transaction import Transaction
+    from app.utils.preprocess import fingerprint_transactions
+
+    if not reset:
+        raise RuntimeError(
+            f"Refusing to drop every table in {database.engine.url!r}; pass --reset-database to seed a non-temporary database"
+        )
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    company_ids = []
+    with database.SessionLocal() as db:
+        for index in range(companies):
+            company = Company(name=f"loadtest-{index}")
+            db.add(company)
+            db.flush()
+            frame = generate_transactions(rows, seed=seed + index)
+            frame["unique_id"] = frame["unique_id"] + f"-c{company.id}"
+            frame["fingerprint"] = fingerprint_transactions(frame)
+            frame["transaction_date"] = frame["transaction_date"].dt.date
+            frame["company_id"] = company.id
+            db.execute(insert(Transaction), frame.to_dict(orient="records"))
+            company_ids.append(company.id)
+        db.commit()
+    return company_ids
+
+
+class RequestFactory:
+    """Builds requests for the mix; ingest bodies are pre-generated so the driver stays cheap."""
+
+    def __init__(self, company_ids: List[int], mix: Dict[str, float], ingest_batch: int, seed: int, payloads: int = 64) -> None:
+        self.company_ids = company_ids
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.random = random.Random(seed)
+        self.ingest_payloads = itertools.cycle(
+            [to_records(generate_transactions(ingest_batch, seed=seed * 1000 + index)) for index in range(payloads)]
+            if "ingest" in mix
+            else [[]]
+        )
+
+    def next(self) -> Tuple[str, str, Dict[str, Any] | None]:
+        name = self.random.choices(self.names, self.weights)[0]
+        company_id = self.random.choice(self.company_ids)
+        if name == "ingest":
+            return name, "/ingest/transactions", {"company_id": company_id, "records": next(self.ingest_payloads)}
+        path = {"risk": f"/risk/report/{company_id}"}.get(name, f"/{name}/{company_id}")
+        return name, path, None
+
+
+async def _send(client: httpx.AsyncClient, factory: RequestFactory, stats: Dict[str, EndpointStats]) -> None:
+    name, path, body = factory.next()
+    start = time.perf_counter()
+    try:
+        response = await client.post(path, json=body)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    endpoint = stats.setdefault(name, EndpointStats())
+    endpoint.latencies.append(time.perf_counter() - start)
+    endpoint.statuses[status] += 1
+    if status == 0 or status >= 400:
+        endpoint.errors += 1
+
+
+async def run_closed_loop(client: httpx.AsyncClient, factory: RequestFactory, concurrency: int, duration: float) -> Tuple[Dict[str, EndpointStats], float, int]:
+    """``concurrency`` workers each issue the next request as soon as the previous one returns."""
+
+    stats: Dict[str, EndpointStats] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await _send(client, factory, stats)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats, time.perf_counter() - start, 0
+
+
+async def run_open_loop(client: httpx.AsyncClient, factory: RequestFactory, rate: float, duration: float, max_in_flight: int) -> Tuple[Dict[str, EndpointStats], float, int]:
+    """Issue requests at a fixed arrival ``rate``; arrivals while ``max_in_flight`` are pending are dropped."""
+
+    stats: Dict[str, EndpointStats] = {}
+    in_flight: set = set()
+    dropped = 0
+    start = time.perf_counter()
+    for index in itertools.count():
+        scheduled = start + index / rate
+        if scheduled - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(_send(client, factory, stats))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return stats, time.perf_counter() - start, dropped
+
+
+def saturation_points(levels: List[Dict[str, Any]], min_gain: float = 0.1, max_error_rate: float = 0.01) -> Dict[str, Any]:
+    """First load level per endpoint where throughput stops growing by ``min_gain`` or errors exceed the limit."""
+
+    points: Dict[str, Any] = {}
+    names = {name for level in levels for name in level["endpoints"]}
+    for name in names:
+        previous = None
+        for level in levels:
+            current = level["endpoints"].get(name)
+            if current is None:
+                continue
+            if current["error_rate"] > max_error_rate or (
+                previous is not None and current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain)
+            ):
+                points[name] = level["load"]
+                break
+            previous = current
+        points.setdefault(name, None)
+    return points
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+async def run_load_test(
+    mode: str,
+    levels: List[float],
+    open_loop: bool,
+    duration: float,
+    mix: Dict[str, float],
+    companies: int,
+    rows: int,
+    ingest_batch: int,
+    workers: int,
+    max_in_flight: int,
+    seed: int,
+    reset_database: bool = False,
+) -> Dict[str, Any]:
+    """Seed the database, start the app and drive each load level; returns the full report."""
+
+    company_ids = seed_database(companies, rows, seed, reset=reset_database)
+    factory = RequestFactory(company_ids, mix, ingest_batch, seed)
+    server: subprocess.Popen | None = None
+    lifespan: Any = contextlib.nullcontext()
+    if mode == "uvicorn":
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            env=os.environ.copy(),
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        await _wait_ready(base_url)
+        transport = None
+    else:
+        from app.main import app
+
+        base_url = "http://loadtest"
+        transport = httpx.ASGITransport(app=app)
+        # ASGITransport sends no lifespan events, so run the startup and shutdown handlers around the test.
+        lifespan = app.router.lifespan_context(app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    results = []
+    try:
+        async with lifespan, httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=120.0) as client:
+            for load in levels:
+                if open_loop:
+                    stats, elapsed, dropped = await run_open_loop(client, factory, load, duration, max_in_flight)
+                else:
+                    stats, elapsed, dropped = await run_closed_loop(client, factory, int(load), duration)
+                endpoints = {name: endpoint.summary(elapsed) for name, endpoint in sorted(stats.items())}
+                results.append({"load": load, "elapsed": elapsed, "dropped": dropped, "endpoints": endpoints})
+                _print_level(load, "rate" if open_loop else "concurrency", endpoints, dropped)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    return {
+        "mode": mode,
+        "load_kind": "rate" if open_loop else "concurrency",
+        "duration": duration,
+        "mix": mix,
+        "companies": companies,
+        "rows_per_company": rows,
+        "levels": results,
+        "saturation": saturation_points(results),
+    }
+
+
+def _print_level(load: float, kind: str, endpoints: Dict[str, Dict[str, Any]], dropped: int) -> None:
+    print(f"\n{kind}={load:g}" + (f"  dropped={dropped}" if dropped else ""))
+    print(f"{'endpoint':<10} {'reqs':>7} {'err%':>6} {'rps':>8} {'p50ms':>9} {'p90ms':>9} {'p99ms':>9} {'maxms':>9}")
+    for name, row in endpoints.items():
+        print(
+            f"{name:<10} {row['requests']:>7} {row['error_rate'] * 100:>5.1f}% {row['throughput_rps']:>8.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}"
+        )
+
+
+def configure_database(database_url: str | None) -> bool:
+    """Point the app at ``database_url`` (default: a temporary SQLite file) before it is imported.
+
+    Returns whether the database is the temporary file, which is always safe to reset.
+    """
+
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{tempfile.gettempdir()}/risk-loadtest-{os.getpid()}.db"
+    return database_url is None
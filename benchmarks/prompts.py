@@ -0,0 +1,58 @@
+"""Prompt size and explain latency of the verbose vs token-budgeted explainer prompt."""
+from __future__ import annotations
+
+import statistics
+import time
+from typing import Any, Dict, List
+
+from app.services.llm_explainer import build_prompt, estimate_tokens
+from app.services.risk_engine import generate_risk_report
+from benchmarks.generator import generate_transactions
+
+
+class StubProvider:
+    """Local provider whose latency grows with prompt size, approximating LLM prefill cost."""
+
+    model = "stub"
+
+    def __init__(self, base_ms: float = 50.0, per_token_ms: float = 0.1) -> None:
+        self.base_ms = base_ms
+        self.per_token_ms = per_token_ms
+
+    def explain(self, prompt: str) -> str:
+        time.sleep((self.base_ms + self.per_token_ms * estimate_tokens(prompt)) / 1000)
+        return "stub narrative"
+
+
+def report_payload(rows: int, metadata_fields: int, seed: int) -> Dict[str, Any]:
+    """Summary payload of a generated report, padded with ``metadata_fields`` extra metadata entries."""
+
+    frame = generate_transactions(rows, seed=seed)
+    metadata = {"company": "bench", **{f"field_{index}": f"value {index} " * 8 for index in range(metadata_fields)}}
+    return generate_risk_report(frame, metadata=metadata, explain=False)["summary_payload"]
+
+
+def compare_prompts(
+    budgets: List[int], metadata_sizes: List[int], provider: StubProvider, repeat: int, rows: int, seed: int
+) -> List[Dict[str, Any]]:
+    results = []
+    for metadata_fields in metadata_sizes:
+        payload = report_payload(rows, metadata_fields, seed)
+        for budget in budgets:
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                plan = build_prompt(payload, budget)
+                provider.explain(plan.text)
+                latencies.append(time.perf_counter() - start)
+            results.append(
+                {
+                    "metadata_fields": metadata_fields,
+                    "token_budget": budget,
+                    "prompt_chars": len(plan.text),
+                    "estimated_tokens": plan.estimated_tokens,
+                    "trimmed": plan.trimmed,
+                    "explain_ms": statistics.median(latencies) * 1000,
+                }
+            )
+    return results
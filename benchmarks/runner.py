@@ -0,0 +1,51 @@
+"""Run a single benchmark case inside a fresh worker process."""
+from __future__ import annotations
+
+import resource
+import statistics
+import sys
+import time
+import warnings
+from typing import List
+
+# ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+RSS_DIVISOR = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / RSS_DIVISOR
+
+
+def run_case(name: str, rows: int, seed: int, repeat: int, warmup: int = 1) -> dict:
+    """Run one case in the current (fresh) process and return its timings and peak RSS.
+
+    ``warmup`` untimed iterations run first so lazy imports and caches do not skew the timings.
+    """
+
+    timings: List[float] = []
+    state = None
+    prepare_rss = 0.0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from benchmarks.cases import CASES
+
+        # statsmodels re-enables ConvergenceWarning on import, so silence again afterwards.
+        warnings.simplefilter("ignore")
+        case = CASES[name]
+        for iteration in range(warmup + repeat):
+            if state is None or case.fresh_state:
+                state = case.prepare(rows, seed)
+                prepare_rss = max(prepare_rss, _peak_rss_mb())
+            start = time.perf_counter()
+            case.run(state)
+            if iteration >= warmup:
+                timings.append(time.perf_counter() - start)
+    return {
+        "case": name,
+        "rows": rows,
+        "seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "repeat": repeat,
+        "prepare_peak_rss_mb": prepare_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
@@ -0,0 +1,30 @@
+"""Shared fixtures. Settings are read on first import of the app, so the environment is set here first."""
+import os
+import tempfile
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='risk-engine-tests-')}/test.db"
+os.environ["LLM_PROVIDER"] = "none"
+os.environ.pop("ANTHROPIC_API_KEY", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.company import Company  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def company_id(client) -> int:
+    with SessionLocal() as db:
+        company = Company(name=f"test-{uuid.uuid4().hex[:12]}")
+        db.add(company)
+        db.commit()
+        return company.id
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api import admission
+from app.api.admission import AdmissionController, AdmissionRejected, admit
+from app.database import AsyncSessionLocal
+from app.models.company import Company
+from app.utils.metrics import REGISTRY
+
+
+def _controller(**overrides) -> AdmissionController:
+    options = dict(
+        max_concurrency=2,
+        max_cost=100.0,
+        tenant_max_concurrency=1,
+        tenant_max_cost=100.0,
+        queue_size=4,
+        tenant_queue_size=2,
+        max_wait=1.0,
+    )
+    return AdmissionController(**{**options, **overrides})
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_requests_queue_until_capacity_is_released():
+    controller = _controller(max_concurrency=1)
+
+    async def run():
+        cost = await controller.acquire("a", 1.0)
+        waiting = asyncio.create_task(controller.acquire("b", 1.0))
+        await _settle()
+        queued = controller.samples()[("queued",)]
+        controller.release("a", cost, 0.1)
+        await waiting
+        return queued
+
+    assert asyncio.run(run()) == 1.0
+    assert controller.samples()[("queued",)] == 0.0
+    assert controller.outcomes()[("admitted",)] == 2.0
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    controller = _controller(max_concurrency=1, tenant_max_concurrency=5)
+    order = []
+
+    async def run():
+        cost = await controller.acquire("a", 1.0)
+
+        async def request(name):
+            await controller.acquire(name, 1.0)
+            order.append(name)
+            controller.release(name, 1.0, 0.01)
+
+        tasks = [asyncio.create_task(request(name)) for name in ("b", "c", "d")]
+        await _settle()
+        controller.release("a", cost, 0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["b", "c", "d"]
+
+
+def test_a_tenant_over_its_budget_does_not_block_others():
+    controller = _controller(max_concurrency=4, tenant_max_concurrency=1)
+
+    async def run():
+        await controller.acquire("a", 1.0)
+        blocked = asyncio.create_task(controller.acquire("a", 1.0))
+        await _settle()
+        await asyncio.wait_for(controller.acquire("b", 1.0), 0.5)
+        assert not blocked.done()
+        controller.release("a", 1.0, 0.01)
+        await blocked
+
+    asyncio.run(run())
+
+
+def test_full_queues_reject_with_retry_after():
+    controller = _controller(max_concurrency=1, queue_size=5, tenant_queue_size=1)
+
+    async def run():
+        await controller.acquire("a", 1.0)
+        queued = asyncio.create_task(controller.acquire("a", 1.0))
+        await _settle()
+        with pytest.raises(AdmissionRejected) as tenant_full:
+            await controller.acquire("a", 1.0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        return tenant_full.value
+
+    rejected = asyncio.run(run())
+    assert rejected.retry_after >= 1
+    assert controller.outcomes()[("queue_full",)] == 1.0
+    assert controller.samples()[("queued",)] == 0.0
+
+
+def test_queued_requests_time_out():
+    controller = _controller(max_concurrency=1, max_wait=0.05)
+
+    async def run():
+        await controller.acquire("a", 1.0)
+        with pytest.raises(AdmissionRejected, match="Timed out"):
+            await controller.acquire("b", 1.0)
+
+    asyncio.run(run())
+    assert controller.outcomes()[("timeout",)] == 1.0
+
+
+def test_expensive_requests_are_charged_at_the_budget():
+    controller = _controller(max_cost=10.0, tenant_max_cost=5.0)
+
+    async def run():
+        return await controller.acquire("a", 1_000.0)
+
+    assert asyncio.run(run()) == 5.0
+
+
+def test_admit_answers_429_and_releases_the_connection_before_waiting(company_id, monkeypatch):
+    controller = _controller(max_concurrency=1, queue_size=1, tenant_queue_size=1, max_wait=0.5)
+    monkeypatch.setattr(admission, "admission_controller", controller)
+    monkeypatch.setattr(admission.settings, "admission_enabled", True)
+
+    async def run():
+        held = await controller.acquire("other", 1.0)
+        async with AsyncSessionLocal() as db, AsyncSessionLocal() as second:
+            await db.scalar(select(Company).where(Company.id == company_id))
+            assert db.in_transaction()
+
+            async def queued():
+                async with admit(db, "risk", [company_id]):
+                    pass
+
+            task = asyncio.create_task(queued())
+            await asyncio.sleep(0.05)
+            released = not db.in_transaction()
+            with pytest.raises(HTTPException) as rejected:
+                async with admit(second, "risk", [company_id]):
+                    pass
+            controller.release("other", held, 0.01)
+            await task
+        return released, rejected.value
+
+    released, rejected = asyncio.run(run())
+    assert released
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+
+
+def test_admission_outcomes_are_exported_as_counters():
+    rendered = REGISTRY.render()
+    assert "# TYPE risk_engine_admission_requests_total counter" in rendered
+    assert 'risk_engine_admission_requests_total{outcome="admitted"}' in rendered
+    assert 'risk_engine_admission{stat="admitted"}' not in rendered
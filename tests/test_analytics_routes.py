@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture
+def seeded_company(client, company_id):
+    records = [
+        {"unique_id": f"routes-{company_id}-{index}", "amount": amount, "category": category, "transaction_date": f"2024-0{1 + index % 6}-{1 + index:02d}"}
+        for index, (amount, category) in enumerate([(500.0, "sales"), (-120.0, "rent"), (800.0, "sales"), (-60.0, "utilities"), (-90.0, "suppliers"), (300.0, "accounts_receivable")] * 3)
+    ]
+    client.post("/ingest/transactions", json={"company_id": company_id, "records": records}).raise_for_status()
+    return company_id
+
+
+@pytest.mark.parametrize("path", ["/risk/report/{}", "/forecast/{}", "/simulate/{}"])
+def test_analytics_responses_validate(client, seeded_company, path):
+    response = client.post(path.format(seeded_company))
+    assert response.status_code == 200, response.text
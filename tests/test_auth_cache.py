@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import SessionLocal
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.security import dependencies
+from app.security.auth_handler import create_access_token, verify_token
+from app.security.dependencies import get_current_user
+from app.security.user_cache import RevocationList, UserCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    cache, revocations = UserCache(ttl_seconds=60, max_entries=100), RevocationList(refresh_seconds=3600)
+    monkeypatch.setattr(dependencies, "user_cache", cache)
+    monkeypatch.setattr(dependencies, "revocation_list", revocations)
+    return cache, revocations
+
+
+@pytest.fixture
+def user(client):
+    with SessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex[:10]}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user.id, user.email
+
+
+def _token(user_id: int, email: str) -> str:
+    return create_access_token({"sub": str(user_id), "email": email})
+
+
+def _current(token: str) -> User:
+    return asyncio.run(get_current_user(token))
+
+
+def _no_database():
+    raise AssertionError("the database was queried")
+
+
+def test_second_request_is_served_from_the_cache(user, fresh_caches, monkeypatch):
+    user_id, email = user
+    token = _token(user_id, email)
+    assert _current(token).email == email
+    monkeypatch.setattr(dependencies, "AsyncSessionLocal", _no_database)
+    assert _current(token).id == user_id
+    assert fresh_caches[0].samples()[("hits",)] == 1.0
+
+
+def test_orm_updates_evict_the_cached_user(user, fresh_caches, monkeypatch):
+    user_id, email = user
+    token = _token(user_id, email)
+    _current(token)
+    # The ORM hook invalidates the module-level cache; point it at this test's cache.
+    monkeypatch.setattr("app.security.user_cache.user_cache", fresh_caches[0])
+    with SessionLocal() as db:
+        db.get(User, user_id).email = f"new-{email}"
+        db.commit()
+    assert _current(token).email == f"new-{email}"
+
+
+def test_local_logout_revokes_at_once(client, user, fresh_caches, monkeypatch):
+    monkeypatch.setattr("app.routers.auth.revocation_list", fresh_caches[1])
+    monkeypatch.setattr("app.routers.auth.user_cache", fresh_caches[0])
+    user_id, email = user
+    token = _token(user_id, email)
+    _current(token)
+    assert client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"}).json() == {"revoked": True}
+    with pytest.raises(HTTPException, match="Token revoked"):
+        _current(token)
+
+
+def test_other_workers_revocations_apply_after_the_refresh_window(user, fresh_caches):
+    user_id, email = user
+    token = _token(user_id, email)
+    revocations = fresh_caches[1]
+    _current(token)  # the first request loads the (empty) revocation snapshot
+    with SessionLocal() as db:
+        db.add(RevokedToken(jti=verify_token(token)["jti"], expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.commit()
+    assert _current(token).id == user_id  # still inside the refresh window
+    revocations._refreshed_at = float("-inf")  # the window has passed
+    with pytest.raises(HTTPException, match="Token revoked"):
+        _current(token)
+
+
+def test_expired_revocations_are_pruned_on_refresh(fresh_caches):
+    revocations = fresh_caches[1]
+    revocations.add("old", datetime.utcnow() - timedelta(seconds=1))
+    revocations.add("live", datetime.utcnow() + timedelta(hours=1))
+    asyncio.run(revocations.refresh_if_stale())
+    assert not revocations.is_revoked("old")
+    assert revocations.is_revoked("live")
+
+
+def test_token_claims_mode_skips_the_database(fresh_caches, monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "auth_trust_token_claims", True)
+    monkeypatch.setattr(dependencies, "AsyncSessionLocal", _no_database)
+    current = _current(_token(987_654, "claims@example.com"))
+    assert (current.id, current.email) == (987_654, "claims@example.com")
+
+
+def test_invalid_tokens_are_rejected():
+    with pytest.raises(HTTPException) as rejected:
+        _current("not-a-token")
+    assert rejected.value.status_code == 401
@@ -0,0 +1,147 @@
+import asyncio
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import inspect, select
+
+from app.database import AsyncSessionLocal, SessionLocal, engine
+from app.models.transaction import Transaction
+from app.routers import ingest
+from app.services.dedup_index import BloomFilter, FingerprintIndex, backfill_fingerprints
+from app.utils.preprocess import fingerprint_transactions, to_dataframe
+
+
+def _records(count: int, start: int = 0):
+    prefix = uuid.uuid4().hex[:8]
+    return [
+        {
+            "unique_id": f"{prefix}-{index}",
+            "amount": -10.0 - index,
+            "category": "suppliers",
+            "description": f"Supplier {index}",
+            "transaction_date": date(2024, 1, 1 + index % 28).isoformat(),
+        }
+        for index in range(start, start + count)
+    ]
+
+
+def _fingerprints(records):
+    return fingerprint_transactions(to_dataframe(records)).tolist()
+
+
+def _store(company_id: int, records, fingerprints=None) -> None:
+    fingerprints = fingerprints if fingerprints is not None else _fingerprints(records)
+    with SessionLocal() as db:
+        db.add_all(
+            Transaction(
+                company_id=company_id,
+                unique_id=record["unique_id"],
+                amount=record["amount"],
+                category=record["category"],
+                description=record["description"],
+                transaction_date=date.fromisoformat(record["transaction_date"]),
+                fingerprint=fingerprint,
+            )
+            for record, fingerprint in zip(records, fingerprints)
+        )
+        db.commit()
+
+
+def _find_existing(index: FingerprintIndex, company_id: int, fingerprints):
+    async def lookup():
+        async with AsyncSessionLocal() as db:
+            return await index.find_existing(db, company_id, fingerprints)
+
+    return asyncio.run(lookup())
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(100, 0.01)
+    fingerprints = _fingerprints(_records(100))
+    for fingerprint in fingerprints:
+        bloom.add(fingerprint)
+    assert all(fingerprint in bloom for fingerprint in fingerprints)
+    assert bloom.estimated_false_positive_rate() < 0.02
+
+
+def test_false_positives_are_counted_against_the_database(company_id):
+    stored = _records(20)
+    _store(company_id, stored)
+    # A deliberately undersized filter so a good share of novel rows pass the Bloom check.
+    index = FingerprintIndex(expected_items=1, false_positive_rate=0.5)
+    novel = _fingerprints(_records(200, start=100))
+    assert _find_existing(index, company_id, novel) == set()
+    bloom = index._companies[company_id].bloom
+    passed = sum(1 for fingerprint in novel if fingerprint in bloom)
+    stats = index.stats(company_id)
+    assert passed > 0
+    assert stats["false_positives"] == stats["db_checked"] == passed
+    assert stats["bloom_rejections"] == len(novel) - passed
+    assert stats["duplicates"] == 0
+    assert stats["observed_false_positive_rate"] == pytest.approx(passed / len(novel))
+
+
+def test_rebuild_reads_and_backfills_the_table(company_id):
+    records = _records(30)
+    _store(company_id, records[:20])
+    _store(company_id, records[20:], fingerprints=[None] * 10)
+    index = FingerprintIndex()
+    with SessionLocal() as db:
+        entry = index.rebuild(db, company_id)
+        db.commit()
+        max_id = db.scalar(select(Transaction.id).where(Transaction.company_id == company_id).order_by(Transaction.id.desc()))
+    assert entry.bloom.count == 30
+    assert entry.watermark == max_id
+    assert all(fingerprint in entry.bloom for fingerprint in _fingerprints(records))
+    assert _find_existing(index, company_id, _fingerprints(records)) == set(_fingerprints(records))
+
+
+def test_backfill_salts_fingerprints_of_stored_duplicates(company_id):
+    original = _records(1)
+    copy = [{**original[0], "unique_id": f"{original[0]['unique_id']}-copy"}]
+    _store(company_id, original, fingerprints=[None])
+    _store(company_id, copy, fingerprints=[None])
+    with SessionLocal() as db:
+        assert backfill_fingerprints(db, company_id) == 2
+        db.commit()
+        stored = db.scalars(select(Transaction.fingerprint).where(Transaction.company_id == company_id).order_by(Transaction.id)).all()
+    assert stored[0] == _fingerprints(original)[0]
+    assert stored[1] != stored[0]
+
+
+def test_fingerprints_are_unique_per_company():
+    indexes = inspect(engine).get_indexes("transactions")
+    assert {"name": "uq_transactions_company_fingerprint", "unique": 1} in [
+        {"name": index["name"], "unique": int(index["unique"])} for index in indexes
+    ]
+
+
+def test_resent_rows_are_skipped_across_batches(client, company_id):
+    first = _records(10)
+    body = client.post("/ingest/batches", json={"company_id": company_id, "records": first}).json()
+    assert len(body["inserted"]) == 10
+    resent = [{**record, "unique_id": f"{record['unique_id']}-resent"} for record in first[:4]]
+    body = client.post("/ingest/batches", json={"company_id": company_id, "records": resent + _records(3, start=50)}).json()
+    assert len(body["inserted"]) == 3
+    assert body["duplicates_skipped"] == 4
+    assert client.get(f"/ingest/dedup/{company_id}").json()["duplicates"] == 4
+
+
+def test_stale_lookup_is_retried_after_a_conflict(client, company_id, monkeypatch):
+    first = _records(5)
+    client.post("/ingest/batches", json={"company_id": company_id, "records": first}).raise_for_status()
+    calls = []
+    lookup = ingest.lookup_duplicates
+
+    async def stale_then_current(db, *args):
+        calls.append(args)
+        # The first lookup misses rows committed by a "concurrent" batch, as if it ran before them.
+        return (set(), set()) if len(calls) == 1 else await lookup(db, *args)
+
+    monkeypatch.setattr(ingest, "lookup_duplicates", stale_then_current)
+    resent = [{**record, "unique_id": f"{record['unique_id']}-resent"} for record in first[:2]]
+    body = client.post("/ingest/batches", json={"company_id": company_id, "records": resent + _records(1, start=70)}).json()
+    assert len(calls) == 2
+    assert len(body["inserted"]) == 1
+    assert body["duplicates_skipped"] == 2
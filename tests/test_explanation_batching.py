@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services.explanation_service import ExplanationService
+from app.services.llm_explainer import FakeExplainer, _fallback_summary, pack_prompts, unpack_response
+
+
+def _payloads(count: int):
+    return {
+        f"company-{index}": {
+            "components": [{"name": "burn_rate", "score": float(index), "description": "Burn rate"}],
+            "rules": [],
+            "survival_probability": 50.0 + index,
+        }
+        for index in range(count)
+    }
+
+
+def _explain_many(service, payloads, provider):
+    return asyncio.run(service.explain_many(payloads, provider))
+
+
+def test_misses_are_packed_up_to_the_provider_batch_limit():
+    provider = FakeExplainer(max_batch_size=5)
+    results = _explain_many(ExplanationService(persist=False, batch_size=8), _payloads(12), provider)
+    assert provider.requests == 3
+    assert {result.source for result in results.values()} == {"llm"}
+
+
+def test_service_batch_size_applies_below_the_provider_limit():
+    provider = FakeExplainer(max_batch_size=64)
+    _explain_many(ExplanationService(persist=False, batch_size=4), _payloads(12), provider)
+    assert provider.requests == 3
+
+
+def test_batch_size_one_dispatches_single_calls():
+    provider = FakeExplainer()
+    _explain_many(ExplanationService(persist=False, batch_size=1), _payloads(3), provider)
+    assert provider.requests == 3
+
+
+def test_unpack_response_handles_reordered_missing_and_unknown_sections():
+    text = "preamble\n=== b ===\n  second  \n=== stray ===\nignored\n=== a ===\nfirst\n=== c ===\n   \n"
+    assert unpack_response(text, ["a", "b", "c", "d"]) == {"a": "first", "b": "second"}
+
+
+def test_pack_prompts_round_trips_through_unpack():
+    packed = pack_prompts({"x": "prompt x", "y": "prompt y"})
+    assert unpack_response(packed, ["x", "y"]) == {"x": "prompt x", "y": "prompt y"}
+
+
+def test_companies_missing_from_the_response_fall_back_individually():
+    payloads = _payloads(4)
+    provider = FakeExplainer(fail={"company-2"})
+    results = _explain_many(ExplanationService(persist=False, batch_size=8), payloads, provider)
+    assert results["company-2"].source == "fallback"
+    assert results["company-2"].text == _fallback_summary(payloads["company-2"])
+    assert {name for name, result in results.items() if result.source == "llm"} == {"company-0", "company-1", "company-3"}
+
+
+def test_fallback_texts_are_not_cached():
+    payloads = _payloads(3)
+    provider = FakeExplainer(fail={"company-1"})
+    service = ExplanationService(persist=False, batch_size=8)
+    _explain_many(service, payloads, provider)
+    provider.fail.clear()
+    results = _explain_many(service, payloads, provider)
+    assert provider.requests == 2
+    assert results["company-1"].source == "llm"
+    assert results["company-0"].source == results["company-2"].source == "memory"
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import time
+
+from app.services.explanation_service import ExplanationService
+from app.services.llm_explainer import _fallback_summary
+
+PAYLOAD = {
+    "components": [{"name": "burn_rate", "score": 40.0, "description": "Burn rate"}],
+    "rules": [],
+    "survival_probability": 72.5,
+}
+
+
+class CountingExplainer:
+    model = "counting"
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    def explain(self, prompt: str) -> str:
+        self.requests += 1
+        time.sleep(self.latency_ms / 1000)
+        return f"Narrative {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}"
+
+
+class BrokenExplainer:
+    model = "broken"
+
+    def explain(self, prompt: str) -> str:
+        raise RuntimeError("provider down")
+
+
+def test_second_request_is_served_from_memory():
+    provider = CountingExplainer()
+    service = ExplanationService(persist=False)
+    first = asyncio.run(service.explain(PAYLOAD, provider))
+    second = asyncio.run(service.explain(PAYLOAD, provider))
+    assert (first.source, second.source) == ("llm", "memory")
+    assert first.text == second.text
+    assert provider.requests == 1
+
+
+def test_changed_payload_misses():
+    provider = CountingExplainer()
+    service = ExplanationService(persist=False)
+    asyncio.run(service.explain(PAYLOAD, provider))
+    changed = asyncio.run(service.explain({**PAYLOAD, "survival_probability": 10.0}, provider))
+    assert changed.source == "llm"
+    assert provider.requests == 2
+
+
+def test_entries_expire_after_ttl():
+    provider = CountingExplainer()
+    service = ExplanationService(persist=False, ttl_seconds=0.05)
+    asyncio.run(service.explain(PAYLOAD, provider))
+    time.sleep(0.1)
+    assert asyncio.run(service.explain(PAYLOAD, provider)).source == "llm"
+    assert provider.requests == 2
+
+
+def test_concurrent_identical_payloads_share_one_provider_call():
+    provider = CountingExplainer(latency_ms=50)
+    service = ExplanationService(persist=False)
+
+    async def explain_twice():
+        return await asyncio.gather(service.explain(PAYLOAD, provider), service.explain(PAYLOAD, provider))
+
+    first, second = asyncio.run(explain_twice())
+    assert provider.requests == 1
+    assert sorted([first.source, second.source]) == ["coalesced", "llm"]
+    assert first.text == second.text
+
+
+def test_timeout_falls_back_without_caching():
+    provider = CountingExplainer(latency_ms=200)
+    service = ExplanationService(persist=False, timeout_seconds=0.02)
+    result = asyncio.run(service.explain(PAYLOAD, provider))
+    assert result.source == "fallback"
+    assert result.text == _fallback_summary(PAYLOAD)
+    assert len(service.memory) == 0
+
+
+def test_sync_timeout_falls_back_without_caching():
+    service = ExplanationService(persist=False, timeout_seconds=0.02)
+    assert service.explain_sync(PAYLOAD, CountingExplainer(latency_ms=200)) == _fallback_summary(PAYLOAD)
+    assert len(service.memory) == 0
+
+
+def test_sync_provider_error_falls_back_and_success_is_cached():
+    service = ExplanationService(persist=False)
+    assert service.explain_sync(PAYLOAD, BrokenExplainer()) == _fallback_summary(PAYLOAD)
+    provider = CountingExplainer()
+    text = service.explain_sync(PAYLOAD, provider)
+    assert service.explain_sync(PAYLOAD, provider) == text
+    assert provider.requests == 1
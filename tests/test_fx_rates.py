@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.fx_rates import FxRateError, FxRateTable
+
+RATES = """date,base,quote,rate
+2024-01-01,EUR,USD,1.10
+2024-02-01,EUR,USD,1.20
+2024-01-01,GBP,USD,1.25
+2024-03-01,GBP,USD,1.30
+"""
+
+
+def _dates(*values):
+    return pd.to_datetime(list(values)).to_numpy("datetime64[ns]")
+
+
+@pytest.fixture
+def rates_file(tmp_path):
+    path = tmp_path / "fx.csv"
+    path.write_text(RATES)
+    return path
+
+
+@pytest.fixture
+def table(rates_file):
+    # Loaded via refresh_if_stale so conversions in the tests don't reload the file themselves.
+    table = FxRateTable(str(rates_file), reload_seconds=3600)
+    table.refresh_if_stale()
+    return table
+
+
+def test_as_of_lookup_uses_the_latest_quote_on_or_before_each_date(table):
+    rates = table.rates("EUR", "USD", _dates("2024-01-01", "2024-01-31", "2024-02-01", "2025-06-01"))
+    assert rates.tolist() == [1.10, 1.10, 1.20, 1.20]
+
+
+def test_dates_before_the_first_quote_use_the_first_quote(table):
+    assert table.rates("EUR", "USD", _dates("2020-05-05")).tolist() == [1.10]
+
+
+def test_inverse_rates(table):
+    assert table.rates("USD", "EUR", _dates("2024-02-15")) == pytest.approx([1 / 1.20])
+
+
+def test_cross_rates_go_through_the_pivot(table):
+    rates = table.rates("EUR", "GBP", _dates("2024-01-15", "2024-03-15"))
+    assert rates == pytest.approx([1.10 / 1.25, 1.20 / 1.30])
+
+
+def test_convertible_and_convert(table):
+    assert table.convertible(["USD", "eur", "GBP", "JPY"], "usd") == ["USD", "eur", "GBP"]
+    frame = pd.DataFrame(
+        {"amount": [100.0, 100.0, 50.0], "currency": ["EUR", "USD", "GBP"], "transaction_date": pd.to_datetime(["2024-02-10"] * 3)}
+    )
+    converted = table.convert(frame, "USD")
+    assert converted["amount"].tolist() == pytest.approx([120.0, 100.0, 62.5])
+    assert converted["original_currency"].tolist() == ["EUR", "USD", "GBP"]
+    with pytest.raises(FxRateError, match="JPY"):
+        table.convert(frame.assign(currency="JPY"), "USD")
+
+
+def test_appended_rows_are_merged_and_corrections_win(table, rates_file):
+    with rates_file.open("a") as handle:
+        handle.write("2024-02-01,EUR,USD,1.21\n2024-04-01,EUR,USD,1.30\n")
+    table.refresh()
+    assert table.rates("EUR", "USD", _dates("2024-02-15", "2024-04-15")).tolist() == [1.21, 1.30]
+    assert table.rows_loaded == 6
+
+
+def test_refresh_publishes_the_new_table_in_one_swap(table, rates_file, monkeypatch):
+    before = table._pairs
+    eur_rates = before[("EUR", "USD")].rates.copy()
+    seen_during_merge = []
+    merged = FxRateTable._merged
+
+    def watching(pairs, rates):
+        seen_during_merge.append(table._pairs)
+        return merged(pairs, rates)
+
+    monkeypatch.setattr(FxRateTable, "_merged", staticmethod(watching))
+    rates_file.write_text("date,base,quote,rate\n2024-01-01,EUR,USD,2.00\n")
+    table.refresh()
+    assert seen_during_merge == [before]
+    assert table._pairs is not before
+    assert set(table._pairs) == {("EUR", "USD")}
+    # Readers still holding the old mapping keep seeing consistent, unmodified arrays.
+    assert before[("EUR", "USD")].rates.tolist() == eur_rates.tolist()
+
+
+def test_conversions_never_see_a_partial_table(table, rates_file):
+    old = "date,base,quote,rate\n" + "".join(f"2024-01-{day:02d},EUR,USD,1.0\n2024-01-{day:02d},GBP,USD,1.0\n" for day in range(1, 29))
+    new = old.replace(",1.0\n", ",2.0\n")
+    frame = pd.DataFrame({"amount": [1.0, 1.0], "currency": ["EUR", "GBP"], "transaction_date": pd.to_datetime(["2024-01-15"] * 2)})
+    rates_file.write_text(old)
+    table.refresh()
+    stop, seen, errors = threading.Event(), set(), []
+
+    def convert():
+        while not stop.is_set():
+            try:
+                seen.add(tuple(table.convert(frame, "USD")["amount"]))
+            except Exception as exc:  # noqa: BLE001 - any failure means a reader saw a partial table
+                errors.append(exc)
+
+    reader = threading.Thread(target=convert)
+    reader.start()
+    try:
+        for index in range(60):
+            rates_file.write_text(new if index % 2 == 0 else old)
+            table.refresh()
+    finally:
+        stop.set()
+        reader.join()
+    assert errors == []
+    assert seen <= {(1.0, 1.0), (2.0, 2.0)}
+
+
+def test_ingest_rejects_currencies_without_a_rate(client, company_id):
+    records = [
+        {"unique_id": f"fx-{company_id}-{index}", "amount": 10.0, "category": "sales", "currency": currency, "transaction_date": "2024-02-01"}
+        for index, currency in enumerate(["EUR", "JPY"])
+    ]
+    response = client.post("/ingest/transactions", json={"company_id": company_id, "records": records})
+    assert response.status_code == 422
+    errors = response.json()["detail"]["errors"]
+    assert [(error["index"], error["field"], error["reason"]) for error in errors] == [(1, "currency", "no FX rate into the reporting currency")]
+    body = client.post("/ingest/batches", json={"company_id": company_id, "records": records, "accept_valid": True}).json()
+    assert [row["currency"] for row in body["inserted"]] == ["EUR"]
+    assert len(body["rejected"]) == 1
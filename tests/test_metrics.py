@@ -0,0 +1,57 @@
+from app.utils.metrics import Gauge, Histogram, MetricsRegistry, server_timing
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency.", ["stage"], (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "load")
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="load",le="0.1"} 2',
+        'latency_seconds_bucket{stage="load",le="1.0"} 3',
+        'latency_seconds_bucket{stage="load",le="+Inf"} 4',
+        'latency_seconds_sum{stage="load"} 3.65',
+        'latency_seconds_count{stage="load"} 4',
+    ]
+
+
+def test_histogram_series_are_kept_per_label_set():
+    histogram = Histogram("rows", "Rows.", ["stage"], (10,))
+    histogram.observe(5, "b")
+    histogram.observe(50, "a")
+    lines = histogram.render()
+    assert lines.index('rows_bucket{stage="a",le="10"} 0') < lines.index('rows_bucket{stage="b",le="10"} 1')
+    assert 'rows_bucket{stage="a",le="+Inf"} 1' in lines
+
+
+def test_label_values_and_help_text_are_escaped():
+    gauge = Gauge("odd", 'Help with \\ and\nnewline "quoted".', ["path"], lambda: {('say "hi"\\now\n',): 1.0})
+    assert gauge.render() == [
+        '# HELP odd Help with \\\\ and\\nnewline "quoted".',
+        "# TYPE odd gauge",
+        'odd{path="say \\"hi\\"\\\\now\\n"} 1.0',
+    ]
+
+
+def test_registry_renders_each_metric_once_and_ends_with_a_newline():
+    registry = MetricsRegistry()
+    first = registry.histogram("h", "H.", [], (1.0,))
+    assert registry.histogram("h", "H.", [], (1.0,)) is first
+    registry.gauge("g", "G.", [], lambda: {(): 2.0})
+    rendered = registry.render()
+    assert rendered.endswith("\n")
+    assert rendered.count("# TYPE h histogram") == 1
+    assert "g 2.0" in rendered.splitlines()
+
+
+def test_metrics_endpoint_serves_the_text_format(client):
+    client.get("/metrics")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'risk_engine_http_request_seconds_count{method="GET",route="/metrics",status="200"}' in response.text
+
+
+def test_server_timing_header_value():
+    assert server_timing({"db.query": 0.0125, "total": 0.02}) == "db.query;dur=12.50, total;dur=20.00"
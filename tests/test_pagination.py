@@ -0,0 +1,99 @@
+import base64
+
+import orjson
+import pytest
+
+from app.api import pagination
+from app.api.pagination import encode_cursor
+
+
+def _ingest(client, company_id: int, dates):
+    records = [
+        {"unique_id": f"page-{company_id}-{index}", "amount": 10.0 + index, "category": "sales", "transaction_date": day}
+        for index, day in enumerate(dates)
+    ]
+    client.post("/ingest/transactions", json={"company_id": company_id, "records": records}).raise_for_status()
+
+
+def _walk(client, company_id: int, limit: int, **params):
+    items, cursor = [], None
+    while True:
+        body = client.get(f"/transactions/{company_id}", params={"limit": limit, **params, **({"cursor": cursor} if cursor else {})}).json()
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.fixture
+def tied(client, company_id):
+    # Several rows share each date, so page boundaries fall inside runs of equal sort keys.
+    _ingest(client, company_id, [f"2024-05-{1 + index // 4:02d}" for index in range(23)])
+    return company_id
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 5, 23, 50])
+def test_pages_cover_every_row_once_in_key_order(client, tied, limit):
+    items = _walk(client, tied, limit)
+    keys = [(item["transaction_date"], item["id"]) for item in items]
+    assert len(keys) == 23
+    assert keys == sorted(keys)
+    assert len(set(keys)) == 23
+
+
+def test_date_range_applies_to_every_page(client, tied):
+    items = _walk(client, tied, 2, start="2024-05-02", end="2024-05-03")
+    assert {item["transaction_date"] for item in items} == {"2024-05-02", "2024-05-03"}
+    assert len(items) == 8
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(orjson.dumps(["2024-05-01"])).decode(),
+        base64.urlsafe_b64encode(orjson.dumps(["yesterday", 3])).decode(),
+        base64.urlsafe_b64encode(orjson.dumps([20240501, 3])).decode(),
+        base64.urlsafe_b64encode(orjson.dumps(["2024-05-01", "three"])).decode(),
+    ],
+    ids=["not-base64", "not-json", "short", "bad-date", "wrong-type", "bad-id"],
+)
+def test_invalid_cursors_are_rejected(client, company_id, cursor):
+    response = client.get(f"/transactions/{company_id}", params={"cursor": cursor})
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_a_rewritten_cursor_resumes_from_its_key(client, tied):
+    items = _walk(client, tied, 50)
+    cursor = encode_cursor(items[9]["transaction_date"], items[9]["id"])
+    resumed = client.get(f"/transactions/{tied}", params={"cursor": cursor, "limit": 50}).json()["items"]
+    assert resumed == items[10:]
+
+
+def test_json_pages_above_the_maximum_need_ndjson(client, company_id):
+    assert client.get(f"/transactions/{company_id}", params={"limit": 5_000}).status_code == 422
+
+
+def _stream(client, company_id: int, limit: int, cursor: str | None = None):
+    params = {"limit": limit, "format": "ndjson", **({"cursor": cursor} if cursor else {})}
+    response = client.get(f"/transactions/{company_id}", params=params)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    return lines[:-1], lines[-1]["next_cursor"]
+
+
+def test_ndjson_streams_rows_then_the_next_cursor(client, tied, monkeypatch):
+    # Small partitions so a page spans several chunks of the server-side cursor.
+    monkeypatch.setattr(pagination.settings, "stream_chunk_rows", 4)
+    expected = _walk(client, tied, 50)
+    first, cursor = _stream(client, tied, 10)
+    rest, last = _stream(client, tied, 50, cursor)
+    assert first + rest == expected
+    assert cursor is not None and last is None
+
+
+def test_ndjson_rejects_a_bad_cursor_before_streaming(client, company_id):
+    response = client.get(f"/transactions/{company_id}", params={"format": "ndjson", "cursor": "bogus"})
+    assert response.status_code == 422
@@ -0,0 +1,76 @@
+import pytest
+
+from app.utils import profiling
+from app.utils.profiling import CaptureStore, capture_store
+
+
+def _report(index: int):
+    return {
+        "id": f"capture{index}",
+        "method": "GET",
+        "path": f"/items/{index}",
+        "status": 200,
+        "reason": "header",
+        "captured_at": "2024-01-01T00:00:00",
+        "wall_ms": 1.0,
+        "cpu_ms": 0.5,
+    }
+
+
+def test_ring_buffer_keeps_only_the_newest_captures(tmp_path):
+    store = CaptureStore(str(tmp_path / "profiles"), max_captures=3)
+    for index in range(5):
+        store.save(_report(index))
+    assert len(list((tmp_path / "profiles").glob("*.json"))) == 3
+    assert [summary["id"] for summary in store.list()] == ["capture4", "capture3", "capture2"]
+    assert store.get("capture1") is None
+    assert store.get("capture4")["path"] == "/items/4"
+
+
+def test_a_single_slot_buffer_holds_the_latest_capture(tmp_path):
+    store = CaptureStore(str(tmp_path), max_captures=1)
+    store.save(_report(0))
+    store.save(_report(1))
+    assert [summary["id"] for summary in store.list()] == ["capture1"]
+
+
+def test_lookups_reject_non_alphanumeric_ids(tmp_path):
+    store = CaptureStore(str(tmp_path), max_captures=3)
+    store.save(_report(0))
+    assert store.get("../capture0") is None
+    assert store.get("*") is None
+
+
+def test_an_empty_store_lists_nothing(tmp_path):
+    store = CaptureStore(str(tmp_path / "missing"), max_captures=3)
+    assert store.list() == []
+    assert store.get("capture0") is None
+
+
+@pytest.fixture
+def profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling.settings, "profiling_token", "secret")
+    monkeypatch.setattr(capture_store, "directory", tmp_path)
+    monkeypatch.setattr(capture_store, "max_captures", 2)
+
+
+def test_profiled_requests_are_captured_and_bounded(client, company_id, profiled):
+    records = [
+        {"unique_id": f"prof-{company_id}-{day}", "amount": 100.0, "category": "sales", "transaction_date": f"2024-01-{day + 1:02d}"}
+        for day in range(5)
+    ]
+    client.post("/ingest/transactions", json={"company_id": company_id, "records": records}).raise_for_status()
+    ids = []
+    for _ in range(3):
+        response = client.post(f"/anomalies/{company_id}", headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        ids.append(response.headers["x-profile-id"])
+    assert "x-profile-id" not in client.post(f"/anomalies/{company_id}", headers={"X-Profile": "wrong"}).headers
+
+    listed = client.get("/admin/profiles", headers={"X-Profile-Token": "secret"}).json()
+    assert [summary["id"] for summary in listed] == ids[:0:-1]
+    capture = client.get(f"/admin/profiles/{ids[-1]}", headers={"X-Profile-Token": "secret"}).json()
+    assert "detect_anomalies" in [call["function"] for call in capture["calls"]]
+    assert capture["top_functions"]
+    assert client.get(f"/admin/profiles/{ids[0]}", headers={"X-Profile-Token": "secret"}).status_code == 404
+    assert client.get("/admin/profiles").status_code == 404
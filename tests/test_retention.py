@@ -0,0 +1,172 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from app.database import Base, SessionLocal
+from app.models.analytics_rollup import AnalyticsRollup
+from app.models.company import Company
+from app.models.forecast import Forecast
+from app.models.risk_report import RiskReport
+from app.services import retention
+from app.services.retention import SOURCES, RetentionResult, compact_daily, merge_stats, rollup_expired, run_retention
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Several batches per company, so merging into an existing rollup is exercised too.
+    monkeypatch.setattr(retention.settings, "retention_batch_rows", 3)
+    monkeypatch.setattr(retention.settings, "retention_batch_pause_ms", 0.0)
+
+
+def _reports(company_id: int, ages_days, start: float = 10.0):
+    reports = [
+        RiskReport(
+            company_id=company_id,
+            survival_probability=start + index * 7.5,
+            heatmap={},
+            summary="",
+            report_payload={},
+            created_at=NOW - timedelta(days=age, hours=index % 5),
+        )
+        for index, age in enumerate(ages_days)
+    ]
+    with SessionLocal() as db:
+        db.add_all(reports)
+        db.commit()
+        return [(report.created_at, report.survival_probability) for report in reports]
+
+
+def _expected(rows, period):
+    stats = defaultdict(dict)
+    counts = defaultdict(int)
+    for created_at, value in rows:
+        key = period(created_at.date())
+        stats[key] = merge_stats(stats[key], {"survival_probability": {"count": 1, "sum": value, "min": value, "max": value}})
+        counts[key] += 1
+    return {key: (counts[key], stats[key]) for key in stats}
+
+
+def _rollups(company_id: int, granularity: str):
+    with SessionLocal() as db:
+        rollups = db.scalars(
+            select(AnalyticsRollup).where(
+                AnalyticsRollup.source == "risk_reports",
+                AnalyticsRollup.company_id == company_id,
+                AnalyticsRollup.granularity == granularity,
+            )
+        )
+        return {rollup.period_start: (rollup.rows, rollup.metrics) for rollup in rollups}
+
+
+def _remaining(company_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(RiskReport).where(RiskReport.company_id == company_id))
+
+
+def _assert_stats(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, (rows, stats) in expected.items():
+        assert actual[key][0] == rows
+        for name, values in stats.items():
+            assert actual[key][1][name] == pytest.approx(values)
+
+
+def test_rollup_matches_the_deleted_rows_and_compaction_matches_the_rollups(company_id):
+    expired = _reports(company_id, [100, 100, 100, 101, 130, 130, 200, 400, 401])
+    _reports(company_id, [1, 5, 89])
+    cutoff = NOW - timedelta(days=90)
+
+    result = RetentionResult("risk_reports")
+    rollup_expired(SOURCES["risk_reports"], cutoff, result)
+    assert _remaining(company_id) == 3
+    assert result.rolled_up >= len(expired)
+    _assert_stats(_rollups(company_id, "day"), _expected(expired, lambda day: day))
+
+    compaction_cutoff = (NOW - timedelta(days=365)).date()
+    compact_daily("risk_reports", compaction_cutoff, RetentionResult("risk_reports"))
+    recent = [row for row in expired if row[0].date() >= compaction_cutoff]
+    old = [row for row in expired if row[0].date() < compaction_cutoff]
+    _assert_stats(_rollups(company_id, "day"), _expected(recent, lambda day: day))
+    _assert_stats(_rollups(company_id, "month"), _expected(old, lambda day: day.replace(day=1)))
+
+
+def test_retention_is_idempotent_and_merges_later_runs(company_id):
+    first = _reports(company_id, [120, 121])
+    run_retention(["risk_reports"], now=NOW)
+    assert [result.rolled_up for result in run_retention(["risk_reports"], now=NOW)] == [0]
+    second = _reports(company_id, [120], start=99.0)
+    run_retention(["risk_reports"], now=NOW)
+    _assert_stats(_rollups(company_id, "day"), _expected(first + second, lambda day: day))
+
+
+def test_forecast_metrics_are_split_by_horizon(company_id):
+    with SessionLocal() as db:
+        db.add_all(
+            Forecast(
+                company_id=company_id,
+                horizon_days=horizon,
+                revenue_projection=1_000.0 * horizon,
+                expense_projection=500.0,
+                runway_days=horizon * 2,
+                forecast_payload={},
+                created_at=NOW - timedelta(days=100),
+            )
+            for horizon in (30, 60, 60)
+        )
+        db.commit()
+    rollup_expired(SOURCES["forecasts"], NOW - timedelta(days=90), RetentionResult("forecasts"))
+    with SessionLocal() as db:
+        metrics = db.scalar(
+            select(AnalyticsRollup.metrics).where(AnalyticsRollup.source == "forecasts", AnalyticsRollup.company_id == company_id)
+        )
+    assert metrics["runway_days@30"] == {"count": 1, "sum": 60.0, "min": 60.0, "max": 60.0}
+    assert metrics["revenue_projection@60"]["count"] == 2
+
+
+def test_only_companies_with_expired_rows_are_visited(company_id, monkeypatch):
+    with SessionLocal() as db:
+        idle = Company(name=f"idle-{company_id}")
+        db.add(idle)
+        db.commit()
+        idle_id = idle.id
+    _reports(idle_id, [1])
+    _reports(company_id, [150])
+    visited = retention._companies_with(RiskReport.company_id, RiskReport.created_at < NOW - timedelta(days=90))
+    assert company_id in visited
+    assert idle_id not in visited
+
+
+def test_partitioning_is_off_for_sqlite():
+    assert not retention.partitioning_enabled()
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="set TEST_POSTGRES_URL to a scratch Postgres database")
+def test_convert_to_partitioned_keeps_rows_and_routes_new_ones(monkeypatch):
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(retention, "engine", engine)
+    try:
+        with engine.begin() as connection:
+            company_id = connection.execute(Company.__table__.insert().returning(Company.id), {"name": "partitioned"}).scalar()
+            rows = [
+                {"company_id": company_id, "survival_probability": 50.0, "heatmap": {}, "summary": "", "report_payload": {}, "created_at": created_at}
+                for created_at in (datetime(2024, 1, 5), datetime(2024, 4, 20))
+            ]
+            connection.execute(RiskReport.__table__.insert(), rows)
+        assert retention.convert_to_partitioned(SOURCES["risk_reports"], today=date(2024, 5, 10))
+        assert not retention.convert_to_partitioned(SOURCES["risk_reports"], today=date(2024, 5, 10))
+        with engine.begin() as connection:
+            assert retention.is_partitioned(connection, "risk_reports")
+            connection.execute(RiskReport.__table__.insert(), [{**rows[0], "created_at": datetime(2024, 7, 2)}])
+            assert connection.execute(select(func.count()).select_from(RiskReport)).scalar() == 3
+            names = [name for name, _ in retention._partitions(connection, "risk_reports")]
+            assert {"risk_reports_legacy", "risk_reports_p2024_07", "risk_reports_default"} <= set(names)
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.risk_aggregates import RiskAggregates, rolling_keys
+from app.services.risk_engine import generate_risk_report
+from app.services.rules_engine import build_rule_plan
+from app.utils.preprocess import to_dataframe
+
+CATEGORIES = {"sales": 1, "rent": -1, "utilities": -1, "subscriptions": -1, "accounts_receivable": 1, "payroll": -1}
+
+
+def _records(rows: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    # Unique dates keep the row order of the date sort unambiguous.
+    days = rng.choice(700, size=rows, replace=False)
+    names = rng.choice(list(CATEGORIES), size=rows)
+    return [
+        {
+            "unique_id": f"tx-{index}",
+            "amount": CATEGORIES[name] * float(rng.uniform(50, 4000)),
+            "category": name,
+            "transaction_date": pd.Timestamp("2022-01-01") + pd.Timedelta(days=int(day)),
+        }
+        for index, (day, name) in enumerate(zip(days, names))
+    ]
+
+
+def _close(left, right) -> bool:
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(_close(left[key], right[key]) for key in left)
+    if isinstance(left, list):
+        return len(left) == len(right) and all(_close(a, b) for a, b in zip(left, right))
+    if isinstance(left, float):
+        return (math.isnan(left) and math.isnan(right)) or left == pytest.approx(right, rel=1e-9, abs=1e-9)
+    return left == right
+
+
+def _comparable(report):
+    return {key: report[key] for key in ("survival_probability", "heatmap", "summary_payload")}
+
+
+def _assert_matches(aggregates: RiskAggregates, records, plan) -> None:
+    expected = generate_risk_report(to_dataframe(records), explain=False, rule_plan=plan)
+    assert _close(_comparable(aggregates.report(plan)), _comparable(expected))
+
+
+def _delta(added=(), removed=()):
+    rows = [{**record, "sign": 1} for record in added] + [{**record, "sign": -1} for record in removed]
+    return to_dataframe(rows)
+
+
+@pytest.fixture
+def setup():
+    records = _records(300)
+    plan = build_rule_plan()
+    return records, plan, RiskAggregates.from_frame(to_dataframe(records), rolling_keys(plan))
+
+
+def test_from_frame_matches_full_report(setup):
+    records, plan, aggregates = setup
+    _assert_matches(aggregates, records, plan)
+
+
+def test_appended_rows_match_full_report(setup):
+    records, plan, aggregates = setup
+    added = [
+        {"unique_id": "new-1", "amount": -9000.0, "category": "subscriptions", "transaction_date": pd.Timestamp("2024-03-01")},
+        {"unique_id": "new-2", "amount": 1200.0, "category": "sales", "transaction_date": pd.Timestamp("2024-03-02")},
+        {"unique_id": "new-3", "amount": 800.0, "category": "accounts_receivable", "transaction_date": pd.Timestamp("2024-03-03")},
+    ]
+    scenario = aggregates.apply(_delta(added))
+    _assert_matches(scenario, records + added, plan)
+    assert {rule.name: rule.triggered for rule in scenario.report(plan)["rules"]}["subscription_creep"]
+
+
+def test_many_single_appends_fold_the_tail(setup):
+    records, plan, aggregates = setup
+    added = []
+    for index in range(150):
+        row = {
+            "unique_id": f"sub-{index}",
+            "amount": -float(100 + 37 * (index % 11)),
+            "category": "subscriptions",
+            "transaction_date": pd.Timestamp("2024-01-01") + pd.Timedelta(days=index),
+        }
+        added.append(row)
+        aggregates = aggregates.apply(_delta([row]))
+    _assert_matches(aggregates, records + added, plan)
+
+
+def test_rows_inserted_before_the_latest_date_match_full_report(setup):
+    records, plan, aggregates = setup
+    taken = {record["transaction_date"] for record in records}
+    free = next(day for day in pd.date_range("2022-06-01", periods=400) if day not in taken)
+    added = [{"unique_id": "mid-1", "amount": -7000.0, "category": "subscriptions", "transaction_date": free}]
+    _assert_matches(aggregates.apply(_delta(added)), records + added, plan)
+
+
+def test_removed_rows_match_full_report(setup):
+    records, plan, aggregates = setup
+    removed = [record for record in records if record["category"] in ("subscriptions", "accounts_receivable")][:8]
+    removed += [record for record in records if record["category"] == "sales"][:3]
+    kept = [record for record in records if record not in removed]
+    _assert_matches(aggregates.apply(_delta(removed=removed)), kept, plan)
+
+
+def test_apply_leaves_the_baseline_unchanged(setup):
+    records, plan, aggregates = setup
+    before = aggregates.report(plan)
+    aggregates.apply(_delta(removed=records[:20]))
+    assert _close(_comparable(aggregates.report(plan)), _comparable(before))
+
+
+def test_what_if_endpoint_matches_report_endpoint(client, company_id):
+    records = [{**record, "transaction_date": record["transaction_date"].date().isoformat()} for record in _records(60)]
+    client.post("/ingest/transactions", json={"company_id": company_id, "records": records}).raise_for_status()
+    response = client.post(f"/risk/whatif/{company_id}", json={"remove": ["tx-0", "tx-1"]})
+    response.raise_for_status()
+    body = response.json()
+    assert body["baseline"]["survival_probability"] == pytest.approx(client.post(f"/risk/report/{company_id}").json()["survival_probability"])
+    assert body["survival_change"] == pytest.approx(body["scenario"]["survival_probability"] - body["baseline"]["survival_probability"])
@@ -0,0 +1,116 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.rule_dsl import RuleCompileError, RulePlan, RuleSpec
+from app.services.rules_engine import DEFAULT_METRICS, DEFAULT_RULES, build_rule_plan, evaluate_rules, evaluate_rules_grouped
+from benchmarks.generator import generate_transactions
+
+TODAY = datetime(2025, 1, 15)
+
+
+def _hard_coded(frame: pd.DataFrame, today: datetime):
+    """The checks the declarative defaults replaced, with the debtor cutoff taken from ``today``."""
+
+    revenue = frame[frame["amount"] > 0]["amount"].sum()
+    expense = frame[frame["amount"] < 0]["amount"].abs().sum()
+    liquidity_ratio = float(revenue / (expense + 1e-9)) if expense else 2.0
+    rent = frame[frame["category"].isin(["rent", "utilities"])]
+    rent_ratio = float(rent["amount"].abs().sum() / (expense + 1e-9)) if expense else 0.0
+    creep = frame[frame["category"] == "subscriptions"]["amount"].abs().rolling(window=3, min_periods=1).mean()
+    margin = float((revenue - expense) / (revenue + 1e-9)) if revenue else -1.0
+    cutoff = pd.Timestamp(today) - pd.Timedelta(days=60)
+    overdue = frame[(frame["category"] == "accounts_receivable") & (frame["transaction_date"] < cutoff)]
+    return {
+        "liquidity_ratio": liquidity_ratio < 1.2,
+        "rent_utilities": rent_ratio > 0.3,
+        "subscription_creep": bool((creep.diff() > 1000).any()),
+        "margin_compression": margin < 0.2,
+        "debtor_overdue": not overdue.empty,
+    }
+
+
+def _generated(rows: int, seed: int) -> pd.DataFrame:
+    """Generated transactions with per-seed category scaling so every default rule both fires and doesn't."""
+
+    frame = generate_transactions(rows, seed=seed, start="2024-06-01", days=240)
+    rng = np.random.default_rng(seed)
+    for category, high in (("sales", 3.0), ("rent", 8.0), ("subscriptions", 40.0)):
+        mask = frame["category"] == category
+        frame.loc[mask, "amount"] *= rng.uniform(0.2, high)
+    return frame
+
+
+def _triggered(evaluations):
+    return {evaluation.name: evaluation.triggered for evaluation in evaluations}
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("rows", [1, 40, 2_000])
+def test_default_rules_match_the_hard_coded_checks(seed, rows):
+    frame = _generated(rows, seed)
+    assert _triggered(evaluate_rules(frame, today=TODAY)) == _hard_coded(frame, TODAY)
+
+
+def test_debtor_cutoff_uses_today():
+    frame = pd.DataFrame(
+        {"amount": [500.0], "category": ["accounts_receivable"], "transaction_date": [pd.Timestamp("2024-12-01")]}
+    )
+    assert not _triggered(evaluate_rules(frame, today=TODAY))["debtor_overdue"]
+    assert _triggered(evaluate_rules(frame, today=datetime(2025, 3, 1)))["debtor_overdue"]
+
+
+def test_grouped_evaluation_matches_a_per_company_loop():
+    frame = generate_transactions(3_000, seed=11, start="2024-06-01", days=240)
+    frame["company_id"] = frame.index % 5
+    plan = build_rule_plan(
+        [
+            RuleSpec("rent_cap", "category_spend('rent') > 5000", "Rent above cap", company_id=2),
+            RuleSpec("big_payroll", "category_spend('payroll') > 1", "Any payroll", company_id=4),
+        ]
+    )
+    grouped = evaluate_rules_grouped(frame, "company_id", plan, today=TODAY)
+    assert set(grouped) == set(range(5))
+    for company_id, evaluations in grouped.items():
+        single = [
+            evaluation
+            for evaluation in evaluate_rules(frame[frame["company_id"] == company_id], plan, today=TODAY)
+            if evaluation.name not in {"rent_cap", "big_payroll"}
+        ]
+        names = [evaluation.name for evaluation in evaluations]
+        assert ("rent_cap" in names) == (company_id == 2)
+        assert ("big_payroll" in names) == (company_id == 4)
+        assert [evaluation for evaluation in evaluations if evaluation.name not in {"rent_cap", "big_payroll"}] == single
+
+
+def test_tenant_rule_matches_an_unscoped_evaluation_of_that_company():
+    frame = generate_transactions(1_000, seed=3, start="2024-06-01", days=240)
+    frame["company_id"] = frame.index % 3
+    tenant = RuleSpec("rent_cap", "category_spend('rent') > 5000", company_id=1)
+    grouped = evaluate_rules_grouped(frame, "company_id", build_rule_plan([tenant]), today=TODAY)
+    unscoped = evaluate_rules(
+        frame[frame["company_id"] == 1], build_rule_plan([RuleSpec("rent_cap", tenant.when)]), today=TODAY
+    )
+    assert _triggered(grouped[1])["rent_cap"] == _triggered(unscoped)["rent_cap"]
+
+
+@pytest.mark.parametrize(
+    "rules, metrics",
+    [
+        ([RuleSpec("margin_compression", "margin < 0.1"), RuleSpec("margin_compression", "margin < 0.2")], DEFAULT_METRICS),
+        (DEFAULT_RULES, {**DEFAULT_METRICS, "revenue": "expense * 2"}),
+        ([RuleSpec("ratio", "revenue / (expense + 1)")], DEFAULT_METRICS),
+        ([RuleSpec("spend", "category_spend('rent')")], DEFAULT_METRICS),
+    ],
+    ids=["duplicate-rule", "metric-shadows-aggregate", "arithmetic", "bare-aggregate"],
+)
+def test_plan_rejects_clashes_and_non_conditions(rules, metrics):
+    with pytest.raises(RuleCompileError):
+        RulePlan(rules, metrics)
+
+
+def test_same_name_is_allowed_for_different_tenants():
+    plan = RulePlan([RuleSpec("cap", "expense > 1", company_id=1), RuleSpec("cap", "expense > 2", company_id=2)], {})
+    assert [rule.key for rule in plan.rules] == ["cap[1]", "cap[2]"]
@@ -0,0 +1,37 @@
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from app.utils.validators import validate_transaction_frame
+
+
+def _frame(dates):
+    return pd.DataFrame(
+        {
+            "unique_id": [f"tx-{i}" for i in range(len(dates))],
+            "amount": [10.0] * len(dates),
+            "category": ["sales"] * len(dates),
+            "currency": ["USD"] * len(dates),
+            "transaction_date": dates,
+        }
+    )
+
+
+def test_timezone_aware_dates_are_accepted():
+    report = validate_transaction_frame(_frame(["2024-01-01T00:00:00Z", "2024-01-02T23:30:00+05:00"]), ["USD"])
+    assert report.errors == []
+
+
+def test_mixed_aware_and_naive_dates_are_compared_against_today():
+    dates = [
+        "2024-01-01",
+        datetime(2024, 1, 2, tzinfo=timezone.utc),
+        date(2024, 1, 3),
+        "2024-07-01T00:00:00Z",
+        "not a date",
+    ]
+    report = validate_transaction_frame(_frame(dates), ["USD"], today=datetime(2024, 6, 1))
+    assert [(error["index"], error["reason"]) for error in report.errors] == [
+        (3, "date is in the future"),
+        (4, "missing or unparseable date"),
+    ]
@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.simulation import Simulation
+from app.utils import write_behind as write_behind_module
+from app.utils.write_behind import WriteBehindQueue
+
+
+def _rows(company_id: int | None, count: int):
+    return [
+        Simulation(company_id=company_id, insolvency_probability=0.1, summary={}, simulation_payload={}, created_at=datetime.utcnow())
+        for _ in range(count)
+    ]
+
+
+def _stored(company_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Simulation).where(Simulation.company_id == company_id))
+
+
+def test_concurrent_submissions_share_one_commit(company_id):
+    queue = WriteBehindQueue(max_size=100, batch_rows=100, flush_interval=0.02)
+
+    async def run():
+        await asyncio.gather(*(queue.submit(_rows(company_id, 3)) for _ in range(10)))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert (queue.batches, queue.written, queue.failed) == (1, 30, 0)
+    assert _stored(company_id) == 30
+
+
+def test_batches_are_bounded_by_batch_rows(company_id):
+    queue = WriteBehindQueue(max_size=100, batch_rows=4, flush_interval=0.02)
+
+    async def run():
+        await asyncio.gather(*(queue.submit(_rows(company_id, 2)) for _ in range(10)))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert (queue.batches, queue.written) == (5, 20)
+
+
+def test_committed_ack_waits_for_the_commit(company_id):
+    queue = WriteBehindQueue(max_size=10, batch_rows=100, flush_interval=0.0)
+
+    async def run():
+        rows = _rows(company_id, 2)
+        await queue.submit(rows, wait=True)
+        stored = _stored(company_id)
+        await queue.stop()
+        return rows, stored
+
+    rows, stored = asyncio.run(run())
+    assert stored == 2
+    assert all(row.id is not None for row in rows)
+
+
+def test_failed_batch_is_retried_per_submission_and_bad_rows_dropped(company_id):
+    queue = WriteBehindQueue(max_size=10, batch_rows=100, flush_interval=0.02)
+
+    async def run():
+        results = await asyncio.gather(
+            queue.submit(_rows(company_id, 2), wait=True),
+            queue.submit(_rows(None, 1), wait=True),
+            queue.submit(_rows(company_id, 3), wait=True),
+            return_exceptions=True,
+        )
+        await queue.stop()
+        return results
+
+    good, bad, other = asyncio.run(run())
+    assert good is None and other is None
+    assert isinstance(bad, Exception)
+    assert (queue.written, queue.failed) == (5, 1)
+    assert _stored(company_id) == 5
+
+
+@pytest.fixture
+def write_behind_mode(monkeypatch):
+    monkeypatch.setattr(write_behind_module.settings, "persistence_mode", "write_behind")
+    monkeypatch.setattr(write_behind_module.settings, "persistence_ack", "committed")
+
+
+def _ingest(client, company_id: int) -> None:
+    records = [
+        {"unique_id": f"wb-{company_id}-{day}", "amount": 100.0 * (-1) ** day, "category": "sales" if day % 2 == 0 else "rent",
+         "transaction_date": f"2024-03-{day + 1:02d}"}
+        for day in range(10)
+    ]
+    client.post("/ingest/transactions", json={"company_id": company_id, "records": records}).raise_for_status()
+
+
+def test_risk_report_committed_ack_returns_the_id(client, company_id, write_behind_mode):
+    _ingest(client, company_id)
+    response = client.post(f"/risk/report/{company_id}", params={"ack": "committed"})
+    assert response.status_code == 200
+    assert isinstance(response.json()["id"], int)
+
+
+def test_risk_reports_without_ack_are_accepted_with_no_body(client, company_id, write_behind_mode):
+    _ingest(client, company_id)
+    response = client.post(f"/risk/report/{company_id}", params={"ack": "none"})
+    assert response.status_code == 202
+    assert response.content == b""
+    portfolio = client.post("/risk/portfolio", params={"ack": "none"}, json={"company_ids": [company_id]})
+    assert portfolio.status_code == 202
+
+
+def test_simulation_without_ack_still_returns_its_result(client, company_id, write_behind_mode):
+    _ingest(client, company_id)
+    response = client.post(f"/simulate/{company_id}", params={"ack": "none", "iterations": 50})
+    assert response.status_code == 200
+    assert response.json()["company_id"] == company_id